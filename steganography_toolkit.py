@@ -1,10 +1,19 @@
 """
 Steganography Toolkit - Main Application
 A comprehensive GUI application for various steganography tools
+
+Tool modules are imported the first time their category is opened.
+Run with --startup-timing to print import and first-paint timings.
 """
 
+import time
+
+STARTUP_T0 = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk, messagebox
+import argparse
+import importlib
 import os
 import sys
 
@@ -25,42 +34,84 @@ for name in ["tools", "Tools"]:
             sys.path.insert(0, current_dir)
         break
 
-# Import tool modules
-try:
-    from tools.image_tools import ImageStegoWindow
-    from tools.audio_tools import AudioStegoWindow
-    from tools.video_tools import VideoStegoWindow
-    from tools.text_tools import TextStegoWindow
-    from tools.ads_tools import ADSToolsWindow
-    from tools.hex_tools import HexStegoWindow
-except ImportError:
-    # Fallback: try importing with different case or direct path
+
+
+class StartupTimer:
+    """Timing marks since the script started, printed with --startup-timing"""
+    
+    def __init__(self, start):
+        self.start = start
+        self.enabled = False
+        self.marks = []
+    
+    def mark(self, name):
+        self.marks.append((name, (time.perf_counter() - self.start) * 1000))
+    
+    def report(self):
+        print("Startup timing (ms since launch):", file=sys.stderr)
+        previous = 0.0
+        for name, ms in self.marks:
+            print(f"  {name:<28} {ms:8.1f}  (+{ms - previous:.1f})", file=sys.stderr)
+            previous = ms
+        loaded = sorted(m for m in sys.modules if m == "tools" or m.startswith("tools."))
+        print(f"  tool modules loaded: {', '.join(loaded) or 'none'}", file=sys.stderr)
+    
+    def report_open(self, name, import_ms, build_ms):
+        print(f"[timing] {name}: import {import_ms:.1f} ms, window {build_ms:.1f} ms", file=sys.stderr)
+
+
+timer = StartupTimer(STARTUP_T0)
+timer.mark("tkinter imported")
+
+# Category windows: (module in tools/, window class). Nothing here is
+# imported until its button is clicked, so startup cost does not grow with
+# the number of tools.
+TOOL_WINDOWS = {
+    "image": ("image_tools", "ImageStegoWindow"),
+    "audio": ("audio_tools", "AudioStegoWindow"),
+    "video": ("video_tools", "VideoStegoWindow"),
+    "text": ("text_tools", "TextStegoWindow"),
+    "ads": ("ads_tools", "ADSToolsWindow"),
+    "hex": ("hex_tools", "HexStegoWindow"),
+}
+
+_window_classes = {}
+
+
+def load_tool_window(mod_name, class_name):
+    """Import tools.<mod_name> on first use and return its window class"""
+    key = (mod_name, class_name)
+    if key not in _window_classes:
+        try:
+            module = importlib.import_module(f"tools.{mod_name}")
+        except ImportError:
+            module = _load_tool_module_from_path(mod_name)
+        _window_classes[key] = getattr(module, class_name)
+    return _window_classes[key]
+
+
+def _load_tool_module_from_path(mod_name):
+    """Fallback: load tools/<mod_name>.py directly by path (e.g. a "Tools"
+    folder on a case-sensitive file system)
+    """
     import importlib.util
-    import importlib
     
+    package_dir = tools_dir or os.path.join(current_dir, "tools")
     # Create tools module namespace
     if "tools" not in sys.modules:
         import types
         tools_pkg = types.ModuleType("tools")
+        tools_pkg.__path__ = [package_dir]
         sys.modules["tools"] = tools_pkg
     
-    # Import each module
-    for mod_name, class_name in [
-        ("image_tools", "ImageStegoWindow"),
-        ("audio_tools", "AudioStegoWindow"),
-        ("video_tools", "VideoStegoWindow"),
-        ("text_tools", "TextStegoWindow"),
-        ("ads_tools", "ADSToolsWindow"),
-        ("hex_tools", "HexStegoWindow"),
-    ]:
-        mod_path = os.path.join(tools_dir or os.path.join(current_dir, "tools"), f"{mod_name}.py")
-        if os.path.exists(mod_path):
-            spec = importlib.util.spec_from_file_location(f"tools.{mod_name}", mod_path)
-            if spec and spec.loader:
-                mod = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(mod)
-                sys.modules[f"tools.{mod_name}"] = mod
-                globals()[class_name] = getattr(mod, class_name)
+    mod_path = os.path.join(package_dir, f"{mod_name}.py")
+    spec = importlib.util.spec_from_file_location(f"tools.{mod_name}", mod_path)
+    if not (spec and spec.loader):
+        raise ImportError(f"Cannot load tool module: {mod_path}")
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[f"tools.{mod_name}"] = mod
+    spec.loader.exec_module(mod)
+    return mod
 
 
 class SteganographyToolkit:
@@ -110,7 +161,7 @@ class SteganographyToolkit:
             categories_frame, 0, 0,
             "Image Steganography",
             "Steghide\nXiao Steganography",
-            lambda: ImageStegoWindow(self.root)
+            lambda: self.open_category("image")
         )
         
         # Audio Stego
@@ -118,7 +169,7 @@ class SteganographyToolkit:
             categories_frame, 0, 1,
             "Audio Steganography",
             "MP3Stego\nDeepSound",
-            lambda: AudioStegoWindow(self.root)
+            lambda: self.open_category("audio")
         )
         
         # Video/GIF Stego
@@ -126,7 +177,7 @@ class SteganographyToolkit:
             categories_frame, 1, 0,
             "Video/GIF Steganography",
             "GIF Shuffle Tool\nDeEgger",
-            lambda: VideoStegoWindow(self.root)
+            lambda: self.open_category("video")
         )
         
         # Text Stego
@@ -134,7 +185,7 @@ class SteganographyToolkit:
             categories_frame, 1, 1,
             "Text Steganography",
             "WBStego4Open",
-            lambda: TextStegoWindow(self.root)
+            lambda: self.open_category("text")
         )
         
         # ADS Tools
@@ -142,7 +193,7 @@ class SteganographyToolkit:
             categories_frame, 2, 0,
             "ADS Tools",
             "ADS Viewer",
-            lambda: ADSToolsWindow(self.root)
+            lambda: self.open_category("ads")
         )
         
         # Hex/Binary Stego
@@ -150,7 +201,7 @@ class SteganographyToolkit:
             categories_frame, 2, 1,
             "Hex/Binary Steganography",
             "HxD",
-            lambda: HexStegoWindow(self.root)
+            lambda: self.open_category("hex")
         )
         
         # Footer
@@ -198,15 +249,68 @@ class SteganographyToolkit:
         )
         open_button.grid(row=2, column=0, pady=(0, 15))
     
+    def open_category(self, key):
+        """Open a category window, importing its module on first use"""
+        mod_name, class_name = TOOL_WINDOWS[key]
+        start = time.perf_counter()
+        try:
+            window_class = load_tool_window(mod_name, class_name)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load {mod_name}:\n{e}")
+            return None
+        loaded = time.perf_counter()
+        window = window_class(self.root)
+        if timer.enabled:
+            timer.report_open(mod_name, (loaded - start) * 1000, (time.perf_counter() - loaded) * 1000)
+        return window
+    
     def exit_application(self):
         """Exit the steganography application"""
         if messagebox.askokcancel("Exit", "Are you sure you want to exit the Steganography Toolkit?"):
             self.root.quit()
 
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Steganography Toolkit")
+    parser.add_argument("--startup-timing", action="store_true",
+                        help="print import and first-paint timings to stderr")
+    parser.add_argument("--quit-after-startup", action="store_true",
+                        help="exit as soon as the main window has been drawn")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    timer.enabled = args.startup_timing or bool(os.environ.get("STEGO_TOOLKIT_TIMING"))
+    
+    # Locate the external tools in the background while the window comes up
+    try:
+        from tools.registry import get_registry
+        get_registry().start()
+    except ImportError:
+        pass
+    timer.mark("tool registry started")
+    
     root = tk.Tk()
+    timer.mark("Tk root created")
     app = SteganographyToolkit(root)
+    timer.mark("main window built")
+    
+    def on_map(event):
+        # <Map> reaches the root binding for every child; wait for the root
+        # itself, then for the redraw queued behind it
+        if event.widget is root:
+            root.unbind("<Map>", map_binding)
+            root.after_idle(on_first_paint)
+    
+    def on_first_paint():
+        timer.mark("first paint")
+        if timer.enabled:
+            timer.report()
+        if args.quit_after_startup:
+            root.destroy()
+    
+    map_binding = root.bind("<Map>", on_map)
     root.mainloop()
 
 
@@ -69,17 +69,27 @@
 #include "stego.h"
 #include "tools.h"
 
-#define STEGO_BUFFER_SIZE 5  /* Buffer size in bytes */
+#define STEGO_MASK_SIZE 512  /* Selection mask chunk in bytes when the   */
+                             /* number of positions is not known upfront */
+#define STEGO_FRAME_SIZE 4096 /* Initial size of the extracted frame     */
+
+struct STEGO_CONTEXT
+{
+    PRNG_STATE     prng;       /* Embed/skip decisions                   */
+    int            bEmbed;     /* Hiding (1) or extracting (0)           */
+    unsigned char *pFrame;     /* Header + compressed and encrypted data */
+    size_t         nFrame;     /* Bytes allocated in pFrame              */
+    size_t         nFrameBit;  /* Next bit of pFrame to hide or extract  */
+    size_t         nFrameSize; /* Bytes in the complete frame, 0 while   */
+                               /* the header is still being extracted    */
+    unsigned char *pMask;      /* Packed embed/skip decisions            */
+    size_t         nMaskBits;  /* Number of positions in pMask           */
+    size_t         nMaskIndex; /* Next position to read in pMask         */
+};
 
-static FILE *fEmbeddedText = NULL;     /* File containing the hidden data */
-static unsigned char *pBuffer = NULL;  /* Buffer                          */
-static char pszTemp[256];              /* Name of temporary file that will*/
-                                       /* be read or written by the stego */
 char pszPassPhrase[MAX_LEN];           /* Passphrase for encryption and   */
                                        /* bit selection                   */
-static size_t nBufferIndex = 0;        /* Byte index within the buffer    */
-static size_t lData = 0;               /* Length of hidden data after     */
-                                       /* compression and encryption      */
+static STEGO_CONTEXT *pContext = NULL; /* Context of the per-bit functions*/
 
 /* STEGO */
 #if defined(_DEBUG)
@@ -88,14 +98,416 @@ extern FILE *fEmbedded = NULL;
 #endif
 /* STEGO */
 
+/*---------------------------------------------------------------------------
+ * Compress and encrypt nData bytes and frame them for embedding: a
+ * STEGO_HEADER_SIZE-byte little-endian length followed by the data.
+ * The frame is hidden bit by bit, least significant bit first.
+ * Returns a malloc'ed frame and its length in *pnFrame.
+ *---------------------------------------------------------------------------
+ */
+unsigned char *StegoEmbedBuffer(const unsigned char *pData, size_t nData,
+                                const char *pszPass, size_t *pnFrame)
+{
+    unsigned char *pBody, *pOut;
+    size_t nBody, i;
+
+    pBody = CompressEncryptBuffer(pData, nData, pszPass, 1, &nBody);
+
+    if ((pOut = (unsigned char *)malloc(STEGO_HEADER_SIZE + nBody)) == NULL)
+        ERROR("StegoEmbedBuffer: not enough memory");
+    for (i = 0; i < STEGO_HEADER_SIZE; i++)
+        pOut[i] = (unsigned char)((nBody >> (8 * i)) & 0xff);
+    memcpy(pOut + STEGO_HEADER_SIZE, pBody, nBody);
+    free(pBody);
+
+    *pnFrame = STEGO_HEADER_SIZE + nBody;
+    return pOut;
+}
+
+/*---------------------------------------------------------------------------
+ * Reverse of StegoEmbedBuffer: check the frame header, decrypt and
+ * uncompress. A frame shorter than its header says (the carrier ended
+ * early) is decoded as far as it goes.
+ * Returns the malloc'ed hidden data and its length in *pnData.
+ *---------------------------------------------------------------------------
+ */
+unsigned char *StegoExtractBuffer(const unsigned char *pIn, size_t nIn,
+                                  const char *pszPass, size_t *pnData)
+{
+    size_t nBody = 0, i;
+
+    if (nIn < STEGO_HEADER_SIZE)
+        ERROR("StegoExtractBuffer: no hidden data found.");
+
+    for (i = 0; i < STEGO_HEADER_SIZE; i++)
+        nBody |= (size_t)pIn[i] << (8 * i);
+    if (nBody > nIn - STEGO_HEADER_SIZE)
+        nBody = nIn - STEGO_HEADER_SIZE;
+
+    return CompressEncryptBuffer(pIn + STEGO_HEADER_SIZE, nBody, pszPass, 0, pnData);
+}
+
+/*---------------------------------------------------------------------------
+ * Nibble tables for moving hidden bits between a selection and a packed
+ * run of bits, four carrier positions at a time
+ *---------------------------------------------------------------------------
+ */
+/* Number of selected positions in a nibble */
+static const unsigned char pSelected4[16] =
+    {0, 1, 1, 2, 1, 2, 2, 3, 1, 2, 2, 3, 2, 3, 3, 4};
+
+/* pDeposit4[select][bits]: the low bits of 'bits' spread on 'select' */
+static const unsigned char pDeposit4[16][16] =
+{
+    { 0,  0,  0,  0,  0,  0,  0,  0,  0,  0,  0,  0,  0,  0,  0,  0},
+    { 0,  1,  0,  1,  0,  1,  0,  1,  0,  1,  0,  1,  0,  1,  0,  1},
+    { 0,  2,  0,  2,  0,  2,  0,  2,  0,  2,  0,  2,  0,  2,  0,  2},
+    { 0,  1,  2,  3,  0,  1,  2,  3,  0,  1,  2,  3,  0,  1,  2,  3},
+    { 0,  4,  0,  4,  0,  4,  0,  4,  0,  4,  0,  4,  0,  4,  0,  4},
+    { 0,  1,  4,  5,  0,  1,  4,  5,  0,  1,  4,  5,  0,  1,  4,  5},
+    { 0,  2,  4,  6,  0,  2,  4,  6,  0,  2,  4,  6,  0,  2,  4,  6},
+    { 0,  1,  2,  3,  4,  5,  6,  7,  0,  1,  2,  3,  4,  5,  6,  7},
+    { 0,  8,  0,  8,  0,  8,  0,  8,  0,  8,  0,  8,  0,  8,  0,  8},
+    { 0,  1,  8,  9,  0,  1,  8,  9,  0,  1,  8,  9,  0,  1,  8,  9},
+    { 0,  2,  8, 10,  0,  2,  8, 10,  0,  2,  8, 10,  0,  2,  8, 10},
+    { 0,  1,  2,  3,  8,  9, 10, 11,  0,  1,  2,  3,  8,  9, 10, 11},
+    { 0,  4,  8, 12,  0,  4,  8, 12,  0,  4,  8, 12,  0,  4,  8, 12},
+    { 0,  1,  4,  5,  8,  9, 12, 13,  0,  1,  4,  5,  8,  9, 12, 13},
+    { 0,  2,  4,  6,  8, 10, 12, 14,  0,  2,  4,  6,  8, 10, 12, 14},
+    { 0,  1,  2,  3,  4,  5,  6,  7,  8,  9, 10, 11, 12, 13, 14, 15}
+};
+
+/* pGather4[select][bits]: the bits of 'bits' under 'select', packed */
+static const unsigned char pGather4[16][16] =
+{
+    { 0,  0,  0,  0,  0,  0,  0,  0,  0,  0,  0,  0,  0,  0,  0,  0},
+    { 0,  1,  0,  1,  0,  1,  0,  1,  0,  1,  0,  1,  0,  1,  0,  1},
+    { 0,  0,  1,  1,  0,  0,  1,  1,  0,  0,  1,  1,  0,  0,  1,  1},
+    { 0,  1,  2,  3,  0,  1,  2,  3,  0,  1,  2,  3,  0,  1,  2,  3},
+    { 0,  0,  0,  0,  1,  1,  1,  1,  0,  0,  0,  0,  1,  1,  1,  1},
+    { 0,  1,  0,  1,  2,  3,  2,  3,  0,  1,  0,  1,  2,  3,  2,  3},
+    { 0,  0,  1,  1,  2,  2,  3,  3,  0,  0,  1,  1,  2,  2,  3,  3},
+    { 0,  1,  2,  3,  4,  5,  6,  7,  0,  1,  2,  3,  4,  5,  6,  7},
+    { 0,  0,  0,  0,  0,  0,  0,  0,  1,  1,  1,  1,  1,  1,  1,  1},
+    { 0,  1,  0,  1,  0,  1,  0,  1,  2,  3,  2,  3,  2,  3,  2,  3},
+    { 0,  0,  1,  1,  0,  0,  1,  1,  2,  2,  3,  3,  2,  2,  3,  3},
+    { 0,  1,  2,  3,  0,  1,  2,  3,  4,  5,  6,  7,  4,  5,  6,  7},
+    { 0,  0,  0,  0,  1,  1,  1,  1,  2,  2,  2,  2,  3,  3,  3,  3},
+    { 0,  1,  0,  1,  2,  3,  2,  3,  4,  5,  4,  5,  6,  7,  6,  7},
+    { 0,  0,  1,  1,  2,  2,  3,  3,  4,  4,  5,  5,  6,  6,  7,  7},
+    { 0,  1,  2,  3,  4,  5,  6,  7,  8,  9, 10, 11, 12, 13, 14, 15}
+};
+
+/*---------------------------------------------------------------------------
+ * Read or OR in n <= STEGO_WORD_BITS bits of a packed array, starting at
+ * bit i (LSB first within each byte). Only the bytes holding those bits
+ * are touched.
+ *---------------------------------------------------------------------------
+ */
+static STEGO_WORD GetBits(const unsigned char *p, size_t i, size_t n)
+{
+    STEGO_WORD w;
+    size_t nGot;
+
+    p += i >> 3;
+    w = (STEGO_WORD)(*p++ >> (i & 7));
+    for (nGot = 8 - (i & 7); nGot < n; nGot += 8)
+        w |= (STEGO_WORD)*p++ << nGot;
+
+    if (n < STEGO_WORD_BITS)
+        w &= ((STEGO_WORD)1 << n) - 1;
+    return w;
+}
+
+static void PutBits(unsigned char *p, size_t i, size_t n, STEGO_WORD w)
+{
+    size_t nDone;
+
+    p += i >> 3;
+    *p++ |= (unsigned char)(w << (i & 7));
+    for (nDone = 8 - (i & 7); nDone < n; nDone += 8)
+        *p++ |= (unsigned char)(w >> nDone);
+}
+
+/*---------------------------------------------------------------------------
+ * The embed/skip decisions for the next nPositions positions. The
+ * encoder's mask covers every usable position; past its end nothing is
+ * selected. The decoder does not know how many positions it needs, so
+ * its mask is refilled STEGO_MASK_SIZE bytes at a time.
+ *---------------------------------------------------------------------------
+ */
+static STEGO_WORD NextMaskBits(STEGO_CONTEXT *pCtx, size_t nPositions)
+{
+    STEGO_WORD w = 0;
+    size_t nGot = 0, n;
+
+    while (nGot < nPositions)
+    {
+        if (pCtx->nMaskIndex == pCtx->nMaskBits)
+        {
+            if (pCtx->bEmbed)
+                break;
+            pCtx->nMaskBits = STEGO_MASK_SIZE * 8;
+            pCtx->nMaskIndex = 0;
+            FillPseudoRandomMask(&pCtx->prng, pCtx->pMask, pCtx->nMaskBits);
+        }
+        n = pCtx->nMaskBits - pCtx->nMaskIndex;
+        if (n > nPositions - nGot)
+            n = nPositions - nGot;
+        w |= GetBits(pCtx->pMask, pCtx->nMaskIndex, n) << nGot;
+        pCtx->nMaskIndex += n;
+        nGot += n;
+    }
+
+    return w;
+}
+
+/* Number of frame bits still to hide or extract, capped to nMax */
+static size_t FrameBitsLeft(const STEGO_CONTEXT *pCtx, size_t nMax)
+{
+    size_t nBytes;
+
+    if (pCtx->nFrameSize == 0) /* header not extracted yet */
+    {
+        nBytes = STEGO_HEADER_SIZE * 8 - pCtx->nFrameBit;
+        return (nBytes < nMax) ? nBytes : nMax;
+    }
+
+    nBytes = pCtx->nFrameSize - (pCtx->nFrameBit >> 3);
+    if (nBytes > nMax / 8 + 1)
+        return nMax;
+    nBytes = nBytes * 8 - (pCtx->nFrameBit & 7);
+    return (nBytes < nMax) ? nBytes : nMax;
+}
+
+/*---------------------------------------------------------------------------
+ * Create a context that hides nData bytes in at most nMaxHiddenBits
+ * carrier positions. Returns NULL if the data does not fit.
+ *---------------------------------------------------------------------------
+ */
+STEGO_CONTEXT *StegoCreateEmbedContext(const unsigned char *pData, size_t nData,
+                                       const char *pszPass, size_t nMaxHiddenBits)
+{
+    STEGO_CONTEXT *pCtx;
+    size_t nEmbed;
+
+    if ((pCtx = (STEGO_CONTEXT *)calloc(1, sizeof(STEGO_CONTEXT))) == NULL)
+        ERROR("StegoCreateEmbedContext: not enough memory");
+    pCtx->bEmbed = 1;
+    pCtx->pFrame = StegoEmbedBuffer(pData, nData, pszPass, &pCtx->nFrame);
+    pCtx->nFrameSize = pCtx->nFrame;
+
+    /* One mask covers every position the encoder can use: it gives the */
+    /* capacity here and the embed/skip decisions in StegoGetNextBits   */
+    pCtx->nMaskBits = nMaxHiddenBits;
+    if ((pCtx->pMask = (unsigned char *)malloc((nMaxHiddenBits + 7) / 8 + 1)) == NULL)
+        ERROR("StegoCreateEmbedContext: not enough memory");
+    ResetPseudoRandomState(&pCtx->prng, pszPass);
+    nEmbed = FillPseudoRandomMask(&pCtx->prng, pCtx->pMask, pCtx->nMaskBits);
+
+    if (nEmbed < pCtx->nFrame * 8)
+    {
+        StegoFreeContext(pCtx);
+        return NULL;
+    }
+    return pCtx;
+}
+
+/*---------------------------------------------------------------------------
+ * Hidden bits for the next nPositions carrier positions. Bit i of
+ * *pSelect is set when position i carries a hidden bit, whose value is
+ * bit i of the result; the other result bits are 0.
+ *---------------------------------------------------------------------------
+ */
+STEGO_WORD StegoGetNextBits(STEGO_CONTEXT *pCtx, int nPositions, STEGO_WORD *pSelect)
+{
+    STEGO_WORD select, rest, low, src, bits = 0;
+    size_t nLeft, n = 0, j;
+    int nibble;
+
+    *pSelect = 0;
+    if ((nLeft = FrameBitsLeft(pCtx, STEGO_WORD_BITS)) == 0)
+        return 0;
+
+    select = NextMaskBits(pCtx, (size_t)nPositions);
+    src = GetBits(pCtx->pFrame, pCtx->nFrameBit, nLeft);
+
+    if (nLeft < STEGO_WORD_BITS)
+    {
+        /* End of the frame: only the first nLeft positions are used */
+        rest = select;
+        for (select = 0; rest && (n < nLeft); n++)
+        {
+            low = rest & (~rest + 1);
+            select |= low;
+            rest ^= low;
+        }
+        n = 0;
+    }
+
+    /* Deposit the frame bits, in order, on the selected positions */
+    for (j = 0, rest = select; rest; j += 4, rest >>= 4)
+    {
+        nibble = (int)(rest & 0xf);
+        bits |= (STEGO_WORD)pDeposit4[nibble][src & 0xf] << j;
+        src >>= pSelected4[nibble];
+        n += pSelected4[nibble];
+    }
+
+    pCtx->nFrameBit += n;
+    *pSelect = select;
+    return bits;
+}
+
+/*---------------------------------------------------------------------------
+ * Create a context that extracts hidden data
+ *---------------------------------------------------------------------------
+ */
+STEGO_CONTEXT *StegoCreateExtractContext(const char *pszPass)
+{
+    STEGO_CONTEXT *pCtx;
+
+    if ((pCtx = (STEGO_CONTEXT *)calloc(1, sizeof(STEGO_CONTEXT))) == NULL)
+        ERROR("StegoCreateExtractContext: not enough memory\n");
+    pCtx->bEmbed = 0;
+    ResetPseudoRandomState(&pCtx->prng, pszPass);
+
+    /* The payload length is unknown until the header is extracted, so */
+    /* the mask is produced in chunks and the frame grows as bits      */
+    /* arrive: a bogus header (wrong passphrase) does not make us      */
+    /* allocate gigabytes upfront                                      */
+    if ((pCtx->pMask = (unsigned char *)malloc(STEGO_MASK_SIZE)) == NULL)
+        ERROR("StegoCreateExtractContext: not enough memory\n");
+    pCtx->nFrame = STEGO_FRAME_SIZE;
+    if ((pCtx->pFrame = (unsigned char *)calloc(pCtx->nFrame, 1)) == NULL)
+        ERROR("StegoCreateExtractContext: not enough memory\n");
+
+    return pCtx;
+}
+
+/*---------------------------------------------------------------------------
+ * Take the carrier bits of the next nPositions positions (bit i for
+ * position i) and append those selected by the random bit generator
+ * to the frame
+ *---------------------------------------------------------------------------
+ */
+void StegoSaveHiddenBits(STEGO_CONTEXT *pCtx, int nPositions, STEGO_WORD bits)
+{
+    STEGO_WORD rest, src = 0;
+    size_t k = 0, n, i, j;
+    int nibble;
+
+    if (StegoIsComplete(pCtx))
+        return;
+
+    /* Gather the bits at the selected positions */
+    rest = NextMaskBits(pCtx, (size_t)nPositions);
+    for (j = 0; rest; j += 4, rest >>= 4)
+    {
+        nibble = (int)(rest & 0xf);
+        src |= (STEGO_WORD)pGather4[nibble][(bits >> j) & 0xf] << k;
+        k += pSelected4[nibble];
+    }
+
+    while ((k > 0) && !StegoIsComplete(pCtx))
+    {
+        n = FrameBitsLeft(pCtx, k);
+
+        while ((pCtx->nFrameBit + n + 7) / 8 > pCtx->nFrame)
+        {
+            /* Frame is full */
+            if ((pCtx->pFrame = (unsigned char *)realloc(pCtx->pFrame, 2 * pCtx->nFrame)) == NULL)
+                ERROR("SaveHiddenBit: not enough memory\n");
+            memset(pCtx->pFrame + pCtx->nFrame, 0, pCtx->nFrame);
+            pCtx->nFrame *= 2;
+        }
+
+        PutBits(pCtx->pFrame, pCtx->nFrameBit, n,
+                (n < STEGO_WORD_BITS) ? (src & (((STEGO_WORD)1 << n) - 1)) : src);
+        pCtx->nFrameBit += n;
+        src = (n < STEGO_WORD_BITS) ? (src >> n) : 0;
+        k -= n;
+
+        if ((pCtx->nFrameSize == 0) && (pCtx->nFrameBit == STEGO_HEADER_SIZE * 8))
+        {
+            for (i = 0; i < STEGO_HEADER_SIZE; i++)
+                pCtx->nFrameSize |= (size_t)pCtx->pFrame[i] << (8 * i);
+            pCtx->nFrameSize += STEGO_HEADER_SIZE;
+        }
+    }
+}
+
+/*---------------------------------------------------------------------------
+ * Decrypt and uncompress what an extraction context collected
+ *---------------------------------------------------------------------------
+ */
+unsigned char *StegoGetExtractedData(STEGO_CONTEXT *pCtx, size_t *pnData)
+{
+    return StegoExtractBuffer(pCtx->pFrame, pCtx->nFrameBit / 8, pCtx->prng.pszPass, pnData);
+}
+
+/*---------------------------------------------------------------------------
+ * Whether the whole frame has been hidden or extracted
+ *---------------------------------------------------------------------------
+ */
+int StegoIsComplete(const STEGO_CONTEXT *pCtx)
+{
+    return (pCtx->nFrameSize != 0) && ((pCtx->nFrameBit & 7) == 0) &&
+           ((pCtx->nFrameBit >> 3) == pCtx->nFrameSize);
+}
+
+/*---------------------------------------------------------------------------
+ * Release a context and wipe its key material
+ *---------------------------------------------------------------------------
+ */
+void StegoFreeContext(STEGO_CONTEXT *pCtx)
+{
+    if (pCtx == NULL)
+        return;
+
+    if (pCtx->pFrame)
+    {
+        memset(pCtx->pFrame, 0, pCtx->nFrame);
+        free(pCtx->pFrame);
+    }
+    if (pCtx->pMask) free(pCtx->pMask);
+    memset(pCtx, 0, sizeof(STEGO_CONTEXT));
+    free(pCtx);
+}
+
+/*---------------------------------------------------------------------------
+ * Read a whole file into memory
+ *---------------------------------------------------------------------------
+ */
+static unsigned char *ReadWholeFile(const char *pszFileName, size_t *pnSize)
+{
+    FILE *f;
+    unsigned char *p;
+    long lSize;
+
+    if ((f = fopen(pszFileName, "rb")) == NULL)
+        ERROR("StegoOpenEmbeddedText: data file not found.");
+    if ((fseek(f, 0, SEEK_END) != 0) || ((lSize = ftell(f)) < 0) || (fseek(f, 0, SEEK_SET) != 0))
+        ERROR("StegoOpenEmbeddedText: could not determine file size.");
+    if ((p = (unsigned char *)malloc((size_t)lSize + 1)) == NULL)
+        ERROR("StegoOpenEmbeddedText: not enough memory");
+    if (fread(p, 1, (size_t)lSize, f) != (size_t)lSize)
+        ERROR("StegoOpenEmbeddedText: error reading data file");
+    fclose(f);
+
+    *pnSize = (size_t)lSize;
+    return p;
+}
+
 /*---------------------------------------------------------------------------
  * Open the file that contains the data to be hidden, compress it and
- * and encrypt it in a temporary file
+ * and encrypt it in memory
  *---------------------------------------------------------------------------
  */
 void StegoOpenEmbeddedText(char *pszFileName, size_t nMaxHiddenBits)
 {
-    size_t nEmbed = 0, nDontEmbed = 0, nRandomBits = 0;
+    unsigned char *pData;
+    size_t nData;
 
 #if defined(_DEBUG)
     fEmbedded = fopen("Embedded_bits.txt", "wb");
@@ -103,27 +515,14 @@ void StegoOpenEmbeddedText(char *pszFileName, size_t nMaxHiddenBits)
    
     strcpy(pszPassPhrase, ReadPassPhrase());
 
-    GetTemporaryFileName(pszTemp);
+    pData = ReadWholeFile(pszFileName, &nData);
+    pContext = StegoCreateEmbedContext(pData, nData, pszPassPhrase, nMaxHiddenBits);
+    memset(pData, 0, nData);
+    free(pData);
 
-    lData = CompressEncryptFile(pszFileName, pszTemp, pszPassPhrase, 1);
-
-    GetPseudoRandomBit(RESET);
-    while (nEmbed < ((lData * 8) + 32))
-    {
-        if (GetPseudoRandomBit(NEXT) == EMBED)
-            nEmbed++;
-        else
-            nDontEmbed++;
-    }
-    nRandomBits = nEmbed + nDontEmbed;
-    GetPseudoRandomBit(RESET);
-
-    if (nRandomBits > nMaxHiddenBits)
+    if (pContext == NULL)
         ERROR("StegoOpenEmbeddedText: data file too long. You can hide roughly %d bits.", nMaxHiddenBits);
 
-	if ((fEmbeddedText = fopen(pszTemp, "rb")) == NULL)
-        ERROR("StegoOpenEmbeddedText: data file not found.");
-
 #if defined(_DEBUG)
     printf("\n\n");
 #endif
@@ -136,72 +535,27 @@ void StegoOpenEmbeddedText(char *pszFileName, size_t nMaxHiddenBits)
  */
 int StegoGetNextBit()
 {
-	unsigned char *p;
-	static int bNeedMoreData = 1, bFinished = 0, bEOF = 0, bBody = 0;
-	static size_t nBufferIndex, maxBufferIndex, nBitIndex;
-	size_t nRead;
 	int bit;
-	
-	if (fEmbeddedText)
-	{
-		if (bFinished)
-			return 2;
-        if (GetPseudoRandomBit(NEXT) != EMBED)
-            return 2;
-		if (pBuffer == NULL)
-		{
-			pBuffer = (unsigned char *)malloc(STEGO_BUFFER_SIZE);
-			if (pBuffer == NULL)
-                ERROR("StegoGetNextBit: not enough memory");
-            memset(pBuffer, 0, STEGO_BUFFER_SIZE);
-		}
-        if (bBody == 0)
-        {
-            bBody = 1;
-            memcpy(pBuffer, &lData, sizeof(lData));
-            nRead = sizeof(lData);
-            maxBufferIndex = nRead - 1;
-            bNeedMoreData = 0;
-        }
-        if (bNeedMoreData)
-		{
-			nRead = fread(pBuffer, 1, STEGO_BUFFER_SIZE, fEmbeddedText);
-			bEOF = feof(fEmbeddedText);
-			if ((nRead < STEGO_BUFFER_SIZE) && !bEOF) 
-                ERROR("StegoGetNextBit: error reading data file");
-            if (nRead == 0)
-            {
-                bFinished = 1;
-                return 2;
-            }
-            else
-			    maxBufferIndex = nRead - 1;
-			bNeedMoreData = 0;
-		}
-		p = pBuffer + nBufferIndex;
-		bit = (int)((*p >> nBitIndex) & 0x1);
-		nBitIndex = (nBitIndex + 1) % 8;
-		if (nBitIndex == 0)
-		{
-			nBufferIndex = (nBufferIndex + 1) % (maxBufferIndex + 1);
-			if (nBufferIndex == 0)
-			{
-				if (bEOF) /* then ther's no more data to embedd */
-					bFinished = 1;
-				else
-					bNeedMoreData = 1;
-			}
-		}
+
+	if ((pContext == NULL) || StegoIsComplete(pContext) ||
+	    (pContext->nMaskIndex >= pContext->nMaskBits))
+		return 2;
+
+	bit = MASK_BIT(pContext->pMask, pContext->nMaskIndex);
+	pContext->nMaskIndex++;
+	if (!bit)
+		return 2;
+
+	bit = MASK_BIT(pContext->pFrame, pContext->nFrameBit);
+	pContext->nFrameBit++;
 #if defined(_DEBUG)
        fwrite(&bit, 1, 1, fEmbedded);
 #endif
-		return bit;
-	}
-	return 2;
+	return bit;
 }
 
 /*---------------------------------------------------------------------------
- * Close the compressed & encrypted data file and delete it                  
+ * Release the compressed & encrypted data
  *---------------------------------------------------------------------------
  */
 void StegoCloseEmbeddedText()
@@ -210,12 +564,10 @@ void StegoCloseEmbeddedText()
        fclose(fEmbedded);
 #endif
 
-    if (fclose(fEmbeddedText) != 0) ERROR("Data file not closed properly.");
-
     /* Tidy */
-    if (pBuffer) free(pBuffer);
+    StegoFreeContext(pContext);
+    pContext = NULL;
     memset(pszPassPhrase, 0, strlen(pszPassPhrase));
-    remove(pszTemp);
 }
 
 
@@ -229,73 +581,34 @@ void StegoCreateEmbeddedText()
     fEmbedded = fopen("Extracted_bits.txt", "wb");
 #endif
     strcpy(pszPassPhrase, ReadPassPhrase());
-    GetPseudoRandomBit(RESET);
-    GetTemporaryFileName(pszTemp);
-    if ((fEmbeddedText = fopen(pszTemp, "wb")) == NULL)
-        ERROR("StegoCreateEmbeddedText: could not create data file.\n");
+    pContext = StegoCreateExtractContext(pszPassPhrase);
 }
 
 /*---------------------------------------------------------------------------
- * Append new extracted bit to temporary file if this bit is selected
+ * Append new extracted bit to the frame if this bit is selected
  * by the pseudo random bit generator
  *---------------------------------------------------------------------------
  */
 void SaveHiddenBit(int bit)
 {
-	unsigned char *p;
-	static int bFinished = 0, bBody = 0;
-	static size_t nBitIndex;
-	size_t nWritten;
-    static size_t nSaved = 0;
+#if defined(_DEBUG)
+	size_t nBefore;
+#endif
+
+	if (pContext == NULL)
+		return;
 
-	if (fEmbeddedText && !bFinished && (GetPseudoRandomBit(NEXT) == EMBED))
-	{
 #if defined(_DEBUG)
+	nBefore = pContext->nFrameBit;
+#endif
+	StegoSaveHiddenBits(pContext, 1, (STEGO_WORD)(bit != 0));
+#if defined(_DEBUG)
+	if (pContext->nFrameBit != nBefore)
+	{
         printf("%d", bit);
         fwrite(&bit, 1, 1, fEmbedded);
-#endif
-		if (pBuffer == NULL)
-		{
-			pBuffer = (unsigned char *)malloc(STEGO_BUFFER_SIZE);
-			if (pBuffer == NULL)
-                ERROR("SaveHiddenBit: not enough memory\n");
-			memset(pBuffer, 0, STEGO_BUFFER_SIZE);
-		}
-        
-        if (bBody)
-            if (++nSaved == (lData * 8))
-                bFinished = 1;
-
-		p = pBuffer + nBufferIndex;
-		if (bit) *p |= (1 << nBitIndex);
-		nBitIndex = (nBitIndex + 1) % 8;
-
-		if (nBitIndex == 0)
-		{
-    		nBufferIndex = (nBufferIndex + 1) % STEGO_BUFFER_SIZE;
-            if (bBody)
-            {
-                if (nBufferIndex == 0)
-                {
-                    /* Buffer is full */
-			        nWritten = fwrite(pBuffer, 1, STEGO_BUFFER_SIZE, fEmbeddedText);
-			        if (nWritten != STEGO_BUFFER_SIZE)
-                        ERROR("SaveHiddenBit: error writting data file\n");
-			        memset(pBuffer, 0, STEGO_BUFFER_SIZE);
-                }
-            }
-            else
-            {
-                if (nBufferIndex == sizeof(lData))
-                {
-                    memcpy(&lData, pBuffer, sizeof(lData));
-                    memset(pBuffer, 0, STEGO_BUFFER_SIZE);
-                    bBody = 1;
-                    nBufferIndex = nBitIndex = 0;
-                }
-            }
-		}
 	}
+#endif
 }
 
 /*---------------------------------------------------------------------------
@@ -304,21 +617,30 @@ void SaveHiddenBit(int bit)
  */
 void StegoFlushEmbeddedText(char *pszFileName)
 {
+	FILE *fOut;
+	unsigned char *pData;
+	size_t nData;
+
 #if defined(_DEBUG)
        fclose(fEmbedded);
 #endif
 
-	if (fEmbeddedText)
+	if (pContext)
 	{
-		fwrite(pBuffer, 1, nBufferIndex, fEmbeddedText);
-		if (fclose(fEmbeddedText) != 0)
+		pData = StegoGetExtractedData(pContext, &nData);
+
+		if ((fOut = fopen(pszFileName, "wb")) == NULL)
+            ERROR("StegoFlushEmbeddedText: could not create data file.\n");
+		if (fwrite(pData, 1, nData, fOut) != nData)
+            ERROR("StegoFlushEmbeddedText: error writting data file\n");
+		if (fclose(fOut) != 0)
             ERROR("StegoFlushEmbeddedText: data file not closed properly.\n");
-                
-        CompressEncryptFile(pszTemp, pszFileName, pszPassPhrase, 0);
 
         /* Tidy */
-        if (pBuffer) free(pBuffer);
+        memset(pData, 0, nData);
+        free(pData);
+        StegoFreeContext(pContext);
+        pContext = NULL;
         memset(pszPassPhrase, 0, strlen(pszPassPhrase));
-        remove(pszTemp);
 	}
 }
@@ -16,6 +16,37 @@ extern FILE *fLog;
 #endif
 
 #define STEGO_VERSION ("1.1.19")
+#define STEGO_HEADER_SIZE (4) /* Little-endian length of the hidden data */
+
+/* Buffer pipeline: compress -> encrypt -> frame, without temporary files */
+unsigned char *StegoEmbedBuffer(const unsigned char *pData, size_t nData,
+                                const char *pszPass, size_t *pnFrame);
+unsigned char *StegoExtractBuffer(const unsigned char *pIn, size_t nIn,
+                                  const char *pszPass, size_t *pnData);
+
+/* Word-at-a-time interface. Each context owns its frame, selection mask */
+/* and random bit generator, so several can run at once (one per thread).*/
+/* Bit i of a STEGO_WORD stands for the i-th carrier position of the     */
+/* call; a call covers 1 to STEGO_WORD_BITS positions.                   */
+#if defined(_WIN32)
+typedef unsigned __int64 STEGO_WORD;
+#else
+typedef unsigned long long STEGO_WORD;
+#endif
+#define STEGO_WORD_BITS (64)
+
+typedef struct STEGO_CONTEXT STEGO_CONTEXT;
+
+STEGO_CONTEXT *StegoCreateEmbedContext(const unsigned char *pData, size_t nData,
+                                       const char *pszPass, size_t nMaxHiddenBits);
+STEGO_WORD StegoGetNextBits(STEGO_CONTEXT *pCtx, int nPositions, STEGO_WORD *pSelect);
+
+STEGO_CONTEXT *StegoCreateExtractContext(const char *pszPass);
+void StegoSaveHiddenBits(STEGO_CONTEXT *pCtx, int nPositions, STEGO_WORD bits);
+unsigned char *StegoGetExtractedData(STEGO_CONTEXT *pCtx, size_t *pnData);
+
+int  StegoIsComplete(const STEGO_CONTEXT *pCtx);
+void StegoFreeContext(STEGO_CONTEXT *pCtx);
 
 /* Encoding */
 void StegoOpenEmbeddedText(char *pszFileName, size_t nMaxHiddenBits);
@@ -0,0 +1,179 @@
+/*---------------------------------------------------------------------------
+ *
+ * PURPOSE		Micro-benchmark of the per-bit interface (StegoGetNextBit /
+ *              SaveHiddenBit) against the word-at-a-time context interface
+ *              (StegoGetNextBits / StegoSaveHiddenBits). Not part of the
+ *              library; build it next to StegoLib, e.g.
+ *
+ *                cl /O2 stego_bench.c stego.c tools.c sha.c error.c
+ *                   des_enc.c ede_enc.c set_key.c GZLib.lib
+ *
+ *              Usage: stego_bench [payload bytes] [passphrase]
+ *
+ *---------------------------------------------------------------------------
+ */
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+
+#include "stego.h"
+
+#define BENCH_DATA_FILE  ("stego_bench.dat")
+#define BENCH_OUT_FILE   ("stego_bench.out")
+
+char *pszPassword;   /* Read by ReadPassPhrase */
+
+static double Seconds(clock_t start)
+{
+    return (double)(clock() - start) / CLOCKS_PER_SEC;
+}
+
+static void Report(const char *pszName, size_t nPositions, double t)
+{
+    printf("  %-28s %8.3f s  %8.1f Mpositions/s\n", pszName, t,
+           t > 0 ? nPositions / t / 1e6 : 0.0);
+}
+
+/* Carrier parity of the positions that hide nothing: anything will do */
+static int Filler(size_t i)
+{
+    return (int)((i * 2654435761u) >> 31) & 0x1;
+}
+
+int main(int argc, char **argv)
+{
+    size_t nData = (argc > 1) ? (size_t)atol(argv[1]) : 256 * 1024;
+    size_t nPositions, i, nOut;
+    unsigned char *pData, *pCarrier, *pOut;
+    STEGO_WORD *pWords, *pSelect, select;
+    STEGO_CONTEXT *pCtx, *pCtx2;
+    int nWidth;
+    clock_t start;
+    FILE *f;
+
+    pszPassword = (argc > 2) ? argv[2] : "benchmark";
+
+    /* Incompressible payload, so the frame is about as big as the data */
+    pData = (unsigned char *)malloc(nData);
+    srand(1);
+    for (i = 0; i < nData; i++)
+        pData[i] = (unsigned char)(rand() & 0xff);
+    f = fopen(BENCH_DATA_FILE, "wb");
+    fwrite(pData, 1, nData, f);
+    fclose(f);
+
+    /* About 60% of the positions are selected; leave some slack */
+    nPositions = (nData + 64) * 8 * 2;
+    nPositions = (nPositions + STEGO_WORD_BITS - 1) / STEGO_WORD_BITS * STEGO_WORD_BITS;
+    pCarrier = (unsigned char *)malloc(nPositions);
+    pWords = (STEGO_WORD *)calloc(nPositions / STEGO_WORD_BITS, sizeof(STEGO_WORD));
+    pSelect = (STEGO_WORD *)calloc(nPositions / STEGO_WORD_BITS, sizeof(STEGO_WORD));
+
+    printf("Payload %lu bytes, %lu carrier positions\n",
+           (unsigned long)nData, (unsigned long)nPositions);
+
+    /* Hiding */
+    printf("Hiding\n");
+    StegoOpenEmbeddedText(BENCH_DATA_FILE, nPositions);
+    start = clock();
+    for (i = 0; i < nPositions; i++)
+        pCarrier[i] = (unsigned char)StegoGetNextBit();
+    Report("StegoGetNextBit", nPositions, Seconds(start));
+    StegoCloseEmbeddedText();
+
+    for (nWidth = 32; nWidth <= STEGO_WORD_BITS; nWidth *= 2)
+    {
+        pCtx = StegoCreateEmbedContext(pData, nData, pszPassword, nPositions);
+        if (pCtx == NULL)
+        {
+            fprintf(stderr, "Payload does not fit\n");
+            return 1;
+        }
+        memset(pSelect, 0, nPositions / 8);
+        start = clock();
+        if (nWidth == STEGO_WORD_BITS)
+            for (i = 0; i < nPositions / STEGO_WORD_BITS; i++)
+                pWords[i] = StegoGetNextBits(pCtx, STEGO_WORD_BITS, &pSelect[i]);
+        else
+            for (i = 0; i < nPositions / STEGO_WORD_BITS; i++)
+            {
+                pWords[i] = StegoGetNextBits(pCtx, 32, &pSelect[i]);
+                pWords[i] |= StegoGetNextBits(pCtx, 32, &select) << 32;
+                pSelect[i] |= select << 32;
+            }
+        Report(nWidth == 32 ? "StegoGetNextBits (32)" : "StegoGetNextBits (64)",
+               nPositions, Seconds(start));
+        StegoFreeContext(pCtx);
+
+        /* Both interfaces must select the same positions. The hidden   */
+        /* bits themselves differ in the last cipher block: the padding */
+        /* is random.                                                   */
+        for (i = 0; i < nPositions; i++)
+            if ((pCarrier[i] != 2) != (int)((pSelect[i / STEGO_WORD_BITS] >> (i % STEGO_WORD_BITS)) & 0x1))
+            {
+                fprintf(stderr, "Mismatch at position %lu\n", (unsigned long)i);
+                return 1;
+            }
+    }
+
+    /* Extracting, from the carrier of the per-bit encoder */
+    memset(pWords, 0, nPositions / 8);
+    for (i = 0; i < nPositions; i++)
+    {
+        if (pCarrier[i] == 2)
+            pCarrier[i] = (unsigned char)Filler(i);
+        pWords[i / STEGO_WORD_BITS] |= (STEGO_WORD)pCarrier[i] << (i % STEGO_WORD_BITS);
+    }
+
+    printf("Extracting\n");
+    StegoCreateEmbeddedText();
+    start = clock();
+    for (i = 0; i < nPositions; i++)
+        SaveHiddenBit(pCarrier[i]);
+    Report("SaveHiddenBit", nPositions, Seconds(start));
+    StegoFlushEmbeddedText(BENCH_OUT_FILE);
+
+    for (nWidth = 32; nWidth <= STEGO_WORD_BITS; nWidth *= 2)
+    {
+        pCtx = StegoCreateExtractContext(pszPassword);
+        start = clock();
+        for (i = 0; (i < nPositions) && !StegoIsComplete(pCtx); i += nWidth)
+            StegoSaveHiddenBits(pCtx, nWidth,
+                pWords[i / STEGO_WORD_BITS] >> (i % STEGO_WORD_BITS));
+        Report(nWidth == 32 ? "StegoSaveHiddenBits (32)" : "StegoSaveHiddenBits (64)",
+               nPositions, Seconds(start));
+        pOut = StegoGetExtractedData(pCtx, &nOut);
+        if ((nOut != nData) || memcmp(pOut, pData, nData))
+        {
+            fprintf(stderr, "Extracted data differs\n");
+            return 1;
+        }
+        free(pOut);
+        StegoFreeContext(pCtx);
+    }
+
+    /* Two contexts interleaved must not disturb each other */
+    pCtx = StegoCreateExtractContext(pszPassword);
+    pCtx2 = StegoCreateExtractContext(pszPassword);
+    for (i = 0; i < nPositions; i += STEGO_WORD_BITS)
+    {
+        StegoSaveHiddenBits(pCtx, STEGO_WORD_BITS, pWords[i / STEGO_WORD_BITS]);
+        StegoSaveHiddenBits(pCtx2, STEGO_WORD_BITS, pWords[i / STEGO_WORD_BITS]);
+    }
+    pOut = StegoGetExtractedData(pCtx2, &nOut);
+    printf("Interleaved contexts: %s\n",
+           ((nOut == nData) && !memcmp(pOut, pData, nData)) ? "ok" : "FAILED");
+    free(pOut);
+    StegoFreeContext(pCtx);
+    StegoFreeContext(pCtx2);
+
+    remove(BENCH_DATA_FILE);
+    remove(BENCH_OUT_FILE);
+    free(pData);
+    free(pCarrier);
+    free(pWords);
+    free(pSelect);
+    return 0;
+}
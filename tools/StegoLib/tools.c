@@ -134,81 +134,181 @@ char *ReadPassPhrase(void)
 
 
 /*---------------------------------------------------------------------------
- * Use the passphrase and SHA-1 to generate pseudo random bits.              
- * Each bit says whether a hidden bit should be embedded or not in the       
- * cover text. A counter is used introduce bias into the bit stream
- * by dropping 1 zero in COUNT_MAX. This increases the bandwidth at
- * the expense of security.
+ * Start a pseudo random bit generator from the passphrase
  *---------------------------------------------------------------------------
  */
-int GetPseudoRandomBit(int cmd)
+void ResetPseudoRandomState(PRNG_STATE *pState, const char *pszPassPhrase)
 {
-    char tmp[MAX_LEN + 20];
-    int  res;
-    static UINT32 hash[5];
-    static int nBlockIndex = 0, nBitIndex = 0, bInit = 1, count = 0;
+    pState->nBlockIndex = 0;
+    pState->nBitIndex = 0;
+    pState->count = 0;
+    memset(pState->pszPass, 0, MAX_LEN);
+    strncpy(pState->pszPass, pszPassPhrase, MAX_LEN - 1);
+    memset(pState->hash, 0, 20);
+    SHA_Memory(pState->pszPass, strlen(pState->pszPass), pState->hash);
+}
 
+/* Move to the next 32-bit word of the hash, re-hashing every 160 bits */
+static void NextPseudoRandomWord(PRNG_STATE *pState)
+{
+    char tmp[MAX_LEN + 20];
+    size_t nPass = strlen(pState->pszPass);
 
-    if (bInit || cmd == RESET)
+    pState->nBitIndex = 0;
+    pState->nBlockIndex = (pState->nBlockIndex + 1) % 5;
+    if (pState->nBlockIndex == 0)
     {
-        nBlockIndex = 0;
-        nBitIndex = 0;
-        count = 0;
+        /* Hash previous hash with password */
         memset(tmp, 0, MAX_LEN + 20);
-        memset(hash, 0, 20);
-        memcpy(tmp, pszPass, strlen(pszPass));
-        SHA_Memory(tmp, strlen(pszPass), hash);
+        memcpy(tmp, pState->hash, 20);
+        memcpy(tmp + 20, pState->pszPass, nPass);
+        SHA_Memory(tmp, 20 + nPass, pState->hash);
         memset(tmp, 0, MAX_LEN + 20);
     }
+}
 
-    if (bInit) bInit = 0;
+/*---------------------------------------------------------------------------
+ * Four raw bits at a time: indexed by the zero count so far and the next
+ * nibble of the hash, the decisions they produce, how many, and the new
+ * zero count
+ *---------------------------------------------------------------------------
+ */
+/* Decisions, LSB first */
+static const unsigned char pMaskBits4[COUNT_MAX][16] =
+{
+    { 0,  1,  2,  3,  4,  5,  6,  7,  4,  9, 10, 11, 12, 13, 14, 15},
+    { 0,  1,  2,  3,  2,  5,  6,  7,  4,  5,  6, 11,  6, 13, 14, 15},
+    { 0,  1,  1,  3,  2,  3,  3,  7,  4,  5,  5,  7,  6,  7,  7, 15}
+};
 
-    switch (cmd)
+/* Number of decisions (skipped zeros give none) */
+static const unsigned char pMaskLength4[COUNT_MAX][16] =
+{
+    { 3,  3,  3,  4,  3,  4,  4,  4,  3,  4,  4,  4,  4,  4,  4,  4},
+    { 3,  3,  3,  3,  3,  3,  3,  4,  3,  3,  3,  4,  3,  4,  4,  4},
+    { 2,  3,  3,  3,  3,  3,  3,  3,  3,  3,  3,  3,  3,  3,  3,  4}
+};
+
+/* Zero count after the nibble */
+static const unsigned char pMaskCount4[COUNT_MAX][16] =
+{
+    { 1,  0,  0,  2,  0,  2,  2,  1,  0,  2,  2,  1,  2,  1,  1,  0},
+    { 2,  1,  1,  0,  1,  0,  0,  2,  1,  0,  0,  2,  0,  2,  2,  1},
+    { 0,  2,  2,  1,  2,  1,  1,  0,  2,  1,  1,  0,  1,  0,  0,  2}
+};
+
+/* Number of ones in a nibble */
+static const unsigned char pSelected4[16] =
+    {0, 1, 1, 2, 1, 2, 2, 3, 1, 2, 2, 3, 2, 3, 3, 4};
+
+/*---------------------------------------------------------------------------
+ * Fill pMask with the next nBits decisions of the pseudo random bit
+ * generator. Bit i of the mask (LSB first within each byte) is set when
+ * position i should carry a hidden bit. The skipped zeros (one in
+ * COUNT_MAX) never reach the mask, so the mask is exactly what nBits calls
+ * to GetPseudoRandomBit(NEXT) would have returned. pMask must hold
+ * (nBits + 7) / 8 bytes. Returns the number of EMBED positions.
+ *---------------------------------------------------------------------------
+ */
+size_t FillPseudoRandomMask(PRNG_STATE *pState, unsigned char *pMask, size_t nBits)
+{
+    size_t i = 0, nEmbed = 0, nShift;
+    UINT32 word;
+    int nibble, len;
+
+    memset(pMask, 0, (nBits + 7) / 8);
+    while (i < nBits)
     {
-    case RESET: /* Restart the random bit generator */
-        return DO_NOTHING;
+        word = pState->hash[pState->nBlockIndex] >> pState->nBitIndex;
 
-    case NEXT: /* The next bit: EMBED, DONT_EMBED or DO_NOTHING */
-        if ((hash[nBlockIndex] >> nBitIndex) & 0x1)
-            res = EMBED;
-        else
+        /* Whole nibbles while at least 4 decisions are still wanted */
+        if ((pState->nBitIndex & 3) == 0)
         {
-            count++;
-            res = DONT_EMBED;
+            for (; (pState->nBitIndex < 32) && (nBits - i >= 4); pState->nBitIndex += 4, word >>= 4)
+            {
+                nibble = (int)(word & 0xf);
+                len = pMaskLength4[pState->count][nibble];
+                nShift = i & 7;
+                pMask[i >> 3] |= (unsigned char)(pMaskBits4[pState->count][nibble] << nShift);
+                if (nShift + len > 8)
+                    pMask[(i >> 3) + 1] |= (unsigned char)(pMaskBits4[pState->count][nibble] >> (8 - nShift));
+                nEmbed += pSelected4[nibble];
+                pState->count = pMaskCount4[pState->count][nibble];
+                i += len;
+            }
         }
 
-        nBitIndex = (nBitIndex + 1) % 32;
-        if (nBitIndex == 0)
+        /* One bit at a time for what is left */
+        for (; (pState->nBitIndex < 32) && (i < nBits) &&
+               ((nBits - i < 4) || (pState->nBitIndex & 3)); pState->nBitIndex++, word >>= 1)
         {
-            nBlockIndex = (nBlockIndex + 1) % 5;
-            if (nBlockIndex == 0)
+            if (word & 0x1)
             {
-                /* Hash previous hash with password */
-                memcpy(tmp, hash, 20);
-                memcpy(tmp + 20, pszPass, strlen(pszPass));
-                SHA_Memory(tmp, 20 + strlen(pszPass), hash);
-                memset(tmp, 0, MAX_LEN + 20);
+                pMask[i >> 3] |= (unsigned char)(1 << (i & 7));
+                nEmbed++;
+                i++;
             }
+            else if (++pState->count == COUNT_MAX)
+                pState->count = 0; /* Introduce some bias: skip this DONT_EMBED */
+            else
+                i++;
         }
-        
-        /* Introduce some bias */
-        if (count == COUNT_MAX)
-        {
-            /* skip this DONT_EMBED */
-            count = 0;
-#if defined(_DEBUG)
-            printf("<*>");
-#endif
-            /* return the next "command" */
-            return GetPseudoRandomBit(NEXT);
-        }
-        else
-        {
+        if (pState->nBitIndex == 32)
+            NextPseudoRandomWord(pState);
+    }
+
+    return nEmbed;
+}
+
+/*---------------------------------------------------------------------------
+ * The generator used by GetPseudoRandomBit and GetPseudoRandomMask,
+ * keyed with the passphrase returned by ReadPassPhrase
+ *---------------------------------------------------------------------------
+ */
+static PRNG_STATE state;
+static int bInit = 1;
+
+size_t GetPseudoRandomMask(unsigned char *pMask, size_t nBits)
+{
+    if (bInit)
+    {
+        ResetPseudoRandomState(&state, pszPass);
+        bInit = 0;
+    }
+
+    return FillPseudoRandomMask(&state, pMask, nBits);
+}
+
+/*---------------------------------------------------------------------------
+ * Use the passphrase and SHA-1 to generate pseudo random bits.              
+ * Each bit says whether a hidden bit should be embedded or not in the       
+ * cover text. A counter is used introduce bias into the bit stream
+ * by dropping 1 zero in COUNT_MAX. This increases the bandwidth at
+ * the expense of security.
+ *---------------------------------------------------------------------------
+ */
+int GetPseudoRandomBit(int cmd)
+{
+    unsigned char mask;
+    int res;
+
+    if (bInit || cmd == RESET)
+    {
+        ResetPseudoRandomState(&state, pszPass);
+        bInit = 0;
+    }
+
+    switch (cmd)
+    {
+    case RESET: /* Restart the random bit generator */
+        return DO_NOTHING;
+
+    case NEXT: /* The next bit: EMBED, DONT_EMBED or DO_NOTHING */
+        res = GetPseudoRandomMask(&mask, 1) ? EMBED : DONT_EMBED;
 #if defined(_DEBUG)
-            printf("<%d>", res);
+        printf("<%d>", res);
 #endif
-            return res;
-        }
+        return res;
 
     default:
         ERROR("GetPseudoRandomBit: Unknown command.");
@@ -342,30 +442,17 @@ void Uncompress(const char *pszInput, const char *pszOutput)
 }
 
 /*--------------------------------------------------------------------------
- * Triple DES encryption/decryption function on file
+ * Prepare the three key schedules from the passphrase
  *--------------------------------------------------------------------------
  */
-void Encrypt(const char *pszInput, const char *pszOutput, 
-               const char *pszPassPhrase, int bEncrypt)
+static void SetEncryptionKeys(const char *pszPassPhrase, des_key_schedule pSchedule[3])
 {
-    unsigned char pIV[8], bufIn[BLOCK_LEN], bufOut[BLOCK_LEN], rem, *p;
-    int bFinished = 0, bInit = 1, i;
-    des_cblock       pKeys[3];
-	des_key_schedule pSchedule[3];
-    size_t           nRead;
-    UINT32           hash[5];
-    FILE *fin, *fout;
+    int i;
+    des_cblock pKeys[3];
+    UINT32     hash[5];
 
-    memset(bufIn, 0, sizeof(bufIn));
     memset(pKeys, 0, sizeof(pKeys));
-    memset(bufOut, 0, sizeof(bufOut));
-    memset(pSchedule, 0, sizeof(pSchedule));
-
-    if ((fin = fopen(pszInput, "rb")) == NULL)
-        ERROR("Encrypt: could not open input file.");
-
-    if ((fout= fopen(pszOutput, "wb")) == NULL)
-        ERROR("Encrypt: could not create encrypted file.");
+    memset(pSchedule, 0, 3 * sizeof(des_key_schedule));
 
 	/* Use the hash of the pass-phrase to generate three keys */
 	/* Each key is used to prepare a key schedule             */
@@ -387,6 +474,33 @@ void Encrypt(const char *pszInput, const char *pszOutput,
 		memset(pKeys[i], 0, 8);
 	}
 
+    memset(hash, 0, sizeof(hash));
+}
+
+/*--------------------------------------------------------------------------
+ * Triple DES encryption/decryption function on file
+ *--------------------------------------------------------------------------
+ */
+void Encrypt(const char *pszInput, const char *pszOutput, 
+               const char *pszPassPhrase, int bEncrypt)
+{
+    unsigned char pIV[8], bufIn[BLOCK_LEN], bufOut[BLOCK_LEN], rem, *p;
+    int bFinished = 0, bInit = 1, i;
+	des_key_schedule pSchedule[3];
+    size_t           nRead;
+    FILE *fin, *fout;
+
+    memset(bufIn, 0, sizeof(bufIn));
+    memset(bufOut, 0, sizeof(bufOut));
+
+    if ((fin = fopen(pszInput, "rb")) == NULL)
+        ERROR("Encrypt: could not open input file.");
+
+    if ((fout= fopen(pszOutput, "wb")) == NULL)
+        ERROR("Encrypt: could not create encrypted file.");
+
+    SetEncryptionKeys(pszPassPhrase, pSchedule);
+
 	/* The initialisation vector is initialised to 0 */
 	memset(pIV, 0, sizeof(pIV));
         
@@ -464,7 +578,6 @@ void Encrypt(const char *pszInput, const char *pszOutput,
     /* Set to zero sensitive data */
     memset(pIV, 0, sizeof(pIV));
     memset(bufIn, 0, sizeof(bufIn));
-    memset(pKeys, 0, sizeof(pKeys));
     memset(bufOut, 0, sizeof(bufOut));
     memset(pSchedule, 0, sizeof(pSchedule));
 
@@ -473,6 +586,216 @@ void Encrypt(const char *pszInput, const char *pszOutput,
 #endif
 }
 
+/*---------------------------------------------------------------------------
+ * Memory counterparts of Compress, Uncompress, Encrypt and
+ * CompressEncryptFile. They produce exactly the same bytes as the file
+ * functions (a gzip member, then 3DES-CBC with the same padding) without
+ * temporary files. The returned buffer is allocated with malloc and its
+ * length is stored in *pnOutput; the caller frees it.
+ *---------------------------------------------------------------------------
+ */
+#define GZ_HEADER_SIZE  (10)
+#define GZ_TRAILER_SIZE (8)
+#define GZ_OS_CODE      (0x0b) /* NTFS, as written by gzio on Win32 */
+
+static void PutLong(unsigned char *p, uLong x)
+{
+    int n;
+
+    for (n = 0; n < 4; n++)
+    {
+        p[n] = (unsigned char)(x & 0xff);
+        x >>= 8;
+    }
+}
+
+static uLong GetLong(const unsigned char *p)
+{
+    return (uLong)p[0] | ((uLong)p[1] << 8) | ((uLong)p[2] << 16) | ((uLong)p[3] << 24);
+}
+
+unsigned char *CompressBuffer(const unsigned char *pInput, size_t nInput, size_t *pnOutput)
+{
+    z_stream stream;
+    unsigned char *pOutput;
+    size_t nBound;
+    int err;
+
+    /* Worst case of deflate for stored blocks, plus gzip header/trailer */
+    nBound = nInput + nInput / 1000 + (nInput / 16383 + 1) * 5 + 12
+             + GZ_HEADER_SIZE + GZ_TRAILER_SIZE;
+    if ((pOutput = (unsigned char *)malloc(nBound)) == NULL)
+        ERROR("CompressBuffer: not enough memory.");
+
+    /* Same header and deflate parameters as gzopen(..., "wb") */
+    memset(pOutput, 0, GZ_HEADER_SIZE);
+    pOutput[0] = 0x1f;
+    pOutput[1] = 0x8b;
+    pOutput[2] = Z_DEFLATED;
+    pOutput[9] = GZ_OS_CODE;
+
+    memset(&stream, 0, sizeof(stream));
+    if (deflateInit2(&stream, Z_DEFAULT_COMPRESSION, Z_DEFLATED, -MAX_WBITS,
+                     8, Z_DEFAULT_STRATEGY) != Z_OK)
+        ERROR("CompressBuffer: could not initialise compression.");
+
+    stream.next_in = (Bytef *)pInput;
+    stream.avail_in = (uInt)nInput;
+    stream.next_out = pOutput + GZ_HEADER_SIZE;
+    stream.avail_out = (uInt)(nBound - GZ_HEADER_SIZE - GZ_TRAILER_SIZE);
+    err = deflate(&stream, Z_FINISH);
+    if (err != Z_STREAM_END)
+        ERROR("CompressBuffer: unexpected error during compression.");
+
+    *pnOutput = GZ_HEADER_SIZE + stream.total_out;
+    if (deflateEnd(&stream) != Z_OK)
+        ERROR("CompressBuffer: unexpected error during compression.");
+
+    PutLong(pOutput + *pnOutput, crc32(crc32(0L, Z_NULL, 0), pInput, (uInt)nInput));
+    PutLong(pOutput + *pnOutput + 4, (uLong)nInput);
+    *pnOutput += GZ_TRAILER_SIZE;
+
+    return pOutput;
+}
+
+unsigned char *UncompressBuffer(const unsigned char *pInput, size_t nInput, size_t *pnOutput)
+{
+    z_stream stream;
+    unsigned char *pOutput, flags;
+    size_t nHeader = GZ_HEADER_SIZE, nSize;
+    int err;
+
+    /* Like gzread, pass data without a gzip header through unchanged */
+    if ((nInput < 2) || (pInput[0] != 0x1f) || (pInput[1] != 0x8b))
+    {
+        if ((pOutput = (unsigned char *)malloc(nInput + 1)) == NULL)
+            ERROR("UncompressBuffer: not enough memory.");
+        memcpy(pOutput, pInput, nInput);
+        *pnOutput = nInput;
+        return pOutput;
+    }
+
+    if ((nInput < GZ_HEADER_SIZE + GZ_TRAILER_SIZE) || (pInput[2] != Z_DEFLATED))
+        ERROR("UncompressBuffer: error reading datafile.");
+
+    /* Skip the optional header fields */
+    flags = pInput[3];
+    if (flags & 0x04)                                  /* FEXTRA */
+        nHeader += 2 + (pInput[10] | (pInput[11] << 8));
+    if (flags & 0x08)                                  /* FNAME */
+        while ((nHeader < nInput) && pInput[nHeader++]);
+    if (flags & 0x10)                                  /* FCOMMENT */
+        while ((nHeader < nInput) && pInput[nHeader++]);
+    if (flags & 0x02)                                  /* FHCRC */
+        nHeader += 2;
+    if (nHeader + GZ_TRAILER_SIZE > nInput)
+        ERROR("UncompressBuffer: error reading datafile.");
+
+    nSize = (size_t)GetLong(pInput + nInput - 4);
+    if ((pOutput = (unsigned char *)malloc(nSize + 1)) == NULL)
+        ERROR("UncompressBuffer: not enough memory.");
+
+    memset(&stream, 0, sizeof(stream));
+    if (inflateInit2(&stream, -MAX_WBITS) != Z_OK)
+        ERROR("UncompressBuffer: could not initialise decompression.");
+
+    /* The trailer doubles as the extra byte raw inflate needs to finish */
+    stream.next_in = (Bytef *)pInput + nHeader;
+    stream.avail_in = (uInt)(nInput - nHeader);
+    stream.next_out = pOutput;
+    stream.avail_out = (uInt)nSize + 1;
+    err = inflate(&stream, Z_FINISH);
+    if ((err != Z_STREAM_END) || (stream.total_out != nSize) ||
+        (GetLong(pInput + nInput - GZ_TRAILER_SIZE) != crc32(crc32(0L, Z_NULL, 0), pOutput, (uInt)nSize)))
+        ERROR("UncompressBuffer: error reading datafile.");
+    inflateEnd(&stream);
+
+    *pnOutput = nSize;
+    return pOutput;
+}
+
+unsigned char *EncryptBuffer(const unsigned char *pInput, size_t nInput,
+                             const char *pszPassPhrase, int bEncrypt, size_t *pnOutput)
+{
+    unsigned char pIV[8], *pOutput, *p, rem;
+	des_key_schedule pSchedule[3];
+    size_t nBlocks, i;
+
+    SetEncryptionKeys(pszPassPhrase, pSchedule);
+
+	/* The initialisation vector is initialised to 0 */
+	memset(pIV, 0, sizeof(pIV));
+
+    if (bEncrypt)
+    {
+        /* Always one padding block, even if nInput is a multiple of 8 */
+        nBlocks = nInput / BLOCK_LEN + 1;
+        if ((pOutput = (unsigned char *)malloc(nBlocks * BLOCK_LEN)) == NULL)
+            ERROR("EncryptBuffer: not enough memory.");
+        memcpy(pOutput, pInput, nInput);
+
+        /* Padding: random bytes, the last one holds the number of */
+        /* bytes allocated for data in the final block             */
+        p = pOutput + nInput;
+        srand((unsigned int)time(NULL));
+        for (i = 7 - (nInput % 8); i > 0; i--)
+            *p++ = (unsigned char)(rand() & 0xff);
+        *p = (unsigned char)(nInput % 8);
+
+        des_ede3_cbc_encrypt((des_cblock *)pOutput, (des_cblock *)pOutput, (long)(nBlocks * BLOCK_LEN),
+            pSchedule[0], pSchedule[1], pSchedule[2], (des_cblock *)pIV, bEncrypt);
+        *pnOutput = nBlocks * BLOCK_LEN;
+    }
+    else
+    {
+        nBlocks = nInput / BLOCK_LEN;
+        if (nInput % BLOCK_LEN)
+            fprintf(stderr, "Encrypt: unexpected end of enciphered file. Output will be truncated.");
+        if ((pOutput = (unsigned char *)malloc(nBlocks * BLOCK_LEN + 1)) == NULL)
+            ERROR("EncryptBuffer: not enough memory.");
+
+        *pnOutput = 0;
+        if (nBlocks > 0)
+        {
+            des_ede3_cbc_encrypt((des_cblock *)pInput, (des_cblock *)pOutput, (long)(nBlocks * BLOCK_LEN),
+                pSchedule[0], pSchedule[1], pSchedule[2], (des_cblock *)pIV, bEncrypt);
+            rem = pOutput[nBlocks * BLOCK_LEN - 1];
+            if (rem > 7) ERROR("Encrypt: unexpected end of cipher message.");
+            *pnOutput = (nBlocks - 1) * BLOCK_LEN + rem;
+        }
+    }
+
+    /* Set to zero sensitive data */
+    memset(pIV, 0, sizeof(pIV));
+    memset(pSchedule, 0, sizeof(pSchedule));
+
+    return pOutput;
+}
+
+unsigned char *CompressEncryptBuffer(const unsigned char *pInput, size_t nInput,
+                                     const char *pszPassPhrase, int bCompEnc, size_t *pnOutput)
+{
+    unsigned char *pTemp, *pOutput;
+    size_t nTemp;
+
+    /* Compress-encrypt or decrypt-uncompress depending on bCompEnc */
+    if (bCompEnc)
+    {
+        pTemp = CompressBuffer(pInput, nInput, &nTemp);
+        pOutput = EncryptBuffer(pTemp, nTemp, pszPassPhrase, 1, pnOutput);
+    }
+    else
+    {
+        pTemp = EncryptBuffer(pInput, nInput, pszPassPhrase, 0, &nTemp);
+        pOutput = UncompressBuffer(pTemp, nTemp, pnOutput);
+    }
+
+    memset(pTemp, 0, nTemp);
+    free(pTemp);
+
+    return pOutput;
+}
+
 
 /*--------------------------------------------------------------------------
  * Debugging stuff... shall be removed
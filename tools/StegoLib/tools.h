@@ -26,11 +26,29 @@
 
 #define TMP_FILE_EXT ("tmp")
 
+#include "sha.h"
+
+/* State of one pseudo random bit generator. GetPseudoRandomBit and      */
+/* GetPseudoRandomMask share a static one; stego contexts own theirs so  */
+/* that several can run at the same time.                                */
+typedef struct
+{
+    UINT32 hash[5];
+    int    nBlockIndex, nBitIndex, count;
+    char   pszPass[MAX_LEN];
+} PRNG_STATE;
+
 void GetTemporaryFileName(char pszTemp[256]);
 
 char *ReadPassPhrase(void);
 
 int GetPseudoRandomBit(int cmd);
+size_t GetPseudoRandomMask(unsigned char *pMask, size_t nBits);
+
+void ResetPseudoRandomState(PRNG_STATE *pState, const char *pszPassPhrase);
+size_t FillPseudoRandomMask(PRNG_STATE *pState, unsigned char *pMask, size_t nBits);
+
+#define MASK_BIT(pMask, i) (((pMask)[(i) >> 3] >> ((i) & 7)) & 0x1)
 
 size_t CompressEncryptFile(const char *pszInput, const char *pszOutput,
                            const char *pszPassPhrase, int bCompEnc);
@@ -41,5 +59,15 @@ void Uncompress(const char *pszInput, const char *pszOutput);
 void Encrypt(const char *pszInput, const char *pszOutput, 
                const char *pszPassPhrase, int bEncrypt);
 
+/* Same as above on memory buffers; the result is malloc'ed */
+unsigned char *CompressEncryptBuffer(const unsigned char *pInput, size_t nInput,
+                                     const char *pszPassPhrase, int bCompEnc, size_t *pnOutput);
+
+unsigned char *CompressBuffer(const unsigned char *pInput, size_t nInput, size_t *pnOutput);
+unsigned char *UncompressBuffer(const unsigned char *pInput, size_t nInput, size_t *pnOutput);
+
+unsigned char *EncryptBuffer(const unsigned char *pInput, size_t nInput,
+                             const char *pszPassPhrase, int bEncrypt, size_t *pnOutput);
+
 #endif /* _TOOLS_H_ */
 
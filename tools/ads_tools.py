@@ -1,13 +1,17 @@
 """
 ADS (Alternate Data Streams) Tools
-ADS Viewer only
+ADS Viewer, extended-attribute streams (Linux) and a folder scanner
 """
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import subprocess
 import os
-from .base_tool import find_executable, launch_executable
+from .base_tool import BaseToolWindow, UiDispatcher, find_tool, launch_executable, remember_tool
+from .engine import EngineError
+from .jobs import CANCELLED, get_runner
+from .stream_scan import StreamIndex, scan
+from .xattr_streams import XattrStreamEngine
 
 
 class ADSToolsWindow:
@@ -27,6 +31,16 @@ class ADSToolsWindow:
         notebook.add(adsviewer_frame, text="ADS Viewer")
         self.adsviewer_tool = ADSViewerTool(adsviewer_frame, self.window)
 
+        # Extended attributes: the Linux counterpart of NTFS streams
+        xattr_frame = ttk.Frame(notebook)
+        notebook.add(xattr_frame, text="Extended Attributes")
+        self.xattr_tool = XattrTool(xattr_frame, self.window)
+
+        # Folder scanner for both kinds of hidden streams
+        scan_frame = ttk.Frame(notebook)
+        notebook.add(scan_frame, text="Stream Scanner")
+        self.scan_tool = StreamScanTool(scan_frame, self.window)
+
         # Auto-open ADS Viewer when its tab is selected
         def _on_ads_tab_changed(event):
             try:
@@ -64,18 +78,7 @@ class ADSViewerTool:
     
     def find_ads_viewer(self):
         """Find ADS Viewer executable"""
-        possible_paths = [
-            "D:\\ADSView.exe",
-            os.path.join(os.path.dirname(__file__), "ADS Viewer.exe"),
-            os.path.join(os.path.dirname(__file__), "ADS Viewer.exe.lnk"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "ADSViewer.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "tools", "ADSViewer.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "ADS Viewer.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "tools", "ADS Viewer.exe"),
-            "ADSViewer.exe",
-            "adsviewer.exe",
-        ]
-        return find_executable(possible_paths)
+        return find_tool("ads_viewer")
     
     def launch_viewer(self):
         """Launch ADS Viewer GUI"""
@@ -99,6 +102,205 @@ class ADSViewerTool:
             filetypes=[("Executables", "*.exe;*.lnk"), ("All files", "*.*")]
         )
         if user_choice:
-            try_open(user_choice)
+            if try_open(user_choice):
+                remember_tool("ads_viewer", user_choice)
         else:
             messagebox.showerror("Error", "ADS Viewer executable not found.\nPlease ensure ADS Viewer.exe is available in the Tools folder.")
+
+
+class XattrTool(BaseToolWindow):
+    """Hidden streams in user.* extended attributes (Linux)"""
+    
+    def __init__(self, parent, root_window):
+        self.root_window = root_window
+        self.stream_name = tk.StringVar(value="hidden")
+        super().__init__(parent, "Extended Attributes")
+    
+    def create_tabbed_widgets(self):
+        """Add the stream name above the Hide/Extract tabs"""
+        options = ttk.Frame(self.window, padding=(10, 10, 10, 0))
+        options.pack(fill=tk.X)
+        ttk.Label(options, text="Stream Name:", font=("Arial", 10)).pack(side=tk.LEFT)
+        ttk.Entry(options, textvariable=self.stream_name, width=20).pack(side=tk.LEFT, padx=5)
+        ttk.Label(options, text="(leave Output File empty to write into the input file)",
+                  foreground="gray").pack(side=tk.LEFT, padx=5)
+        super().create_tabbed_widgets()
+    
+    def create_extract_tab(self, parent):
+        """Create Extract tab with a List Streams button"""
+        super().create_extract_tab(parent)
+        for widget in parent.winfo_children():
+            if isinstance(widget, ttk.Button) and widget.cget("text") == "Extract Message":
+                info = widget.grid_info()
+                list_btn = ttk.Button(parent, text="List Streams", command=self.list_streams, width=25)
+                list_btn.grid(row=int(info.get("row", 2)) + 1, column=0, columnspan=3, pady=10)
+                break
+    
+    def get_engine(self, tab):
+        stream = self.stream_name.get().strip()
+        if not stream:
+            raise EngineError("Please enter a stream name.")
+        return XattrStreamEngine(log=self.engine_log(tab), stream=stream)
+    
+    def hide_message(self):
+        """Write the message to an extended-attribute stream"""
+        if not self.validate_inputs(require_message=True, require_password=False, tab="hide"):
+            return
+        
+        self.clear_log("hide")
+        self.log("Starting extended attribute hide operation...", tab="hide")
+        
+        try:
+            engine = self.get_engine("hide")
+            self.start_job(
+                "hide", engine.embed,
+                self.input_file.get(),
+                self.get_message(),
+                self.output_file.get(),
+                on_done=self.report_hide_result
+            )
+        
+        except EngineError as e:
+            self.log(str(e), "ERROR", "hide")
+            messagebox.showerror("Error", str(e))
+        except Exception as e:
+            self.log(f"Exception: {str(e)}", "ERROR", "hide")
+            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+    
+    def extract_message(self):
+        """Read the message from an extended-attribute stream"""
+        if not self.validate_inputs(require_message=False, require_password=False, tab="extract"):
+            return
+        
+        self.clear_log("extract")
+        self.log("Starting extended attribute extract operation...", tab="extract")
+        
+        try:
+            engine = self.get_engine("extract")
+            self.start_job(
+                "extract", engine.extract,
+                self.input_file.get(),
+                on_done=self.report_extract_result
+            )
+        
+        except EngineError as e:
+            self.log(str(e), "ERROR", "extract")
+            messagebox.showerror("Error", str(e))
+        except Exception as e:
+            self.log(f"Exception: {str(e)}", "ERROR", "extract")
+            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+    
+    def list_streams(self):
+        """List all streams of the input file"""
+        if not self.validate_inputs(require_message=False, require_password=False, tab="extract"):
+            return
+        
+        self.clear_log("extract")
+        self.log("Listing streams...", tab="extract")
+        self.start_job(
+            "extract", XattrStreamEngine(log=self.engine_log("extract")).info,
+            self.input_file.get(),
+            on_done=self.report_streams
+        )
+    
+    def report_streams(self, result):
+        streams = result.details.get("streams", {})
+        if not streams:
+            self.log("No streams found.", tab="extract")
+        for name, size in sorted(streams.items()):
+            self.log(f"{name}: {size} bytes", tab="extract")
+
+
+class StreamScanTool:
+    """Lists every file under a folder that carries hidden streams"""
+    
+    def __init__(self, parent, root_window):
+        self.root_window = root_window
+        self.parent = parent
+        self.folder = tk.StringVar()
+        self.status = tk.StringVar(value="Choose a folder to scan.")
+        self.job = None
+        self.ui = UiDispatcher(parent)
+        self.setup_ui()
+    
+    def setup_ui(self):
+        """Setup the UI"""
+        frame = ttk.Frame(self.parent, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        row = ttk.Frame(frame)
+        row.pack(fill=tk.X)
+        ttk.Label(row, text="Folder:", font=("Arial", 10)).pack(side=tk.LEFT)
+        ttk.Entry(row, textvariable=self.folder, width=50).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        ttk.Button(row, text="Browse", command=self.browse_folder).pack(side=tk.LEFT)
+        
+        buttons = ttk.Frame(frame)
+        buttons.pack(fill=tk.X, pady=10)
+        self.scan_button = ttk.Button(buttons, text="Scan", command=self.start_scan, width=20)
+        self.scan_button.pack(side=tk.LEFT)
+        self.cancel_button = ttk.Button(buttons, text="Cancel", command=self.cancel_scan, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+        ttk.Label(buttons, textvariable=self.status, foreground="gray").pack(side=tk.LEFT, padx=10)
+        
+        columns = ("stream", "size", "preview")
+        self.tree = ttk.Treeview(frame, columns=columns, show="tree headings")
+        self.tree.heading("#0", text="File")
+        self.tree.heading("stream", text="Stream")
+        self.tree.heading("size", text="Size")
+        self.tree.heading("preview", text="Preview")
+        self.tree.column("#0", width=260)
+        self.tree.column("stream", width=120)
+        self.tree.column("size", width=70, anchor=tk.E)
+        self.tree.column("preview", width=220)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+    
+    def browse_folder(self):
+        folder = filedialog.askdirectory(title="Select a folder to scan")
+        if folder:
+            self.folder.set(folder)
+    
+    def start_scan(self):
+        """Scan the folder in the background; hits appear as they are found"""
+        folder = self.folder.get()
+        if not folder or not os.path.isdir(folder):
+            messagebox.showerror("Error", "Please select a folder to scan.")
+            return
+        self.tree.delete(*self.tree.get_children())
+        self.status.set("Scanning...")
+        self.scan_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.job = get_runner().submit(
+            self.run_scan, folder,
+            label="Stream scan",
+            on_done=lambda job: self.ui.post(self.scan_finished, job)
+        )
+    
+    def run_scan(self, folder):
+        index = StreamIndex()
+        try:
+            return scan([folder], index=index, on_hit=lambda path, streams: self.ui.post(self.add_hit, path, streams))
+        finally:
+            index.close()
+    
+    def add_hit(self, path, streams):
+        item = self.tree.insert("", tk.END, text=path, open=True)
+        for s in streams:
+            self.tree.insert(item, tk.END, text="", values=(s["name"], s["size"], s["preview"]))
+    
+    def cancel_scan(self):
+        if self.job:
+            self.job.cancel()
+    
+    def scan_finished(self, job):
+        self.job = None
+        self.scan_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+        if job.status == CANCELLED:
+            self.status.set("Scan cancelled.")
+        elif job.exception is not None:
+            self.status.set("Scan failed.")
+            messagebox.showerror("Error", f"Scan failed:\n{job.exception}")
+        else:
+            c = job.value["counts"]
+            self.status.set(f"{len(job.value['hits'])} file(s) with streams in {c['files']} files "
+                            f"({c['from_index']} unchanged), {c['seconds']:.1f}s")
@@ -7,7 +7,7 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import subprocess
 import os
-from .base_tool import BaseToolWindow
+from .base_tool import BaseToolWindow, find_tool
 
 
 class ADSToolsWindow:
@@ -245,15 +245,7 @@ class StreamsTool(BaseToolWindow):
     
     def find_streams(self):
         """Find Streams executable"""
-        possible_paths = [
-            "streams.exe",
-            "Streams.exe",
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "streams.exe"),
-        ]
-        for path in possible_paths:
-            if os.path.exists(path):
-                return path
-        return None
+        return find_tool("streams")
 
 
 class ADSViewerTool(BaseToolWindow):
@@ -291,19 +283,7 @@ class ADSViewerTool(BaseToolWindow):
     
     def find_ads_viewer(self):
         """Find ADS Viewer executable"""
-        possible_paths = [
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "ADSViewer.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "tools", "ADSViewer.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "tools", "ADS Viewer.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "ADSViewer", "ADSViewer.exe"),
-            "ADSViewer.exe",
-            "adsviewer.exe",
-        ]
-        for path in possible_paths:
-            abs_path = os.path.abspath(path)
-            if os.path.exists(abs_path):
-                return abs_path
-        return None
+        return find_tool("ads_viewer")
     
     def view_ads(self):
         """View ADS for selected file - Launch GUI tool"""
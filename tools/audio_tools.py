@@ -1,13 +1,15 @@
 """
 Audio Steganography Tools
-MP3Stego and DeepSound
+MP3Stego, native WAV LSB and DeepSound
 """
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import subprocess
 import os
-from .base_tool import BaseToolWindow, find_executable, launch_executable
+from .base_tool import BaseToolWindow, find_tool, launch_executable, remember_tool
+from .engine import EngineError, MP3StegoEngine, find_mp3stego, find_mp3stego_decode
+from .extract_cache import get_cache as get_extract_cache
+from .wav_lsb import WAVLSBEngine
 
 
 class AudioStegoWindow:
@@ -27,6 +29,10 @@ class AudioStegoWindow:
         notebook.add(mp3_frame, text="MP3Stego")
         self.mp3_tool = MP3StegoTool(mp3_frame, self.window)
         
+        # Native WAV LSB tab (no external executable)
+        wav_frame = ttk.Frame(notebook)
+        notebook.add(wav_frame, text="WAV LSB (Native)")
+        self.wav_tool = WAVLSBTool(wav_frame, self.window)
         
         # DeepSound tab
         deepsound_frame = ttk.Frame(notebook)
@@ -93,57 +99,19 @@ class MP3StegoTool(BaseToolWindow):
         self.log("Starting MP3Stego hide operation...", tab="hide")
         
         try:
-            mp3stego_path = self.find_mp3stego()
-            if not mp3stego_path:
-                self.log("MP3Stego Encode.exe not found. Please ensure it's in Tools/MP3Stego/", "ERROR", "hide")
-                messagebox.showerror("Error", "MP3Stego Encode.exe not found. Please ensure it's in Tools/MP3Stego/")
-                return
-            # MP3Stego expects a WAV input file (the encoder compresses WAV -> MP3 while
-            # embedding the data). Prevent confusing errors by checking the extension
-            input_path = self.input_file.get()
-            if not input_path.lower().endswith('.wav'):
-                self.log("MP3Stego requires a WAV input file. Please convert your audio to WAV.", "ERROR", "hide")
-                messagebox.showerror("Error", "MP3Stego requires a WAV input file (uncompressed).\nPlease convert your audio to WAV and try again.")
-                return
-            
-            # Create message file
-            msg_file = os.path.join(os.path.dirname(self.output_file.get()), "temp_msg.txt")
-            with open(msg_file, "w", encoding="utf-8") as f:
-                f.write(self.get_message())
-            
-            # MP3Stego encode command
-            # Use correct MP3Stego flags: -E <filename> and -P <pass>
-            # README example: encode -E data.txt -P pass sound.wav sound.mp3
-            cmd = [
-                mp3stego_path,
-                "-E", msg_file,
-                "-P", self.password.get(),
+            engine = MP3StegoEngine(log=self.engine_log("hide"))
+            self.start_job(
+                "hide", engine.embed,
                 self.input_file.get(),
-                self.output_file.get()
-            ]
-            
-            self.log(f"Running: {' '.join(cmd)}", tab="hide")
-            # MP3Stego requires access to its local 'tables' directory. Run
-            # the encoder with its executable directory as the working dir so
-            # relative paths like './tables/' resolve correctly.
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=60,
-                cwd=os.path.dirname(mp3stego_path)
+                self.get_message(),
+                self.output_file.get(),
+                self.password.get(),
+                on_done=self.report_hide_result
             )
-            
-            if os.path.exists(msg_file):
-                os.remove(msg_file)
-            
-            if result.returncode == 0:
-                self.log("Message hidden successfully!", "SUCCESS", "hide")
-                messagebox.showinfo("Success", f"Message hidden successfully!\nOutput: {self.output_file.get()}")
-            else:
-                self.log(f"Error: {result.stderr}", "ERROR", "hide")
-                messagebox.showerror("Error", f"Failed to hide message:\n{result.stderr}")
         
+        except EngineError as e:
+            self.log(str(e), "ERROR", "hide")
+            messagebox.showerror("Error", str(e))
         except Exception as e:
             self.log(f"Exception: {str(e)}", "ERROR", "hide")
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
@@ -157,86 +125,113 @@ class MP3StegoTool(BaseToolWindow):
         self.log("Starting MP3Stego extract operation...", tab="extract")
         
         try:
-            decode_path = self.find_mp3stego_decode()
-            if not decode_path:
-                self.log("MP3Stego Decode.exe not found. Please ensure it's in Tools/MP3Stego/", "ERROR", "extract")
-                messagebox.showerror("Error", "MP3Stego Decode.exe not found. Please ensure it's in Tools/MP3Stego/")
-                return
-            
-            msg_file = os.path.join(os.path.dirname(self.input_file.get()), "temp_extracted.txt")
-            
-            # MP3Stego Decode.exe command format
-            # Use correct decode invocation: decode -X -P <pass> <infile>
-            # MP3Stego will create a file named <infile>.txt containing the hidden data
-            cmd = [
-                decode_path,
-                "-X",
-                "-P", self.password.get(),
-                self.input_file.get()
-            ]
-            
-            self.log(f"Running: {' '.join(cmd)}", tab="extract")
-            # Same cwd logic for decoder so it can find its 'tables' directory
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=60,
-                cwd=os.path.dirname(decode_path)
+            engine = MP3StegoEngine(log=self.engine_log("extract"))
+            # Repeated extracts of the same file and password skip the tool
+            self.start_job(
+                "extract", get_extract_cache().extract, engine,
+                self.input_file.get(),
+                self.password.get(),
+                on_done=self.report_extract_result
             )
-            
-            # MP3Stego decode writes output to '<inputfile>.txt' according to README
-            expected_msg_file = f"{self.input_file.get()}.txt"
-            if result.returncode == 0 and os.path.exists(expected_msg_file):
-                with open(expected_msg_file, "r", encoding="utf-8", errors="ignore") as f:
-                    extracted_msg = f.read()
-                self.set_message(extracted_msg)
-                self.log("Message extracted successfully!", "SUCCESS", "extract")
-                messagebox.showinfo("Success", "Message extracted successfully!")
-                try:
-                    os.remove(expected_msg_file)
-                except Exception:
-                    pass
-            else:
-                self.log(f"Error: {result.stderr}", "ERROR", "extract")
-                messagebox.showerror("Error", f"Failed to extract message:\n{result.stderr}")
         
+        except EngineError as e:
+            self.log(str(e), "ERROR", "extract")
+            messagebox.showerror("Error", str(e))
         except Exception as e:
             self.log(f"Exception: {str(e)}", "ERROR", "extract")
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
     
     def find_mp3stego(self):
         """Find MP3Stego executable (Encode.exe for hide, Decode.exe for extract)"""
-        # MP3Stego uses Encode.exe for hiding and Decode.exe for extracting
-        possible_paths = [
-            os.path.join(os.path.dirname(__file__), "MP3Stego", "Encode.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "MP3Stego", "Encode.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "tools", "MP3Stego", "Encode.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "Encode.exe"),
-            "Encode.exe",
-            "mp3stego.exe",
-        ]
-        for path in possible_paths:
-            abs_path = os.path.abspath(path)
-            if os.path.exists(abs_path):
-                return abs_path
-        return None
+        return find_mp3stego()
     
     def find_mp3stego_decode(self):
         """Find MP3Stego Decode executable"""
-        possible_paths = [
-            os.path.join(os.path.dirname(__file__), "MP3Stego", "Decode.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "MP3Stego", "Decode.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "tools", "MP3Stego", "Decode.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "Decode.exe"),
-            "Decode.exe",
-        ]
-        for path in possible_paths:
-            abs_path = os.path.abspath(path)
-            if os.path.exists(abs_path):
-                return abs_path
-        return None
+        return find_mp3stego_decode()
+
+
+class WAVLSBTool(BaseToolWindow):
+    """Native sample-LSB tool for PCM WAV recordings"""
+    
+    def __init__(self, parent, root_window):
+        self.root_window = root_window
+        super().__init__(parent, "WAV LSB (Native)")
+    
+    def create_hide_tab(self, parent):
+        """Create Hide tab with WAV file types"""
+        super().create_hide_tab(parent)
+        for widget in parent.winfo_children():
+            if isinstance(widget, ttk.Button) and widget.cget("text") == "Browse":
+                info = widget.grid_info()
+                if info.get("row") == 0:
+                    widget.config(command=lambda: self.browse_input_file([
+                        ("WAV files", "*.wav"), ("All files", "*.*")
+                    ]))
+                elif info.get("row") == 1:
+                    widget.config(command=lambda: self.browse_output_file([
+                        ("WAV files", "*.wav"), ("All files", "*.*")
+                    ]))
     
+    def create_extract_tab(self, parent):
+        """Create Extract tab with WAV file types"""
+        super().create_extract_tab(parent)
+        for widget in parent.winfo_children():
+            if isinstance(widget, ttk.Button) and widget.cget("text") == "Browse":
+                widget.config(command=lambda: self.browse_input_file([
+                    ("WAV files", "*.wav"), ("All files", "*.*")
+                ]))
+    
+    def hide_message(self):
+        """Hide message in the WAV sample LSBs"""
+        if not self.validate_inputs(require_message=True, require_password=False, tab="hide"):
+            return
+        
+        self.clear_log("hide")
+        self.log("Starting WAV LSB hide operation...", tab="hide")
+        
+        try:
+            engine = WAVLSBEngine(log=self.engine_log("hide"))
+            self.start_job(
+                "hide", engine.embed,
+                self.input_file.get(),
+                self.get_message(),
+                self.output_file.get(),
+                self.password.get(),
+                on_done=self.report_hide_result
+            )
+        
+        except EngineError as e:
+            self.log(str(e), "ERROR", "hide")
+            messagebox.showerror("Error", str(e))
+        except Exception as e:
+            self.log(f"Exception: {str(e)}", "ERROR", "hide")
+            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+    
+    def extract_message(self):
+        """Extract message from the WAV sample LSBs"""
+        if not self.validate_inputs(require_message=False, require_password=False, tab="extract"):
+            return
+        
+        self.clear_log("extract")
+        self.log("Starting WAV LSB extract operation...", tab="extract")
+        
+        try:
+            engine = WAVLSBEngine(log=self.engine_log("extract"))
+            self.start_job(
+                "extract", engine.extract,
+                self.input_file.get(),
+                self.password.get(),
+                on_done=self.report_extract_result
+            )
+        
+        except EngineError as e:
+            self.log(str(e), "ERROR", "extract")
+            messagebox.showerror("Error", str(e))
+        except Exception as e:
+            self.log(f"Exception: {str(e)}", "ERROR", "extract")
+            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+    
+
 class DeepSoundTool(BaseToolWindow):
     """DeepSound tool implementation"""
     
@@ -272,23 +267,7 @@ class DeepSoundTool(BaseToolWindow):
     
     def find_deepsound(self):
         """Find DeepSound executable"""
-        possible_paths = [
-            # Check for a Windows shortcut inside the same tools folder (common in this repo)
-            os.path.join(os.path.dirname(__file__), "DeepSound.exe.lnk"),
-            os.path.join(os.path.dirname(__file__), "DeepSound.lnk"),
-            os.path.join(os.path.dirname(__file__), "DeepSound.exe"),
-            # Also check the repo Tools/ (case differences) and nested folder
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "DeepSound.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "DeepSound.exe.lnk"),
-            os.path.join(os.path.dirname(__file__), "..", "tools", "DeepSound.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "tools", "DeepSound.exe.lnk"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "DeepSound", "DeepSound.exe"),
-            # Generic names that might be on the PATH
-            "DeepSound.exe",
-            "deepsound.exe",
-        ]
-        return find_executable(possible_paths)
-        return find_executable(possible_paths)
+        return find_tool("deepsound")
     
     def hide_message(self):
         """Hide message - Launch GUI tool"""
@@ -316,6 +295,7 @@ class DeepSoundTool(BaseToolWindow):
         )
         if user_choice:
             if try_open(user_choice):
+                remember_tool("deepsound", user_choice)
                 return
             else:
                 messagebox.showerror("Error", f"Failed to open selected file:\n{user_choice}")
@@ -347,6 +327,7 @@ class DeepSoundTool(BaseToolWindow):
         )
         if user_choice:
             if try_open(user_choice):
+                remember_tool("deepsound", user_choice)
                 return
             else:
                 messagebox.showerror("Error", f"Failed to open selected file:\n{user_choice}")
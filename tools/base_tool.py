@@ -6,6 +6,88 @@ Provides common functionality for all tool windows
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import os
+import queue
+import threading
+from .engine import EngineError
+from .jobs import CANCELLED, get_runner
+from .log_sink import LogSink
+from .registry import find_tool, remember_tool
+from .spans import traced
+
+
+class UiDispatcher:
+    """Runs callbacks posted from worker threads on the Tk thread.
+    Tk widgets may only be touched from the thread that created them, so
+    background jobs post their log lines and results here instead.
+    """
+    
+    def __init__(self, widget, interval=50):
+        self.widget = widget
+        self.interval = interval
+        self.calls = queue.Queue()
+        self.widget.after(self.interval, self._poll)
+    
+    def post(self, func, *args):
+        """Call func(*args) on the Tk thread (immediately if already on it)"""
+        if threading.current_thread() is threading.main_thread():
+            func(*args)
+        else:
+            self.calls.put((func, args))
+    
+    def _poll(self):
+        try:
+            while True:
+                func, args = self.calls.get_nowait()
+                func(*args)
+        except queue.Empty:
+            pass
+        try:
+            self.widget.after(self.interval, self._poll)
+        except tk.TclError:
+            pass  # widget destroyed
+
+
+class LogView:
+    """Shows a LogSink in a read-only text widget.
+    New lines are inserted in one batch per timer tick, the widget is
+    scrolled once per batch, and lines beyond the sink's max_lines are
+    removed from the top.
+    """
+    
+    def __init__(self, widget, sink, interval=100):
+        self.widget = widget
+        self.sink = sink
+        self.interval = interval
+        self.widget.after(self.interval, self._poll)
+    
+    def flush(self):
+        """Insert the lines written since the last flush"""
+        batch = self.sink.drain()
+        if not batch:
+            return
+        widget = self.widget
+        widget.config(state=tk.NORMAL)
+        if len(batch) >= self.sink.max_lines:
+            widget.delete("1.0", tk.END)
+        widget.insert(tk.END, "\n".join(batch) + "\n")
+        excess = int(widget.index("end-1c").split(".")[0]) - 1 - self.sink.max_lines
+        if excess > 0:
+            widget.delete("1.0", f"{excess + 1}.0")
+        widget.see(tk.END)
+        widget.config(state=tk.DISABLED)
+    
+    def clear(self):
+        self.sink.clear()
+        self.widget.config(state=tk.NORMAL)
+        self.widget.delete("1.0", tk.END)
+        self.widget.config(state=tk.DISABLED)
+    
+    def _poll(self):
+        try:
+            self.flush()
+            self.widget.after(self.interval, self._poll)
+        except tk.TclError:
+            pass  # widget destroyed
 
 
 class BaseToolWindow:
@@ -22,7 +104,21 @@ class BaseToolWindow:
         self.message = tk.StringVar()
         self.password = tk.StringVar()
         
+        # Background jobs per tab, so long tool runs don't freeze the UI
+        self.ui = UiDispatcher(self.window)
+        self.jobs = {"hide": [], "extract": []}
+        self.cancel_buttons = {}
+        self.window.bind("<Destroy>", self._on_destroy, add="+")
+        
+        # Log lines go through a sink per tab, so any thread can log and
+        # the widgets are updated in batches (see log_sink.py)
+        self.log_sinks = {tab: LogSink(f"{tool_name} {tab}") for tab in ("hide", "extract")}
+        
         self.create_tabbed_widgets()
+        self.log_views = {
+            "hide": LogView(self.hide_log_text, self.log_sinks["hide"]),
+            "extract": LogView(self.extract_log_text, self.log_sinks["extract"]),
+        }
     
     def create_tabbed_widgets(self):
         """Create tabbed interface with Hide and Extract tabs"""
@@ -85,13 +181,16 @@ class BaseToolWindow:
         password_entry.grid(row=3, column=1, columnspan=2, sticky=(tk.W, tk.E), padx=5, pady=5)
         
         # Hide button
+        button_frame = ttk.Frame(parent)
+        button_frame.grid(row=4, column=0, columnspan=3, pady=20)
         hide_button = ttk.Button(
-            parent,
+            button_frame,
             text="Hide Message",
             command=self.hide_message,
             width=25
         )
-        hide_button.grid(row=4, column=0, columnspan=3, pady=20)
+        hide_button.grid(row=0, column=0)
+        self.create_cancel_button(button_frame, "hide")
         
         # Log area
         ttk.Label(parent, text="Output/Log:", font=("Arial", 10)).grid(
@@ -131,13 +230,16 @@ class BaseToolWindow:
         password_entry.grid(row=1, column=1, columnspan=2, sticky=(tk.W, tk.E), padx=5, pady=5)
         
         # Extract button
+        button_frame = ttk.Frame(parent)
+        button_frame.grid(row=2, column=0, columnspan=3, pady=20)
         extract_button = ttk.Button(
-            parent,
+            button_frame,
             text="Extract Message",
             command=self.extract_message,
             width=25
         )
-        extract_button.grid(row=2, column=0, columnspan=3, pady=20)
+        extract_button.grid(row=0, column=0)
+        self.create_cancel_button(button_frame, "extract")
         
         # Extracted message display
         ttk.Label(parent, text="Extracted Message:", font=("Arial", 10)).grid(
@@ -220,27 +322,93 @@ class BaseToolWindow:
             pass
     
     def log(self, message, level="INFO", tab="hide"):
-        """Add message to log area"""
-        if tab == "hide":
-            log_widget = self.hide_log_text
-        else:
-            log_widget = self.extract_log_text
-        
-        log_widget.config(state=tk.NORMAL)
-        log_widget.insert(tk.END, f"[{level}] {message}\n")
-        log_widget.see(tk.END)
-        log_widget.config(state=tk.DISABLED)
+        """Add message to log area; safe to call from any thread"""
+        self.log_sinks["hide" if tab == "hide" else "extract"].write(message, level)
     
+    def engine_log(self, tab="hide"):
+        """Return a log callback for headless engines that writes to a tab's log.
+        Safe to call from job threads.
+        """
+        return lambda message, level="INFO": self.log(message, level, tab)
+    
+    def create_cancel_button(self, parent, tab):
+        """Cancel button next to the tab's action button, shown while jobs run"""
+        button = ttk.Button(parent, text="Cancel", command=lambda: self.cancel_jobs(tab))
+        button.grid(row=0, column=1, padx=(10, 0))
+        button.grid_remove()
+        self.cancel_buttons[tab] = button
+    
+    def start_job(self, tab, func, *args, on_done=None, label=None):
+        """Run func(*args) on a worker thread and return its Job handle.
+        on_done(result) is called on the UI thread when the job succeeds;
+        errors and cancellation are logged and reported here, and the time
+        each phase took is logged either way.
+        """
+        label = label or f"{self.tool_name} {tab}"
+        job = get_runner().submit(
+            self._run_traced, tab, label, func, *args,
+            label=label,
+            on_done=lambda job: self.ui.post(self._job_finished, job, tab, on_done)
+        )
+        self.jobs[tab].append(job)
+        self._update_cancel_button(tab)
+        return job
+    
+    def _run_traced(self, tab, label, func, *args):
+        """Run func(*args) with its phases timed (see spans.py), then log them"""
+        trace = None
+        try:
+            with traced(label) as trace:
+                return func(*args)
+        finally:
+            if trace is not None:
+                self.log(f"Timing: {trace.summary()}", "INFO", tab)
+    
+    def cancel_jobs(self, tab="hide"):
+        """Cancel every job running in a tab"""
+        for job in list(self.jobs[tab]):
+            job.cancel()
+        self.log("Cancelling...", "WARNING", tab)
+    
+    def _job_finished(self, job, tab, on_done):
+        if job in self.jobs[tab]:
+            self.jobs[tab].remove(job)
+        self._update_cancel_button(tab)
+        error = job.exception
+        if job.status == CANCELLED:
+            self.log(f"{job.label} cancelled after {job.elapsed:.1f}s", "WARNING", tab)
+        elif isinstance(error, EngineError):
+            self.log(str(error), "ERROR", tab)
+            messagebox.showerror("Error", str(error))
+        elif error is not None:
+            self.log(f"Exception: {str(error)}", "ERROR", tab)
+            messagebox.showerror("Error", f"An error occurred: {str(error)}")
+        elif on_done:
+            on_done(job.value)
+    
+    def _update_cancel_button(self, tab):
+        button = self.cancel_buttons.get(tab)
+        if button is None:
+            return
+        try:
+            if self.jobs[tab]:
+                button.grid()
+            else:
+                button.grid_remove()
+        except tk.TclError:
+            pass
+    
+    def _on_destroy(self, event):
+        if event.widget is self.window:
+            for jobs in self.jobs.values():
+                for job in list(jobs):
+                    job.cancel()
+            for sink in self.log_sinks.values():
+                sink.drain()   # hand the last lines to the log file
+
     def clear_log(self, tab="hide"):
         """Clear the log area"""
-        if tab == "hide":
-            log_widget = self.hide_log_text
-        else:
-            log_widget = self.extract_log_text
-        
-        log_widget.config(state=tk.NORMAL)
-        log_widget.delete("1.0", tk.END)
-        log_widget.config(state=tk.DISABLED)
+        self.log_views["hide" if tab == "hide" else "extract"].clear()
     
     def hide_message(self):
         """Hide message - override in subclasses"""
@@ -252,6 +420,30 @@ class BaseToolWindow:
         self.log("Extract message functionality not implemented", "ERROR", "extract")
         messagebox.showwarning("Not Implemented", "Extract message functionality not implemented for this tool.")
     
+    def report_hide_result(self, result):
+        """Report the OperationResult of a hide job"""
+        if result.ok:
+            self.log("Message hidden successfully!", "SUCCESS", "hide")
+            messagebox.showinfo("Success", f"Message hidden successfully!\nOutput saved to: {result.output_file}")
+        else:
+            self.log(f"Error: {result.error}", "ERROR", "hide")
+            messagebox.showerror("Error", f"Failed to hide message:\n{result.error}")
+    
+    def report_extract_result(self, result):
+        """Report the OperationResult of an extract job"""
+        if result.ok:
+            self.set_message(result.text)
+            self.log("Message extracted successfully!", "SUCCESS", "extract")
+            verdict = result.details.get("payload", {})
+            if verdict.get("kind") not in (None, "text", "empty"):
+                self.log(f"The extracted data is not text ({verdict['kind']}, "
+                         f"{verdict['entropy']:.2f} bits/byte); a wrong password gives random data",
+                         "WARNING", "extract")
+            messagebox.showinfo("Success", "Message extracted successfully!")
+        else:
+            self.log(f"Error: {result.error}", "ERROR", "extract")
+            messagebox.showerror("Error", f"Failed to extract message:\n{result.error}")
+    
     def validate_inputs(self, require_message=True, require_password=False, tab="hide"):
         """Validate input fields"""
         if not self.input_file.get():
@@ -273,18 +465,6 @@ class BaseToolWindow:
         return True
 
 
-def find_executable(possible_paths):
-    """Return the first existing absolute path from the list or None.
-    Accepts a list of relative or absolute paths and returns the absolute path
-    of the first file that exists.
-    """
-    for path in possible_paths:
-        abs_path = os.path.abspath(path)
-        if os.path.exists(abs_path):
-            return abs_path
-    return None
-
-
 def launch_executable(path, follow_lnk=True, cwd=None, extra_args=None):
     """Launch an executable or shortcut.
     - If `path` ends with `.lnk` and `follow_lnk` is True, use `os.startfile` to follow the shortcut on Windows.
@@ -0,0 +1,433 @@
+"""
+Batch runner for the headless engine.
+
+Fans a directory of carriers out over a process pool:
+
+    python -m tools.batch embed   --engine steghide -p secret --message-file msg.txt -o out/ carriers/
+    python -m tools.batch extract --engine steghide -p secret -o extracted/ out/
+    python -m tools.batch info    --engine mp3stego carriers/
+    python -m tools.batch embed   --engine mp3stego --manifest jobs.csv -j 8
+
+Embedding checks carrier capacities first (see capacity.py), so carriers
+that are too small fail without running the tool, and --payload-dir spreads
+many payloads over the carriers that can hold them. A manifest gives every
+carrier its own payload, password and output instead.
+"""
+
+import argparse
+import csv
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .capacity import assign_payloads, get_index, measure
+from .engine import ENGINES, EngineError, get_engine, load_native_engines
+from .spans import traced, write_chrome_trace
+
+
+def collect_carriers(paths, extensions, recursive=False):
+    """Expand files and directories into a sorted list of carrier paths"""
+    extensions = tuple(ext.lower() for ext in extensions)
+    carriers = []
+    for path in paths:
+        if os.path.isfile(path):
+            carriers.append(path)
+            continue
+        if recursive:
+            for dirpath, _dirnames, filenames in os.walk(path):
+                for filename in filenames:
+                    if not extensions or filename.lower().endswith(extensions):
+                        carriers.append(os.path.join(dirpath, filename))
+        else:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_file() and (not extensions or entry.name.lower().endswith(extensions)):
+                        carriers.append(entry.path)
+    return sorted(carriers)
+
+
+def output_path_for(carrier, output_dir, operation, engine_name):
+    """Where the result of ``operation`` on ``carrier`` is written"""
+    if not output_dir:
+        return None
+    base, ext = os.path.splitext(os.path.basename(carrier))
+    if operation == "extract":
+        return os.path.join(output_dir, f"{base}{ext}.txt")
+    if engine_name == "mp3stego":
+        ext = ".mp3"
+    return os.path.join(output_dir, f"{base}_stego{ext}")
+
+
+def read_manifest(path, password=""):
+    """Tasks from a CSV (with a header row) or JSON list manifest.
+
+    Each row names a ``carrier`` (or ``wav``), a ``payload`` file and an
+    ``output``, and optionally a ``password`` (default: ``password``).
+    Relative paths are taken from the manifest's directory. Returns
+    (tasks, errors) where errors describe the rows that were skipped.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".json"):
+            rows = json.load(f)
+        else:
+            rows = list(csv.DictReader(f))
+    base = os.path.dirname(os.path.abspath(path))
+    tasks, errors, outputs = [], [], set()
+    for number, row in enumerate(rows, 1):
+        row = {str(key).strip().lower(): (value or "").strip() if isinstance(value, str) else value
+               for key, value in row.items() if key}
+        carrier = row.get("carrier") or row.get("wav")
+        missing = [name for name, value in (("carrier", carrier), ("payload", row.get("payload")),
+                                            ("output", row.get("output"))) if not value]
+        if missing:
+            errors.append(f"row {number}: missing {', '.join(missing)}")
+            continue
+        task = {
+            "carrier": os.path.join(base, carrier),
+            "message_file": os.path.join(base, row["payload"]),
+            "output": os.path.join(base, row["output"]),
+            "password": row.get("password") or password,
+        }
+        if task["output"] in outputs:
+            errors.append(f"row {number}: output {row['output']} is used twice")
+            continue
+        outputs.add(task["output"])
+        tasks.append(task)
+    return tasks, errors
+
+
+def run_task(engine_name, operation, carrier, password="", message=None, output=None,
+             message_file=None, timeout=None, trace=False, memory=False):
+    """Run one operation in a worker process and return a plain dict, with
+    its wall time in ``seconds``. ``message_file`` is read here rather than
+    in the parent, so a long manifest never holds every payload at once.
+    With ``trace``, the time per phase is added as ``phases`` and the spans
+    as ``trace`` (see spans.py); ``memory`` adds tracemalloc peaks.
+    """
+    started = time.perf_counter()
+    if trace:
+        with traced(f"{operation} {os.path.basename(carrier)}", memory) as recorded:
+            result = _run_task(engine_name, operation, carrier, password, message, output, message_file, timeout)
+        result["phases"] = {name: round(wall, 4) for name, (wall, _cpu, _peak) in recorded.phases().items()}
+        result["trace"] = recorded.to_dict()
+    else:
+        result = _run_task(engine_name, operation, carrier, password, message, output, message_file, timeout)
+    result["seconds"] = round(time.perf_counter() - started, 4)
+    if message_file is not None:
+        result["payload_file"] = message_file
+    return result
+
+
+def _run_task(engine_name, operation, carrier, password, message, output, message_file, timeout):
+    try:
+        engine = get_engine(engine_name)
+        if timeout is not None:
+            engine.timeout = timeout
+        if message_file is not None:
+            with open(message_file, "rb") as f:
+                message = f.read()
+        if output and operation != "info":
+            os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        if operation == "embed":
+            result = engine.embed(carrier, message, output, password)
+        elif operation == "extract":
+            result = engine.extract(carrier, password)
+            if result.ok and output:
+                with open(output, "wb") as f:
+                    f.write(result.payload)
+                result.output_file = output
+        else:
+            result = engine.info(carrier, password)
+        return result.to_dict()
+    except (EngineError, OSError) as e:
+        return {"engine": engine_name, "operation": operation, "carrier": carrier,
+                "ok": False, "error": str(e)}
+    except Exception as e:
+        return {"engine": engine_name, "operation": operation, "carrier": carrier,
+                "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+
+def measure_capacities(engine_name, carriers, password="", workers=None):
+    """Usable payload bytes per carrier, from the capacity index where
+    possible and measured in a process pool otherwise.
+    Returns ({carrier: bytes or None}, {carrier: error}).
+    """
+    engine = get_engine(engine_name)
+    known, errors = carrier_capacities(engine_name, carriers, workers)
+    usable = {carrier: engine.usable_bytes(capacity, password) for carrier, capacity in known.items()}
+    return usable, errors
+
+
+def carrier_capacities(engine_name, carriers, workers=None):
+    """Engine.capacity() dicts per carrier, cached in the capacity index.
+    Returns ({carrier: capacity}, {carrier: error}).
+    """
+    index = get_index()
+    engine = get_engine(engine_name)
+    known, missing, errors = {}, [], {}
+    for carrier in carriers:
+        try:
+            capacity = index.lookup(engine, carrier)
+        except OSError as e:
+            errors[carrier] = str(e)
+            continue
+        if capacity is None:
+            missing.append(carrier)
+        else:
+            known[carrier] = capacity
+    if missing:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            for result in pool.map(measure, [engine_name] * len(missing), missing):
+                if "error" in result:
+                    errors[result["carrier"]] = result["error"]
+                else:
+                    known[result["carrier"]] = result["capacity"]
+                    index.store(engine, result["carrier"], result["capacity"])
+        index.save()
+    return known, errors
+
+
+def too_small(engine_name, carrier, needed, available):
+    return {"engine": engine_name, "operation": "embed", "carrier": carrier, "ok": False,
+            "error": f"Payload needs {needed} bytes, carrier holds {available} bytes"}
+
+
+def run_batch(engine_name, operation, carriers, password="", message=None,
+              output_dir=None, workers=None, on_result=None, messages=None, timeout=None,
+              trace=False, memory=False):
+    """Run ``operation`` over all carriers in a process pool.
+    ``messages`` maps carriers to their own payload, overriding ``message``.
+    Returns the list of result dicts in completion order.
+    """
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    messages = messages or {}
+    tasks = [
+        {"carrier": carrier, "password": password, "message": messages.get(carrier, message),
+         "output": output_path_for(carrier, output_dir, operation, engine_name)}
+        for carrier in carriers
+    ]
+    return run_tasks(engine_name, operation, tasks, workers, on_result, timeout, trace, memory)
+
+
+def run_tasks(engine_name, operation, tasks, workers=None, on_result=None, timeout=None,
+              trace=False, memory=False):
+    """Run one ``operation`` per task (keyword arguments of run_task) in a
+    process pool. Each external tool runs in its own scratch directory (see
+    scratch.py), so any number of them can run side by side.
+    Returns the list of result dicts in completion order.
+    """
+    results = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [
+            pool.submit(run_task, engine_name, operation, timeout=timeout, trace=trace, memory=memory, **task)
+            for task in tasks
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if on_result:
+                on_result(result)
+    return results
+
+
+def summarize(results, wall_seconds):
+    """Counts and timings of a finished batch, for the report"""
+    seconds = sorted(r["seconds"] for r in results if r.get("seconds") is not None)
+    summary = {
+        "tasks": len(results),
+        "ok": sum(1 for r in results if r["ok"]),
+        "failed": sum(1 for r in results if not r["ok"]),
+        "wall_seconds": round(wall_seconds, 3),
+        "task_seconds": round(sum(seconds), 3),
+    }
+    if seconds:
+        summary.update(
+            median_seconds=round(statistics.median(seconds), 4),
+            p90_seconds=round(seconds[min(len(seconds) - 1, int(0.9 * len(seconds)))], 4),
+            max_seconds=seconds[-1],
+            # How many tasks were effectively running at once
+            parallelism=round(sum(seconds) / wall_seconds, 2) if wall_seconds else None,
+        )
+    phases = {}
+    for result in results:
+        for name, wall in result.get("phases", {}).items():
+            phases[name] = phases.get(name, 0.0) + wall
+    if phases:
+        summary["phase_seconds"] = {name: round(wall, 3) for name, wall in phases.items()}
+    return summary
+
+
+def build_parser():
+    load_native_engines()
+    parser = argparse.ArgumentParser(
+        prog="python -m tools.batch",
+        description="Run steganography engines over many carriers in parallel.",
+    )
+    parser.add_argument("operation", choices=["embed", "extract", "info"])
+    parser.add_argument("paths", nargs="*", help="carrier files or directories")
+    parser.add_argument("-e", "--engine", required=True, choices=sorted(ENGINES))
+    parser.add_argument("-p", "--password", default="")
+    message = parser.add_mutually_exclusive_group()
+    message.add_argument("-m", "--message", help="message to embed")
+    message.add_argument("-f", "--message-file", help="file whose contents are embedded")
+    message.add_argument("-F", "--payload-dir",
+                         help="embed each file in this directory into its own carrier, chosen by capacity")
+    message.add_argument("-M", "--manifest",
+                         help="CSV or JSON list of carrier,payload,password,output rows to embed")
+    parser.add_argument("-o", "--output-dir", help="directory for stego files / extracted payloads")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("-r", "--recursive", action="store_true", help="descend into subdirectories")
+    parser.add_argument("--ext", action="append", default=None,
+                        help="carrier extension filter (repeatable, default: engine's formats)")
+    parser.add_argument("--no-capacity-check", action="store_true",
+                        help="embed without checking carrier capacities first")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="seconds each tool run may take (default: the engine's own limit)")
+    parser.add_argument("--report", help="write the summary and all results as JSON to this file")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="time the phases of every task and write them as a Chrome trace JSON file")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="with --trace, also record the tracemalloc peak of each phase (slower)")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    # Carrier paths may follow the options as well as precede them
+    args = parser.parse_intermixed_args(argv)
+    if args.manifest:
+        if args.operation != "embed":
+            parser.error("--manifest only applies to embed")
+        return run_manifest(args)
+    if not args.paths:
+        parser.error("no carrier files or directories given")
+
+    message = None
+    payloads = {}
+    if args.operation == "embed":
+        if args.payload_dir:
+            for name in sorted(os.listdir(args.payload_dir)):
+                path = os.path.join(args.payload_dir, name)
+                if os.path.isfile(path):
+                    with open(path, "rb") as f:
+                        payloads[path] = f.read()
+        elif args.message_file:
+            with open(args.message_file, "rb") as f:
+                message = f.read()
+        elif args.message is not None:
+            message = args.message.encode("utf-8")
+        else:
+            print("embed needs --message, --message-file or --payload-dir", file=sys.stderr)
+            return 2
+        if not args.output_dir:
+            print("embed needs --output-dir", file=sys.stderr)
+            return 2
+
+    extensions = args.ext if args.ext is not None else ENGINES[args.engine].carrier_extensions
+    carriers = collect_carriers(args.paths, extensions, args.recursive)
+    if not carriers:
+        print("No carriers found.", file=sys.stderr)
+        return 1
+
+    payload_of = {}
+
+    def report(result):
+        if result["carrier"] in payload_of:
+            result["payload_file"] = payload_of[result["carrier"]]
+        status = "OK" if result["ok"] else "FAIL"
+        line = f"[{status}] {result['carrier']}"
+        if result.get("payload_file"):
+            line += f" <- {result['payload_file']}"
+        if result.get("output_file"):
+            line += f" -> {result['output_file']}"
+        if not result["ok"] and result.get("error"):
+            line += f": {result['error'].strip()}"
+        print(line, flush=True)
+
+    rejected = []
+    engine = get_engine(args.engine)
+    if payloads:
+        # Sizes the tool can't predict are estimated by the raw size
+        needed = {path: engine.payload_size(data) or len(data) for path, data in payloads.items()}
+        capacities, errors = measure_capacities(args.engine, carriers, args.password, args.workers)
+        assigned, unplaced = assign_payloads(needed, capacities)
+        payload_of = {carrier: path for path, carrier in assigned.items()}
+        carriers = sorted(payload_of)
+        for path in unplaced:
+            print(f"[FAIL] {path}: no carrier can hold {needed[path]} bytes", flush=True)
+            rejected.append({"engine": args.engine, "operation": "embed", "carrier": None,
+                             "payload_file": path, "ok": False, "error": "no carrier large enough"})
+        messages = {carrier: payloads[path] for carrier, path in payload_of.items()}
+    else:
+        messages = None
+        needed = engine.payload_size(message) if args.operation == "embed" else None
+        if needed is not None and not args.no_capacity_check:
+            capacities, _errors = measure_capacities(args.engine, carriers, args.password, args.workers)
+            fits = []
+            for carrier in carriers:
+                available = capacities.get(carrier)
+                if available is not None and needed > available:
+                    rejected.append(too_small(args.engine, carrier, needed, available))
+                    report(rejected[-1])
+                else:
+                    fits.append(carrier)
+            carriers = fits
+
+    started = time.perf_counter()
+    results = rejected + run_batch(args.engine, args.operation, carriers, args.password, message,
+                                   args.output_dir, args.workers, on_result=report, messages=messages,
+                                   timeout=args.timeout, trace=bool(args.trace), memory=args.trace_memory)
+    return finish(args, results, time.perf_counter() - started)
+
+
+def run_manifest(args):
+    """Embed every row of a manifest; the workers check capacities themselves"""
+    try:
+        tasks, errors = read_manifest(args.manifest, args.password)
+    except (OSError, ValueError) as e:
+        print(f"Cannot read manifest: {e}", file=sys.stderr)
+        return 2
+    for error in errors:
+        print(f"[SKIP] {error}", file=sys.stderr)
+    if not tasks:
+        print("No tasks in manifest.", file=sys.stderr)
+        return 1
+
+    def report(result):
+        status = "OK" if result["ok"] else "FAIL"
+        line = f"[{status}] {result['carrier']} <- {result['payload_file']} ({result['seconds']:.2f}s)"
+        if not result["ok"] and result.get("error"):
+            line += f": {result['error'].strip()}"
+        print(line, flush=True)
+
+    started = time.perf_counter()
+    results = run_tasks(args.engine, "embed", tasks, args.workers, on_result=report, timeout=args.timeout,
+                        trace=bool(args.trace), memory=args.trace_memory)
+    return finish(args, results, time.perf_counter() - started, skipped=errors)
+
+
+def finish(args, results, wall_seconds, skipped=()):
+    """Print the totals, write the report; returns the exit status"""
+    summary = summarize(results, wall_seconds)
+    print(f"{summary['ok']}/{summary['tasks']} succeeded in {summary['wall_seconds']:.2f}s")
+    # The spans go to the trace file; the report keeps the time per phase
+    traces = [result.pop("trace") for result in results if "trace" in result]
+    if summary.get("phase_seconds"):
+        print("Time per phase: " + ", ".join(f"{name} {wall:.2f}s"
+                                             for name, wall in summary["phase_seconds"].items()))
+    if args.trace:
+        write_chrome_trace(args.trace, traces)
+        print(f"Trace of {len(traces)} task(s) written to {args.trace}")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "skipped": list(skipped), "results": results}, f, indent=2)
+    return 1 if summary["failed"] or skipped else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
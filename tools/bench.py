@@ -0,0 +1,681 @@
+"""
+Benchmark Suite
+Embed/extract throughput of every engine over synthetic carriers.
+
+    python -m tools.bench                          # small + medium carriers, all engines
+    python -m tools.bench -e lsb -s large -o results.json
+    python -m tools.bench --save-baseline          # record this machine's numbers
+    python -m tools.bench --compare                # exit 1 if slower than the baseline
+
+External tools are replaced by stub executables: small Python scripts that
+accept the same command lines and round-trip the payload. What is measured
+for those engines is the wrapper itself (process start, payload handoff,
+output capture), on any machine, with or without the real tools.
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import string
+import struct
+import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; PNG/BMP carriers and the LSB engine need it
+    np = None
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+from .engine import ENGINES, EngineError, get_engine, load_native_engines
+from .registry import ToolRegistry, ToolSpec, cache_dir, set_registry
+
+PASSWORD = "bench-password"
+BASELINE_FILE = "bench_baseline.json"
+
+# Carrier dimensions per size class: pixels, seconds of 44.1 kHz stereo, bytes
+SIZES = {
+    "small": {"image": (128, 128), "wav": 10.0, "gif": (64, 64), "text": 4 * 1024},
+    "medium": {"image": (512, 512), "wav": 60.0, "gif": (256, 256), "text": 64 * 1024},
+    "large": {"image": (1024, 1024), "wav": 180.0, "gif": (512, 512), "text": 1024 * 1024},
+}
+FORMATS = ("png", "bmp", "wav", "gif", "txt")
+TEXT_WIDTH = 72                # characters per line of the text carriers
+NUMPY_FORMATS = ("png", "bmp")
+
+
+# ---------------------------------------------------------------------------
+# Synthetic carriers
+# ---------------------------------------------------------------------------
+
+def make_image(path, width, height, seed=1):
+    """Gradient plus noise, so PNG compresses like a photo rather than static"""
+    from .image_lsb import write_image
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([
+        x * 255 // max(width - 1, 1),
+        y * 255 // max(height - 1, 1),
+        (x + y) * 255 // max(width + height - 2, 1),
+    ], axis=-1)
+    noise = np.random.default_rng(seed).integers(-8, 9, size=base.shape)
+    write_image(path, np.clip(base + noise, 0, 255).astype(np.uint8))
+
+
+def make_wav(path, seconds, seed=1, samplerate=44100):
+    """16-bit stereo: a tone with some noise"""
+    frames = int(seconds * samplerate)
+    if np is not None:
+        t = np.arange(frames) / samplerate
+        tone = 8000 * np.sin(2 * np.pi * 440 * t)
+        noise = np.random.default_rng(seed).normal(0, 500, size=(frames, 2))
+        samples = np.clip(tone[:, None] + noise, -32768, 32767).astype("<i2").tobytes()
+    else:
+        samples = random.Random(seed).randbytes(frames * 4)
+    with wave.open(path, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(samplerate)
+        w.writeframes(samples)
+
+
+def _lzw_literals(indices):
+    """8-bit LZW stream made of literal codes only. A CLEAR code is sent
+    every 250 pixels so the code width never grows past 9 bits.
+    """
+    clear, end = 256, 257
+    acc = nbits = 0
+    out = bytearray()
+
+    def put(code):
+        nonlocal acc, nbits
+        acc |= code << nbits
+        nbits += 9
+        while nbits >= 8:
+            out.append(acc & 0xFF)
+            acc >>= 8
+            nbits -= 8
+
+    for start in range(0, len(indices), 250):
+        put(clear)
+        for index in indices[start:start + 250]:
+            put(index)
+    put(end)
+    if nbits:
+        out.append(acc & 0xFF)
+    return bytes(out)
+
+
+def make_gif(path, width, height, seed=1):
+    """256-colour GIF with a shuffled palette"""
+    rng = random.Random(seed)
+    palette = bytearray(rng.randbytes(768))
+    indices = bytes((x + y + rng.randrange(4)) & 0xFF for y in range(height) for x in range(width))
+    data = _lzw_literals(indices)
+    with open(path, "wb") as f:
+        f.write(b"GIF89a")
+        f.write(struct.pack("<HHBBB", width, height, 0xF7, 0, 0))
+        f.write(palette)
+        f.write(b"\x2c" + struct.pack("<HHHHB", 0, 0, width, height, 0))
+        f.write(b"\x08")
+        for start in range(0, len(data), 255):
+            block = data[start:start + 255]
+            f.write(bytes([len(block)]) + block)
+        f.write(b"\x00\x3b")
+
+
+def make_text(path, nbytes, seed=1, width=TEXT_WIDTH):
+    """About ``nbytes`` of random words, wrapped into lines of at most
+    ``width`` characters (the text engines hide a few bytes per line)
+    """
+    rng = random.Random(seed)
+    lines, line = [], []
+    size = length = 0
+    while size < nbytes:
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 9)))
+        if line and length + 1 + len(word) > width:
+            lines.append(" ".join(line) + "\n")
+            line, length = [], -1
+        line.append(word)
+        length += len(word) + 1
+        size += len(word) + 1
+    if line:
+        lines.append(" ".join(line) + "\n")
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write("".join(lines))
+
+
+def carrier_path(directory, fmt, size):
+    return os.path.join(directory, f"{size}.{fmt}")
+
+
+def make_carrier(directory, fmt, size):
+    """Create (once) the carrier of a format and size class; returns its path"""
+    path = carrier_path(directory, fmt, size)
+    if os.path.exists(path):
+        return path
+    dims = SIZES[size]
+    if fmt in ("png", "bmp"):
+        make_image(path, *dims["image"])
+    elif fmt == "wav":
+        make_wav(path, dims["wav"])
+    elif fmt == "gif":
+        make_gif(path, *dims["gif"])
+    else:
+        make_text(path, dims["text"])
+    return path
+
+
+def make_carriers(directory, pairs):
+    """Create the carriers of (format, size) pairs"""
+    for fmt, size in pairs:
+        make_carrier(directory, fmt, size)
+
+
+def make_payload(nbytes, seed=2):
+    """Readable text, so engines that reject binary-looking output accept it"""
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits + "     "
+    return "".join(rng.choice(alphabet) for _ in range(max(1, nbytes))).encode("ascii")
+
+
+# ---------------------------------------------------------------------------
+# Stub tools
+# ---------------------------------------------------------------------------
+
+STUB_SOURCE = r'''"""Stand-in for the external steganography tools, written by tools/bench.py"""
+import hashlib
+import struct
+import sys
+
+MARK = b"STEGO-BENCH-STUB"
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def seal(carrier, password, payload):
+    key = hashlib.sha1(password.encode()).digest()[:8]
+    return read(carrier) + MARK + key + struct.pack("<I", len(payload)) + payload
+
+
+def unseal(path, password):
+    data = read(path)
+    at = data.rfind(MARK)
+    if at < 0:
+        return None
+    at += len(MARK)
+    if data[at:at + 8] != hashlib.sha1(password.encode()).digest()[:8]:
+        return None
+    (n,) = struct.unpack("<I", data[at + 8:at + 12])
+    return data[at + 12:at + 12 + n]
+
+
+def options(args, flags=()):
+    opts, rest, i = {}, [], 0
+    while i < len(args):
+        if args[i] in flags:
+            opts[args[i]] = True
+            i += 1
+        elif args[i].startswith("-") and len(args[i]) > 1 and i + 1 < len(args):
+            opts[args[i]] = args[i + 1]
+            i += 2
+        else:
+            rest.append(args[i])
+            i += 1
+    return opts, rest
+
+
+def steghide(args):
+    opts, _ = options(args[1:], ("-f",))
+    if args[0] == "embed":
+        payload = sys.stdin.buffer.read() if opts["-ef"] == "-" else read(opts["-ef"])
+        write(opts["-sf"], seal(opts["-cf"], opts["-p"], payload))
+        sys.stderr.write(f'embedding "{opts["-ef"]}" in "{opts["-cf"]}"... done\n')
+    elif args[0] == "extract":
+        payload = unseal(opts["-sf"], opts["-p"])
+        if payload is None:
+            sys.stderr.write("steghide: could not extract any data with that passphrase!\n")
+            return 1
+        if opts["-xf"] == "-":
+            sys.stdout.buffer.write(payload)
+        else:
+            write(opts["-xf"], payload)
+        sys.stderr.write(f'wrote extracted data to "{opts["-xf"]}".\n')
+    else:
+        size = len(read(args[1]))
+        print(f'"{args[1]}":\n  format: stub\n  capacity: {size / 8 / 1024:.1f} KB')
+    return 0
+
+
+def encode(args):
+    opts, rest = options(args)
+    write(rest[1], seal(rest[0], opts["-P"], read(opts["-E"])))
+    print("Encoding done")
+    return 0
+
+
+def decode(args):
+    opts, rest = options(args, ("-X",))
+    payload = unseal(rest[0], opts["-P"])
+    write(rest[0] + ".pcm", b"\0" * 4096)
+    if payload is None:
+        return 1
+    write(rest[0] + ".txt", payload)
+    print("Decoding done")
+    return 0
+
+
+def gifshuf(args):
+    opts, rest = options(args, ("-C", "-S", "-CS"))
+    if "-S" in opts:
+        print("File has storage capacity of 210 bytes")
+    elif len(rest) == 2:
+        write(rest[1], seal(rest[0], opts.get("-p", ""), opts["-m"].encode("utf-8")))
+    else:
+        payload = unseal(rest[0], opts.get("-p", ""))
+        if payload is None:
+            return 1
+        sys.stdout.buffer.write(payload)
+    return 0
+
+
+TOOLS = {"steghide": steghide, "mp3stego": encode, "mp3stego_decode": decode, "gifshuf": gifshuf}
+
+if __name__ == "__main__":
+    sys.exit(TOOLS[sys.argv[1]](sys.argv[2:]))
+'''
+
+# registry name -> label; the engines look these up with find_tool()
+STUB_TOOLS = {
+    "steghide": "Steghide",
+    "mp3stego": "MP3Stego Encode",
+    "mp3stego_decode": "MP3Stego Decode",
+    "gifshuf": "GIFShuffle",
+}
+
+
+def write_stubs(directory):
+    """Write the stub tool executables; returns {registry name: path}"""
+    stub = os.path.join(directory, "stub_tool.py")
+    with open(stub, "w", encoding="utf-8") as f:
+        f.write(STUB_SOURCE)
+    paths = {}
+    for name in STUB_TOOLS:
+        if os.name == "nt":
+            path = os.path.join(directory, f"{name}.cmd")
+            with open(path, "w") as f:
+                f.write(f'@"{sys.executable}" -S "{stub}" {name} %*\n')
+        else:
+            path = os.path.join(directory, name)
+            with open(path, "w") as f:
+                f.write(f"#!/bin/sh\nexec '{sys.executable}' -S '{stub}' {name} \"$@\"\n")
+            os.chmod(path, 0o755)
+        paths[name] = path
+    return paths
+
+
+def stub_registry(directory):
+    """A tool registry that only knows the stubs in ``directory``"""
+    specs = {
+        name: ToolSpec(name, f"{label} (stub)", [os.path.join(directory, name + (".cmd" if os.name == "nt" else ""))])
+        for name, label in STUB_TOOLS.items()
+    }
+    return ToolRegistry(specs, cache_file=os.path.join(directory, "tools.json"))
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+def reset_peak_rss():
+    """Start a new peak RSS measurement of this process. Returns False where
+    that is not possible and only the lifetime peak (ru_maxrss, which on
+    Linux includes the parent's RSS when this process was started) is known
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")   # resets VmHWM to the current RSS
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_since_reset_kb():
+    """VmHWM of this process in KiB, or None"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def peak_rss_kb(children=False):
+    """Peak resident set size of this process (or its finished children), in KiB"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    return usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an already sorted list"""
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def latency_stats(seconds, carrier_bytes, payload_bytes):
+    ordered = sorted(seconds)
+    p50 = percentile(ordered, 50)
+    return {
+        "runs": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "min_ms": ordered[0] * 1000,
+        "p50_ms": p50 * 1000,
+        "p90_ms": percentile(ordered, 90) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+        "carrier_mb_s": carrier_bytes / p50 / 1e6 if p50 else None,
+        "payload_mb_s": payload_bytes / p50 / 1e6 if p50 else None,
+    }
+
+
+def capacity_bytes(engine, carrier):
+    """Usable payload bytes of a carrier, as far as the engine reports it"""
+    try:
+        available = engine.usable_bytes(engine.capacity(carrier), PASSWORD)
+    except EngineError:
+        available = None
+    if available is None:
+        return os.path.getsize(carrier) // 8   # one bit per carrier byte
+    return available
+
+
+def payload_for(engine, target):
+    """The largest test payload that takes up at most ``target`` bytes once
+    the engine has compressed/encrypted it
+    """
+    if engine.payload_size(b"x") is None:
+        return make_payload(target)
+    lo, hi = 1, 2 * max(target, 1)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if engine.payload_size(make_payload(mid)) <= target:
+            lo = mid
+        else:
+            hi = mid - 1
+    return make_payload(lo)
+
+
+def output_path(workdir, engine_name, carrier):
+    base, ext = os.path.splitext(os.path.basename(carrier))
+    if engine_name == "mp3stego":
+        ext = ".mp3"
+    return os.path.join(workdir, f"{engine_name}_{base}_stego{ext}")
+
+
+def run_case(case, stub_dir=None, repeat=5):
+    """Time embed and extract of one engine/carrier/fill combination.
+    The first round warms caches and is not counted.
+    """
+    if stub_dir:
+        set_registry(stub_registry(stub_dir))
+    result = dict(case)
+    measured = reset_peak_rss()
+    try:
+        engine = get_engine(case["engine"])
+        carrier = case["carrier"]
+        carrier_bytes = os.path.getsize(carrier)
+        payload = payload_for(engine, int(capacity_bytes(engine, carrier) * case["fill"]))
+        output = output_path(case["workdir"], case["engine"], carrier)
+        embed_times, extract_times = [], []
+        for round_no in range(repeat + 1):
+            start = time.perf_counter()
+            embedded = engine.embed(carrier, payload, output, PASSWORD)
+            middle = time.perf_counter()
+            if not embedded.ok:
+                raise RuntimeError(f"embed failed: {embedded.error}")
+            extracted = engine.extract(output, PASSWORD)
+            end = time.perf_counter()
+            if not extracted.ok or extracted.payload != payload:
+                raise RuntimeError(f"extract failed: {extracted.error or 'payload differs'}")
+            if round_no:
+                embed_times.append(middle - start)
+                extract_times.append(end - middle)
+        result.update(
+            carrier_bytes=carrier_bytes,
+            payload_bytes=len(payload),
+            embed=latency_stats(embed_times, carrier_bytes, len(payload)),
+            extract=latency_stats(extract_times, carrier_bytes, len(payload)),
+            peak_rss_kb=(peak_rss_since_reset_kb() if measured else None) or peak_rss_kb(),
+            # ru_maxrss is a lifetime high-water mark, so without a reset it
+            # only bounds this case's peak from above
+            peak_rss_upper_bound=not measured,
+            peak_child_rss_kb=peak_rss_kb(children=True),
+        )
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def plan_cases(engine_names, sizes, fills, workdir, isolate=True):
+    """Carriers are generated here; returns (cases, skipped notes).
+
+    With ``isolate`` they are generated in a throwaway process: on Linux a
+    new process inherits the peak RSS of its parent, so generating them
+    here would add it to every case's numbers.
+    """
+    cases, skipped, pairs = [], [], []
+    for name in engine_names:
+        extensions = ENGINES[name].carrier_extensions
+        for fmt in FORMATS:
+            if f".{fmt}" not in extensions:
+                continue
+            if fmt in NUMPY_FORMATS and np is None:
+                skipped.append(f"{name}/{fmt}: needs NumPy")
+                continue
+            for size in sizes:
+                carrier = carrier_path(workdir, fmt, size)
+                if (fmt, size) not in pairs:
+                    pairs.append((fmt, size))
+                for fill in fills:
+                    cases.append({
+                        "engine": name, "format": fmt, "size": size, "fill": fill,
+                        "carrier": carrier, "workdir": workdir,
+                    })
+    if isolate:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            pool.submit(make_carriers, workdir, pairs).result()
+    else:
+        make_carriers(workdir, pairs)
+    return cases, skipped
+
+
+def run_cases(cases, stub_dir, repeat, isolate=True, on_result=None):
+    """Run every case; with ``isolate`` each one gets a fresh process, so
+    neither earlier cases nor imports they pulled in count towards its peak
+    RSS (see run_case for how the peak itself is measured)
+    """
+    results = []
+    for case in cases:
+        if isolate:
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(run_case, case, stub_dir, repeat).result()
+        else:
+            result = run_case(case, stub_dir, repeat)
+        results.append(result)
+        if on_result:
+            on_result(result)
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Baselines
+# ---------------------------------------------------------------------------
+
+def case_key(result):
+    return f"{result['engine']}/{result['format']}/{result['size']}/fill={result['fill']}"
+
+
+def compare(results, baseline, tolerance):
+    """Rows of (key, operation, baseline p50, new p50, ratio, regressed)"""
+    previous = {case_key(r): r for r in baseline.get("results", []) if "error" not in r}
+    rows = []
+    for result in results:
+        old = previous.get(case_key(result))
+        if old is None or "error" in result:
+            continue
+        for operation in ("embed", "extract"):
+            before = old[operation]["p50_ms"]
+            after = result[operation]["p50_ms"]
+            ratio = after / before if before else float("inf")
+            rows.append((case_key(result), operation, before, after, ratio, ratio > 1 + tolerance))
+    return rows
+
+
+def default_baseline_path():
+    return os.path.join(cache_dir(), BASELINE_FILE)
+
+
+def report_line(result):
+    key = case_key(result)
+    if "error" in result:
+        return f"{key:<34} ERROR {result['error']}"
+    embed, extract = result["embed"], result["extract"]
+    rss = result["peak_rss_kb"]
+    if rss is not None and result.get("peak_rss_upper_bound"):
+        rss = f"<={rss}"
+    return (f"{key:<34} {result['payload_bytes']:>9} B  "
+            f"embed {embed['p50_ms']:8.1f} ms (p90 {embed['p90_ms']:7.1f}) {embed['carrier_mb_s']:7.1f} MB/s  "
+            f"extract {extract['p50_ms']:8.1f} ms (p90 {extract['p90_ms']:7.1f}) {extract['carrier_mb_s']:7.1f} MB/s  "
+            f"rss {rss if rss is not None else '-'} KiB")
+
+
+def build_parser():
+    load_native_engines()
+    parser = argparse.ArgumentParser(
+        prog="python -m tools.bench",
+        description="Benchmark embed/extract across engines, carrier sizes and payload fill ratios.",
+    )
+    parser.add_argument("-e", "--engine", action="append", choices=sorted(ENGINES),
+                        help="engine to run (repeatable, default: all)")
+    parser.add_argument("-s", "--size", action="append", choices=sorted(SIZES),
+                        help="carrier size class (repeatable, default: small and medium)")
+    parser.add_argument("-f", "--fill", action="append", type=float,
+                        help="payload as a fraction of capacity (repeatable, default: 0.1 0.5 0.9)")
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="timed rounds per case")
+    parser.add_argument("-o", "--output", help="write the results as JSON to this file")
+    parser.add_argument("--real-tools", action="store_true",
+                        help="use the installed external tools instead of the stubs")
+    parser.add_argument("--no-isolate", action="store_true",
+                        help="run every case in this process (faster; RSS includes earlier cases "
+                             "where the peak cannot be reset)")
+    parser.add_argument("--keep", metavar="DIR", help="generate carriers and outputs in DIR and keep them")
+    parser.add_argument("--save-baseline", nargs="?", const="", metavar="FILE",
+                        help="store the results as the baseline (default: the user cache directory)")
+    parser.add_argument("--compare", nargs="?", const="", metavar="FILE",
+                        help="compare against a stored baseline and exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed slowdown of the median before it counts as a regression")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    engines = args.engine or sorted(ENGINES)
+    sizes = args.size or ["small", "medium"]
+    fills = args.fill or [0.1, 0.5, 0.9]
+
+    workdir = args.keep or tempfile.mkdtemp(prefix="stego-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        stub_dir = None
+        if not args.real_tools:
+            stub_dir = os.path.join(workdir, "stubs")
+            os.makedirs(stub_dir, exist_ok=True)
+            write_stubs(stub_dir)
+
+        cases, skipped = plan_cases(engines, sizes, fills, workdir, not args.no_isolate)
+        for note in skipped:
+            print(f"skipped {note}", file=sys.stderr)
+        results = run_cases(cases, stub_dir, args.repeat, not args.no_isolate,
+                            on_result=lambda r: print(report_line(r), flush=True))
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__ if np is not None else None,
+            "stub_tools": not args.real_tools,
+            "isolated": not args.no_isolate,
+            "repeat": args.repeat,
+        },
+        "results": results,
+        "skipped": skipped,
+    }
+    for result in results:
+        for key in ("carrier", "workdir"):
+            result.pop(key, None)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    failed = sum(1 for r in results if "error" in r)
+    status = 1 if failed else 0
+
+    if args.compare is not None:
+        path = args.compare or default_baseline_path()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        except OSError:
+            print(f"No baseline at {path}; run with --save-baseline first.", file=sys.stderr)
+            return 2
+        rows = compare(results, baseline, args.tolerance)
+        regressions = [row for row in rows if row[5]]
+        for key, operation, before, after, ratio, regressed in rows:
+            flag = "REGRESSION" if regressed else "ok"
+            print(f"{key:<34} {operation:<8} {before:8.1f} -> {after:8.1f} ms  x{ratio:5.2f}  {flag}")
+        print(f"{len(regressions)} regression(s) in {len(rows)} comparisons (tolerance {args.tolerance:.0%})")
+        if regressions:
+            status = 1
+
+    if args.save_baseline is not None:
+        path = args.save_baseline or default_baseline_path()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {path}")
+
+    print(f"{len(results) - failed}/{len(results)} cases succeeded")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""
+Capacity Index
+How much each carrier can hold, per engine, without embedding anything.
+
+The numbers come from the engines (``Engine.capacity``) and are kept in an
+on-disk index keyed by the SHA-256 of the carrier's content, so a carrier is
+measured once however often it is copied or renamed. A second table maps
+paths to (size, mtime, hash) so unchanged files are not hashed again.
+
+    python -m tools.capacity -e lsb carriers/        # list capacities
+    python -m tools.capacity -e mp3stego -p secret recordings/
+
+Like engine.py, this module must not import tkinter.
+"""
+
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import sys
+import threading
+
+from .engine import ENGINES, EngineError, get_engine, load_native_engines
+from .registry import cache_dir
+
+INDEX_VERSION = 1
+INDEX_FILE_NAME = "capacity.json"
+HASH_CHUNK = 1024 * 1024
+
+
+def content_hash(path):
+    """SHA-256 of a file's content, as hex"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CapacityIndex:
+    """On-disk cache of Engine.capacity() results"""
+
+    def __init__(self, index_file=None):
+        self.index_file = index_file or os.path.join(cache_dir(), INDEX_FILE_NAME)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._paths = {}
+        self._dirty = False
+        self._read()
+
+    def digest(self, carrier):
+        """Content hash of ``carrier``, re-hashed only if its size or mtime changed"""
+        path = os.path.abspath(carrier)
+        st = os.stat(path)
+        stamp = [st.st_size, st.st_mtime_ns]
+        with self._lock:
+            known = self._paths.get(path)
+        if known and known[:2] == stamp:
+            return known[2]
+        digest = content_hash(path)
+        with self._lock:
+            self._paths[path] = stamp + [digest]
+            self._dirty = True
+        return digest
+
+    def key(self, engine, carrier):
+        return f"{self.digest(carrier)}:{engine.capacity_key}"
+
+    def lookup(self, engine, carrier):
+        """The cached capacity dict, or None"""
+        key = self.key(engine, carrier)
+        with self._lock:
+            return self._entries.get(key)
+
+    def store(self, engine, carrier, capacity):
+        key = self.key(engine, carrier)
+        with self._lock:
+            self._entries[key] = capacity
+            self._dirty = True
+
+    def capacity(self, engine, carrier):
+        """Capacity dict of ``carrier`` for ``engine``, measured on a miss"""
+        cached = self.lookup(engine, carrier)
+        if cached is not None:
+            return cached
+        capacity = engine.capacity(carrier)
+        self.store(engine, carrier, capacity)
+        return capacity
+
+    def usable_bytes(self, engine, carrier, password=""):
+        """Payload bytes that fit in ``carrier`` with this password, or None"""
+        return engine.usable_bytes(self.capacity(engine, carrier), password)
+
+    def save(self):
+        """Write the index, keeping entries other processes added meanwhile"""
+        with self._lock:
+            if not self._dirty:
+                return
+            entries, paths = dict(self._entries), dict(self._paths)
+            self._dirty = False
+        on_disk_entries, on_disk_paths = self._load_file()
+        data = {
+            "version": INDEX_VERSION,
+            "entries": {**on_disk_entries, **entries},
+            "paths": {**on_disk_paths, **paths},
+        }
+        tmp = f"{self.index_file}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.index_file)), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1)
+            os.replace(tmp, self.index_file)
+        except OSError:
+            # The index only saves time; a read-only home is not an error
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def _read(self):
+        self._entries, self._paths = self._load_file()
+
+    def _load_file(self):
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                return data.get("entries", {}), data.get("paths", {})
+        except (OSError, ValueError, AttributeError):
+            pass
+        return {}, {}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """The process-wide capacity index, loaded on first use"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = CapacityIndex()
+        return _index
+
+
+def measure(engine_name, carrier, **options):
+    """Engine.capacity() as a plain dict for worker processes; errors are
+    returned in ``error`` rather than raised
+    """
+    try:
+        return {"carrier": carrier, "capacity": get_engine(engine_name, **options).capacity(carrier)}
+    except (EngineError, OSError) as e:
+        return {"carrier": carrier, "error": str(e)}
+
+
+def assign_payloads(payloads, capacities):
+    """Give each payload its own carrier, best fit first.
+
+    ``payloads`` maps payload name -> bytes needed, ``capacities`` maps
+    carrier -> usable bytes (None if unknown; such carriers are not used).
+    Largest payloads are placed first, each in the smallest carrier that
+    holds it. Returns ({payload: carrier}, [payloads that did not fit]).
+    """
+    free = sorted((size, carrier) for carrier, size in capacities.items() if size is not None)
+    assigned, unplaced = {}, []
+    for name, needed in sorted(payloads.items(), key=lambda item: item[1], reverse=True):
+        at = bisect.bisect_left(free, (needed, ""))
+        if at == len(free):
+            unplaced.append(name)
+            continue
+        assigned[name] = free.pop(at)[1]
+    return assigned, unplaced
+
+
+def build_parser():
+    load_native_engines()
+    parser = argparse.ArgumentParser(
+        prog="python -m tools.capacity",
+        description="Report how much each carrier can hold, using the cached capacity index.",
+    )
+    parser.add_argument("paths", nargs="+", help="carrier files or directories")
+    parser.add_argument("-e", "--engine", required=True, choices=sorted(ENGINES))
+    parser.add_argument("-p", "--password", default="",
+                        help="password, for engines whose capacity depends on it")
+    parser.add_argument("-r", "--recursive", action="store_true", help="descend into subdirectories")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    return parser
+
+
+def main(argv=None):
+    from .batch import collect_carriers, measure_capacities
+
+    args = build_parser().parse_args(argv)
+    carriers = collect_carriers(args.paths, ENGINES[args.engine].carrier_extensions, args.recursive)
+    if not carriers:
+        print("No carriers found.", file=sys.stderr)
+        return 1
+    capacities, errors = measure_capacities(args.engine, carriers, args.password)
+    if args.json:
+        json.dump({"capacities": capacities, "errors": errors}, sys.stdout, indent=2)
+        print()
+    else:
+        for carrier in carriers:
+            if carrier in errors:
+                print(f"{'?':>12}  {carrier}: {errors[carrier]}")
+            else:
+                size = capacities[carrier]
+                print(f"{size if size is not None else '?':>12}  {carrier}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+"""
+Extraction Cache
+Remembers what an extract returned, so repeating it does not run the tool.
+
+Extracting with the same tool and password from the same carrier always
+gives the same answer, so the result is kept on disk keyed by the SHA-256
+of the carrier's content, the engine and its options, a hash of the
+password and the version of the tool (the size and mtime of its
+executable; see Engine.tool_version). Failures are kept too, as long as the
+tool ran to the end: a wrong password stays wrong. Timeouts and missing
+tools are not cached.
+
+Each result is one file, so processes share the cache without locking.
+Hits touch the file's mtime, and when the files together grow past
+MAX_BYTES the least recently used ones are deleted. The most recent results
+are also held in memory, so in a running application a repeated extract
+costs two stat calls and a dictionary lookup. Carrier hashes come from the
+capacity index, which only re-hashes files whose size or mtime changed.
+
+The cache holds extracted payloads in the clear; its directory is private
+to the user (0700), and ``python -m tools.extract_cache --clear`` empties it.
+
+Like engine.py, this module must not import tkinter.
+"""
+
+import argparse
+import collections
+import hashlib
+import json
+import os
+import sys
+import threading
+
+from .capacity import get_index
+from .engine import OperationResult, to_bytes
+from .registry import cache_dir
+
+CACHE_VERSION = 1
+CACHE_DIR_NAME = "extract"
+MAX_BYTES = 256 * 1024 * 1024     # on disk, all entries together
+MEMORY_ENTRIES = 64               # most recent results also kept in memory
+MEMORY_BYTES = 32 * 1024 * 1024
+
+
+class ExtractCache:
+    """On-disk LRU cache of Engine.extract() results"""
+
+    def __init__(self, directory=None, max_bytes=MAX_BYTES, memory_entries=MEMORY_ENTRIES):
+        self.directory = directory or os.path.join(cache_dir(), CACHE_DIR_NAME)
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self._lock = threading.Lock()
+        self._memory = collections.OrderedDict()   # key -> (meta, payload)
+        self._memory_bytes = 0
+
+    def key(self, engine, carrier, password=""):
+        """Cache key of an extract, or None for engines without a tool version"""
+        version = engine.tool_version()
+        if version is None:
+            return None
+        digest = get_index().digest(carrier)
+        # The password only enters salted with the carrier, never on its own
+        secret = hashlib.sha256(b"extract-cache\0" + digest.encode() + b"\0" + to_bytes(password)).hexdigest()
+        parts = [CACHE_VERSION, engine.capacity_key, version, digest, secret]
+        return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.bin")
+
+    def lookup(self, engine, carrier, password="", key=None):
+        """The cached OperationResult, or None"""
+        key = key or self.key(engine, carrier, password)
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+        if entry is None:
+            entry = self._read(key)
+            if entry is None:
+                return None
+            self._remember(key, entry)
+        else:
+            self._touch(key)
+        meta, payload = entry
+        details = dict(meta["details"], cached=True)
+        return OperationResult(engine.name, "extract", carrier, ok=meta["ok"], payload=payload,
+                               returncode=meta["returncode"], stdout=meta["stdout"], stderr=meta["stderr"],
+                               error=meta["error"], details=details)
+
+    def store(self, engine, carrier, password, result, key=None):
+        """Keep ``result`` if the tool ran to the end"""
+        if result.returncode is None:
+            return
+        key = key or self.key(engine, carrier, password)
+        if key is None:
+            return
+        meta = {
+            "ok": result.ok,
+            "returncode": result.returncode,
+            "stdout": result.stdout if isinstance(result.stdout, str) else "",
+            "stderr": result.stderr if isinstance(result.stderr, str) else "",
+            "error": result.error,
+            "details": {k: v for k, v in result.details.items() if k != "cached"},
+        }
+        entry = (meta, result.payload)
+        self._remember(key, entry)
+        self._write(key, entry)
+        self._evict()
+
+    def extract(self, engine, carrier, password=""):
+        """engine.extract(carrier, password), answered from the cache when possible"""
+        key = self.key(engine, carrier, password)
+        if key is not None:
+            cached = self.lookup(engine, carrier, password, key)
+            if cached is not None:
+                engine.log("Using the result of an earlier extract of this file (cached)")
+                return cached
+        result = engine.extract(carrier, password)
+        if key is not None:
+            self.store(engine, carrier, password, result, key)
+            get_index().save()   # keep the carrier's hash for the next session
+        return result
+
+    def clear(self):
+        """Delete every cached result"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        for path, _size, _mtime in self._files():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        files = self._files()
+        return {"directory": self.directory, "entries": len(files),
+                "bytes": sum(size for _path, size, _mtime in files), "max_bytes": self.max_bytes}
+
+    # -- memory -----------------------------------------------------------
+
+    def _remember(self, key, entry):
+        size = len(entry[1] or b"")
+        if size > MEMORY_BYTES:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old[1] or b"")
+            self._memory[key] = entry
+            self._memory_bytes += size
+            while self._memory and (len(self._memory) > self.memory_entries or self._memory_bytes > MEMORY_BYTES):
+                _key, dropped = self._memory.popitem(last=False)
+                self._memory_bytes -= len(dropped[1] or b"")
+
+    # -- disk ---------------------------------------------------------------
+
+    def _touch(self, key):
+        try:
+            os.utime(self._path(key))   # most recently used
+        except OSError:
+            pass
+
+    def _read(self, key):
+        # One JSON line of metadata, then the payload
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            self._touch(key)
+            head, _, payload = data.partition(b"\n")
+            meta = json.loads(head)
+            return meta, (payload if meta.get("has_payload") else None)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, key, entry):
+        meta, payload = entry
+        data = json.dumps(dict(meta, has_payload=payload is not None)).encode("utf-8") + b"\n" + (payload or b"")
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            # The cache only saves time; a read-only home is not an error
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def _files(self):
+        """(path, size, mtime) of every entry"""
+        files = []
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".bin"):
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        files.append((entry.path, st.st_size, st.st_mtime_ns))
+        except OSError:
+            pass
+        return files
+
+    def _evict(self):
+        """Delete the least recently used entries beyond max_bytes"""
+        files = self._files()
+        total = sum(size for _path, size, _mtime in files)
+        if total <= self.max_bytes:
+            return
+        for path, size, _mtime in sorted(files, key=lambda f: f[2]):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """The process-wide extraction cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExtractCache()
+        return _cache
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m tools.extract_cache",
+        description="Show or clear the cache of extraction results.",
+    )
+    parser.add_argument("--clear", action="store_true", help="delete every cached result")
+    args = parser.parse_args(argv)
+    cache = get_cache()
+    if args.clear:
+        cache.clear()
+    stats = cache.stats()
+    print(f"{stats['entries']} cached result(s), {stats['bytes']:,} of {stats['max_bytes']:,} bytes "
+          f"in {stats['directory']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
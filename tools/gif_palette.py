@@ -0,0 +1,399 @@
+"""
+Native GIF Palette Engine
+Hides data in the order of a GIF's global colour table, like GIF Shuffle,
+without spawning GIFSHUF.EXE.
+
+A table of n distinct colours can be put in n! orders, so the order carries
+floor(log2 n!) bits: the message is read as one big integer and written in
+the factorial number system, each digit picking the next colour from those
+left in a reference order. The reference order sorts the colours by a hash
+keyed with the password, so extracting with another password yields noise.
+
+The image itself must not change, so every pixel index is remapped to the
+colour's new slot. Pixel data is LZW compressed, but a dictionary entry is
+always built from earlier literal codes: replacing each literal code by its
+new index remaps the whole image while every code keeps its width. The
+index bytes are therefore patched in place; no frame is decoded or
+re-encoded and every other byte of the file is copied unchanged.
+
+Only the global colour table is used; frames with a local colour table are
+left alone. The payload is not encrypted.
+"""
+
+import functools
+import hashlib
+import math
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency, checked when the engine is used
+    np = None
+
+from .engine import Engine, EngineError, register_engine, to_bytes
+from .spans import span
+
+MAGIC = b"G\x01"   # starts every hidden payload; tells a real one from noise
+MAX_CODE = 4096    # LZW dictionaries stop growing at 12-bit codes
+SEGMENT = 8192     # most codes decoded per vectorised step
+
+
+def require_numpy():
+    if np is None:
+        raise EngineError("The native GIF palette engine requires NumPy.\nInstall it with: pip install numpy")
+
+
+# ---------------------------------------------------------------------------
+# GIF structure
+# ---------------------------------------------------------------------------
+
+class GifLayout:
+    """Offsets of everything the engine rewrites in a GIF file"""
+
+    def __init__(self, data):
+        self.colours = self.colours_in(data)
+        self.palette = 13
+        self.background = 11
+        self.transparent = []   # offsets of GCE transparent indices into the global table
+        self.frames = []        # (min code size, [(offset, length) of each sub-block])
+        self.local_frames = 0
+        self._parse(data, self.palette + 3 * self.colours)
+
+    @staticmethod
+    def colours_in(data):
+        """Size of the global colour table, from the first 13 bytes"""
+        if data[:6] not in (b"GIF87a", b"GIF89a") or len(data) < 13:
+            raise EngineError("Not a GIF file.")
+        packed = data[10]
+        if not packed & 0x80:
+            raise EngineError("This GIF has no global colour table to hide data in.")
+        return 2 << (packed & 0x07)
+
+    def _parse(self, data, pos):
+        pending_gce = None
+        while pos < len(data):
+            block = data[pos]
+            if block == 0x3B:   # trailer
+                return
+            if block == 0x21:   # extension
+                label = data[pos + 1]
+                if label == 0xF9 and data[pos + 2] == 4:
+                    pending_gce = (pos + 6) if data[pos + 3] & 0x01 else None
+                pos = self._skip_blocks(data, pos + 2)
+            elif block == 0x2C:  # image descriptor
+                packed = data[pos + 9]
+                pos += 10
+                if packed & 0x80:
+                    pos += 3 * (2 << (packed & 0x07))
+                    self.local_frames += 1
+                    blocks = None
+                else:
+                    if pending_gce is not None:
+                        self.transparent.append(pending_gce)
+                    blocks = []
+                pending_gce = None
+                min_code_size = data[pos]
+                end = self._skip_blocks(data, pos + 1, blocks)
+                if blocks is not None:
+                    self.frames.append((min_code_size, blocks))
+                pos = end
+            else:
+                raise EngineError(f"Corrupt GIF: unexpected block 0x{block:02x} at offset {pos}.")
+        raise EngineError("Corrupt GIF: missing trailer.")
+
+    @staticmethod
+    def _skip_blocks(data, pos, blocks=None):
+        """Walk a sub-block chain, returning the offset after its terminator"""
+        while True:
+            if pos >= len(data):
+                raise EngineError("Corrupt GIF: truncated data.")
+            size = data[pos]
+            if size == 0:
+                return pos + 1
+            if blocks is not None:
+                blocks.append((pos + 1, size))
+            pos += 1 + size
+
+
+def read_palette(data, layout):
+    raw = data[layout.palette:layout.palette + 3 * layout.colours]
+    return [bytes(raw[i:i + 3]) for i in range(0, len(raw), 3)]
+
+
+def distinct_palette(palette):
+    """Nudge duplicate colours to the nearest unused colour; identical
+    entries could be swapped without changing the order the decoder sees
+    """
+    seen, used, nearby = set(), set(palette), {}
+    result = []
+    for colour in palette:
+        if colour in seen:
+            # one generator per colour, so later duplicates resume the search
+            candidates = nearby.setdefault(colour, _nearby_colours(colour))
+            colour = next((c for c in candidates if c not in used), None)
+            if colour is None:
+                raise EngineError("Colour table has no unused colour left.")
+            used.add(colour)
+        seen.add(colour)
+        result.append(colour)
+    return result
+
+
+@functools.lru_cache(maxsize=None)
+def _nearby_offsets(radius=12):
+    """RGB offsets within an L1 distance of ``radius``, nearest first. Even
+    from a corner of the colour cube that leaves over 256 candidates.
+    """
+    offsets = [(dr, dg, db)
+               for dr in range(-radius, radius + 1)
+               for dg in range(-radius, radius + 1)
+               for db in range(-radius, radius + 1)
+               if 0 < abs(dr) + abs(dg) + abs(db) <= radius]
+    return sorted(offsets, key=lambda o: abs(o[0]) + abs(o[1]) + abs(o[2]))
+
+
+def _nearby_colours(colour):
+    r, g, b = colour
+    for dr, dg, db in _nearby_offsets():
+        candidate = (r + dr, g + dg, b + db)
+        if min(candidate) >= 0 and max(candidate) <= 255:
+            yield bytes(candidate)
+
+
+# ---------------------------------------------------------------------------
+# Permutation <-> integer
+# ---------------------------------------------------------------------------
+
+def reference_order(palette, password):
+    """Colours sorted by a password-keyed hash"""
+    key = hashlib.sha256(b"gifpalette:" + to_bytes(password)).digest()
+    return sorted(palette, key=lambda c: (hashlib.sha256(key + c).digest(), c))
+
+
+def capacity_bits(colours):
+    """floor(log2(colours!))"""
+    return math.factorial(colours).bit_length() - 1
+
+
+def capacity(colours):
+    """Usable payload bytes for a colour table of ``colours`` entries"""
+    return max(0, capacity_bits(colours) // 8 - len(MAGIC))
+
+
+def encode_order(number, reference):
+    """The arrangement of ``reference`` whose factorial-base rank is ``number``"""
+    remaining = list(reference)
+    order = []
+    for radix in range(len(remaining), 0, -1):
+        number, digit = divmod(number, radix)
+        order.append(remaining.pop(digit))
+    return order
+
+
+def decode_order(order, reference):
+    """Inverse of encode_order"""
+    remaining = list(reference)
+    digits = []
+    for colour in order:
+        digit = remaining.index(colour)
+        digits.append((digit, len(remaining)))
+        remaining.pop(digit)
+    number = 0
+    for digit, radix in reversed(digits):
+        number = number * radix + digit
+    return number
+
+
+# ---------------------------------------------------------------------------
+# LZW literal remapping
+# ---------------------------------------------------------------------------
+
+@functools.lru_cache(maxsize=None)
+def _schedule(start, min_code_size, length):
+    """Bit offsets (relative to the first), end offsets and bit masks of
+    ``length`` codes, the first being code number ``start`` after a clear code
+    """
+    k = np.arange(start, start + length, dtype=np.int64)
+    next_code = np.minimum((1 << min_code_size) + 2 + np.maximum(k - 1, 0), MAX_CODE)
+    # the decoder widens its codes once the next free code no longer fits
+    widths = np.clip(np.floor(np.log2(next_code)).astype(np.int64) + 1, min_code_size + 1, 12)
+    offsets = np.concatenate(([0], np.cumsum(widths[:-1])))
+    masks = ((1 << widths) - 1).astype(np.uint32)
+    return offsets, offsets + widths, masks
+
+
+def _lzw_codes(stream, min_code_size):
+    """Bit offsets and values of the codes of an LZW stream (bytes), up to
+    its end-of-information code
+    """
+    clear = 1 << min_code_size
+    end = clear + 1
+    total_bits = len(stream) * 8
+    # Every byte offset viewed as the start of an unaligned little-endian
+    # word, so each code is a single gather, shift and mask
+    padded = bytes(stream) + b"\0\0\0\0"
+    words = np.ndarray(shape=(len(stream) + 1,), dtype="<u4", buffer=padded, strides=(1,))
+    found = []
+    pos = 0          # bit offset of the next code
+    k = 0            # codes read since the last clear
+    # Encoders that clear often would waste most of a full segment, so the
+    # step follows the run length seen so far
+    length = 256
+    while pos < total_bits:
+        # Past 4096 codes without a clear, every code is 12 bits wide
+        offsets, ends, masks = _schedule(min(k, MAX_CODE), min_code_size, length)
+        count = int(np.searchsorted(ends, total_bits - pos, side="right"))
+        if not count:
+            break
+        offsets = offsets[:count] + pos
+        codes = (words[offsets >> 3] >> (offsets & 7).astype(np.uint32)) & masks[:count]
+
+        stops = np.flatnonzero((codes == clear) | (codes == end))
+        used = int(stops[0]) if len(stops) else count
+        found.append((offsets[:used], codes[:used]))
+        if used == count:
+            pos = int(ends[count - 1]) + pos
+            k += count
+            length = min(length * 2, SEGMENT)
+        elif codes[used] == clear:
+            pos = int(ends[used]) + pos
+            k = 0
+            length = max(256, 1 << (used + 1).bit_length())
+        else:
+            break   # end of information
+    if not found:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint32)
+    return np.concatenate([f[0] for f in found]), np.concatenate([f[1] for f in found])
+
+
+def _block_index(blocks):
+    """File offsets of the bytes of a sub-block chain, in stream order"""
+    starts = np.array([o for o, _n in blocks], dtype=np.int64)
+    lengths = np.array([n for _o, n in blocks], dtype=np.int64)
+    # position in the stream -> position in the file
+    shift = starts - np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return np.repeat(shift, lengths) + np.arange(int(lengths.sum()), dtype=np.int64)
+
+
+def remap_literals(stream, min_code_size, mapping):
+    """Replace every literal code of an LZW ``stream`` (bytes) by
+    mapping[code]; returns the patched bytes, same length as ``stream``
+    """
+    clear = 1 << min_code_size
+    offsets, codes = _lzw_codes(stream, min_code_size)
+
+    table = np.arange(clear, dtype=np.uint32)
+    table[:min(len(mapping), clear)] = mapping[:clear]
+    changed = np.flatnonzero((codes < clear) & (table[np.minimum(codes, clear - 1)] != codes))
+
+    out = np.zeros(len(stream) + 3, dtype=np.uint8)   # room for a code's last bytes
+    out[:len(stream)] = np.frombuffer(stream, dtype=np.uint8)
+    # Codes ``stride`` apart start at least a byte apart, so patching one
+    # residue class at a time keeps the indices of each fancy-indexed XOR
+    # unique (a code touches at most three bytes)
+    stride = 1 + -(-7 // (min_code_size + 1))
+    for residue in range(stride):
+        sel = changed[changed % stride == residue]
+        bits = (table[codes[sel]] ^ codes[sel]) << (offsets[sel] & 7)
+        byte = offsets[sel] >> 3
+        for i in range(3):
+            out[byte + i] ^= ((bits >> (8 * i)) & 0xFF).astype(np.uint8)
+    return out[:len(stream)].tobytes()
+
+
+# ---------------------------------------------------------------------------
+# Embed / extract
+# ---------------------------------------------------------------------------
+
+def embed(data, message, password=""):
+    """Return a copy of the GIF ``data`` whose colour order hides ``message``"""
+    require_numpy()
+    layout = GifLayout(data)
+    payload = to_bytes(message)
+    limit = capacity(layout.colours)
+    if 8 * (len(MAGIC) + len(payload)) > capacity_bits(layout.colours):
+        raise EngineError(
+            f"Message too large: {len(payload)} bytes, a {layout.colours}-colour table holds {limit} bytes."
+        )
+
+    old = distinct_palette(read_palette(data, layout))
+    number = int.from_bytes(MAGIC + payload, "big")
+    new = encode_order(number, reference_order(old, password))
+    slot = {colour: i for i, colour in enumerate(new)}
+    mapping = [slot[colour] for colour in old]
+
+    out = bytearray(data)
+    out[layout.palette:layout.palette + 3 * layout.colours] = b"".join(new)
+    for offset in [layout.background] + layout.transparent:
+        if data[offset] < layout.colours:
+            out[offset] = mapping[data[offset]]
+    source = np.frombuffer(data, dtype=np.uint8)
+    target = np.frombuffer(out, dtype=np.uint8)
+    for min_code_size, blocks in layout.frames:
+        index = _block_index(blocks)
+        patched = remap_literals(source[index].tobytes(), min_code_size, mapping)
+        target[index] = np.frombuffer(patched, dtype=np.uint8)
+    return bytes(out)
+
+
+def extract(data, password=""):
+    """Return the hidden payload, or None if the colour order holds none for this key"""
+    layout = GifLayout(data)
+    order = read_palette(data, layout)
+    if len(set(order)) != len(order):
+        return None   # never written by embed(), which makes every colour distinct
+    number = decode_order(order, reference_order(order, password))
+    raw = number.to_bytes((number.bit_length() + 7) // 8, "big")
+    if not raw.startswith(MAGIC):
+        return None
+    return raw[len(MAGIC):]
+
+
+@register_engine
+class GIFPaletteEngine(Engine):
+    """Native palette-order embedding for GIF"""
+
+    name = "gifpalette"
+    label = "GIF Palette (Native)"
+    carrier_extensions = (".gif",)
+
+    def embed(self, carrier, message, output, password=""):
+        self.check_carrier(carrier)
+        with span("read carrier"), open(carrier, "rb") as f:
+            data = f.read()
+        with span("execute"):
+            stego = embed(data, message, password)
+        with span("write output"), open(output, "wb") as f:
+            f.write(stego)
+        return self.result("embed", carrier, ok=True, output_file=output)
+
+    def extract(self, carrier, password=""):
+        self.check_carrier(carrier)
+        with span("read carrier"), open(carrier, "rb") as f:
+            data = f.read()
+        with span("execute"):
+            payload = extract(data, password)
+        if payload is None:
+            return self.result("extract", carrier, error="No hidden data found (wrong password?)")
+        return self.result("extract", carrier, ok=True, payload=payload)
+
+    def capacity(self, carrier):
+        self.check_carrier(carrier)
+        with open(carrier, "rb") as f:
+            head = f.read(13)
+        colours = GifLayout.colours_in(head)
+        return {"bytes": capacity(colours), "bits": capacity_bits(colours), "colours": colours, "exact": True}
+
+    def payload_size(self, message):
+        return len(to_bytes(message))
+
+    def info(self, carrier, password=""):
+        self.check_carrier(carrier)
+        with open(carrier, "rb") as f:
+            layout = GifLayout(f.read())
+        details = {
+            "colours": layout.colours,
+            "frames": len(layout.frames) + layout.local_frames,
+            "frames_with_local_table": layout.local_frames,
+            "capacity_bytes": capacity(layout.colours),
+        }
+        return self.result("info", carrier, ok=True, details=details)
@@ -1,13 +1,18 @@
 """
 Hex/Binary Steganography Tools
-HxD
+Built-in hex viewer, binary diff and HxD
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox
+import tkinter.font as tkfont
+from tkinter import ttk, messagebox, filedialog
 import subprocess
 import os
-from .base_tool import BaseToolWindow, find_executable, launch_executable
+from .base_tool import BaseToolWindow, UiDispatcher, find_tool, launch_executable, remember_tool
+from .engine import EngineError
+from .binary_diff import diff_files, summary_lines
+from .jobs import CANCELLED, get_runner
+from .mapped_file import ROW_BYTES, MappedFile, hex_column, offset_digits, parse_offset, parse_pattern, text_column
 
 
 class HexStegoWindow:
@@ -22,6 +27,16 @@ class HexStegoWindow:
         notebook = ttk.Notebook(self.window)
         notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
+        # Built-in viewer first, so HxD only launches when its tab is chosen
+        viewer_frame = ttk.Frame(notebook)
+        notebook.add(viewer_frame, text="Hex Viewer")
+        self.viewer_tool = HexViewerTool(viewer_frame, self.window)
+        
+        # Cover vs stego comparison
+        diff_frame = ttk.Frame(notebook)
+        notebook.add(diff_frame, text="Binary Diff")
+        self.diff_tool = BinaryDiffTool(diff_frame, self.window)
+        
         # HxD tab
         hxd_frame = ttk.Frame(notebook)
         notebook.add(hxd_frame, text="HxD")
@@ -81,22 +96,373 @@ class HxDTool(BaseToolWindow):
             initialdir=os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
             filetypes=[("Executables", "*.exe;*.lnk"), ("All files", "*.*")]
         )
-        if user_choice:
-            try_open(user_choice)
+        if user_choice and try_open(user_choice):
+            remember_tool("hxd", user_choice)
 
     def find_hxd(self):
-        possible_paths = [
-            os.path.join(os.path.dirname(__file__), "HxD.exe"),
-            os.path.join(os.path.dirname(__file__), "HxD.exe.lnk"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "HxD.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "tools", "HxD.exe"),
-            "HxD.exe",
-            "HxD64.exe",
-            "hxd.exe",
-        ]
-        return find_executable(possible_paths)
+        """Find HxD executable"""
+        return find_tool("hxd")
 
 
 
     # GMER removed from toolkit
 
+
+class HexViewerTool:
+    """Hex/ASCII viewer over a memory-mapped file.
+
+    Only the rows that fit in the window are formatted and drawn; the
+    scrollbar works on row numbers rather than on text, so a file of any
+    size opens at once and scrolls at the same speed.
+    """
+    
+    def __init__(self, parent, root_window):
+        self.root_window = root_window
+        self.parent = parent
+        self.path = tk.StringVar()
+        self.offset = tk.StringVar()
+        self.pattern = tk.StringVar()
+        self.status = tk.StringVar(value="Open a file to view its bytes.")
+        self.file = None
+        self.digits = 8
+        self.top = 0              # first visible row
+        self.visible = 1          # rows that fit in the text widget
+        self.mark = None          # (offset, length) highlighted
+        self.search_job = None
+        self.ui = UiDispatcher(parent)
+        self.setup_ui()
+        parent.bind("<Destroy>", lambda e: self.close_file() if e.widget is parent else None)
+    
+    def setup_ui(self):
+        """Setup the UI"""
+        frame = ttk.Frame(self.parent, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        row = ttk.Frame(frame)
+        row.pack(fill=tk.X)
+        ttk.Label(row, text="File:", font=("Arial", 10)).pack(side=tk.LEFT)
+        entry = ttk.Entry(row, textvariable=self.path, width=50)
+        entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        entry.bind("<Return>", lambda e: self.open_file(self.path.get()))
+        ttk.Button(row, text="Browse", command=self.browse_file).pack(side=tk.LEFT)
+        
+        tools = ttk.Frame(frame)
+        tools.pack(fill=tk.X, pady=10)
+        ttk.Label(tools, text="Go to:").pack(side=tk.LEFT)
+        goto = ttk.Entry(tools, textvariable=self.offset, width=14)
+        goto.pack(side=tk.LEFT, padx=5)
+        goto.bind("<Return>", lambda e: self.go_to())
+        ttk.Button(tools, text="Go", command=self.go_to, width=4).pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Label(tools, text="Find:").pack(side=tk.LEFT)
+        find = ttk.Entry(tools, textvariable=self.pattern, width=22)
+        find.pack(side=tk.LEFT, padx=5)
+        find.bind("<Return>", lambda e: self.find())
+        ttk.Button(tools, text="Next", command=self.find, width=6).pack(side=tk.LEFT)
+        ttk.Button(tools, text="Previous", command=lambda: self.find(reverse=True), width=9).pack(side=tk.LEFT, padx=5)
+        self.stop_button = ttk.Button(tools, text="Stop", command=self.stop_search, state=tk.DISABLED, width=6)
+        self.stop_button.pack(side=tk.LEFT)
+        
+        view = ttk.Frame(frame)
+        view.pack(fill=tk.BOTH, expand=True)
+        self.font = tkfont.Font(family="Courier", size=10)
+        self.text = tk.Text(view, font=self.font, wrap=tk.NONE, state=tk.DISABLED, cursor="arrow",
+                            takefocus=True, height=1)
+        self.scrollbar = ttk.Scrollbar(view, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.text.tag_configure("mark", background="#ffd54f")
+        
+        self.text.bind("<Configure>", lambda e: self.render())
+        self.text.bind("<MouseWheel>", lambda e: self.scroll_rows(-3 if e.delta > 0 else 3))
+        self.text.bind("<Button-4>", lambda e: self.scroll_rows(-3))
+        self.text.bind("<Button-5>", lambda e: self.scroll_rows(3))
+        self.text.bind("<Button-1>", lambda e: self.text.focus_set())
+        for key, rows in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "page-up"), ("<Next>", "page-down")):
+            self.text.bind(key, lambda e, rows=rows: self.scroll_rows(rows))
+        self.text.bind("<Control-Home>", lambda e: self.scroll_to(0))
+        self.text.bind("<Control-End>", lambda e: self.scroll_to(self.file.rows if self.file else 0))
+        
+        ttk.Label(frame, textvariable=self.status, foreground="gray").pack(anchor=tk.W, pady=(5, 0))
+        ttk.Label(frame, text="Offsets: decimal, 0x1F or 1Fh. Find: hex bytes (4D 5A) or text ('MZ' for hex-like text).",
+                  foreground="gray").pack(anchor=tk.W)
+    
+    def browse_file(self):
+        filename = filedialog.askopenfilename(title="Select file to view")
+        if filename:
+            self.path.set(filename)
+            self.open_file(filename)
+    
+    def open_file(self, path):
+        """Map ``path`` and show it from the top"""
+        if not path or not os.path.isfile(path):
+            messagebox.showerror("Error", "Please select a file to view.")
+            return
+        self.stop_search()
+        try:
+            mapped = MappedFile(path)
+        except EngineError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.close_file()
+        self.file = mapped
+        self.digits = offset_digits(mapped.size)
+        self.mark = None
+        self.top = 0
+        self.render()
+    
+    def close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+    
+    # -- virtual scrolling ------------------------------------------------------
+    
+    def max_top(self):
+        return max(0, self.file.rows - self.visible) if self.file else 0
+    
+    def scroll_to(self, row):
+        self.top = max(0, min(int(row), self.max_top()))
+        self.render()
+        return "break"
+    
+    def scroll_rows(self, rows):
+        if rows == "page-up":
+            rows = -max(1, self.visible - 1)
+        elif rows == "page-down":
+            rows = max(1, self.visible - 1)
+        return self.scroll_to(self.top + rows)
+    
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(float(amount) * (self.file.rows if self.file else 0))
+        elif unit == "pages":
+            self.scroll_rows(int(amount) * max(1, self.visible - 1))
+        else:
+            self.scroll_rows(int(amount))
+    
+    def render(self):
+        """Draw the rows that fit, starting at self.top"""
+        inset = sum(int(self.text.cget(option)) for option in ("borderwidth", "highlightthickness", "pady"))
+        height = self.text.winfo_height() - 2 * inset
+        self.visible = max(1, height // self.font.metrics("linespace"))
+        self.top = max(0, min(self.top, self.max_top()))
+        lines = self.file.dump(self.top, self.visible, self.digits) if self.file else []
+        
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", "\n".join(lines))
+        self.highlight()
+        self.text.config(state=tk.DISABLED)
+        
+        if self.file and self.file.rows:
+            total = self.file.rows
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + self.visible) / total))
+            first = self.top * ROW_BYTES
+            self.status.set(f"{self.file.path}  |  {self.file.size:,} bytes  |  "
+                            f"showing 0x{first:X}-0x{min(self.file.size, first + self.visible * ROW_BYTES) - 1:X}")
+        else:
+            self.scrollbar.set(0.0, 1.0)
+            if self.file:
+                self.status.set(f"{self.file.path}  |  empty file")
+    
+    def highlight(self):
+        """Mark the highlighted bytes in both the hex and the text columns"""
+        if not self.mark:
+            return
+        offset, length = self.mark
+        first = self.top * ROW_BYTES
+        last = first + self.visible * ROW_BYTES
+        for position in range(max(offset, first), min(offset + length, last)):
+            line = (position - first) // ROW_BYTES + 1
+            index = position % ROW_BYTES
+            column = hex_column(index, self.digits)
+            self.text.tag_add("mark", f"{line}.{column}", f"{line}.{column + 2}")
+            column = text_column(index, self.digits)
+            self.text.tag_add("mark", f"{line}.{column}", f"{line}.{column + 1}")
+    
+    def show(self, offset, length=1):
+        """Scroll ``offset`` into view (a third of the way down) and mark it"""
+        self.mark = (offset, length)
+        row = offset // ROW_BYTES
+        if not self.top <= row < self.top + self.visible:
+            self.top = row - self.visible // 3
+        self.render()
+    
+    # -- navigation -------------------------------------------------------------
+    
+    def go_to(self):
+        if not self.file:
+            messagebox.showerror("Error", "Open a file first.")
+            return
+        try:
+            offset = parse_offset(self.offset.get())
+        except EngineError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        if not 0 <= offset < self.file.size:
+            messagebox.showerror("Error", f"Offset must be below 0x{self.file.size:X} ({self.file.size:,}).")
+            return
+        self.show(offset)
+    
+    def find(self, reverse=False):
+        """Search the mapping in the background from the marked byte"""
+        if not self.file:
+            messagebox.showerror("Error", "Open a file first.")
+            return
+        if self.search_job:
+            return
+        try:
+            pattern = parse_pattern(self.pattern.get())
+        except EngineError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        if self.mark:
+            start = self.mark[0] if reverse else self.mark[0] + 1
+        else:
+            start = self.top * ROW_BYTES
+        self.status.set(f"Searching for {pattern.hex(' ').upper()}...")
+        self.stop_button.config(state=tk.NORMAL)
+        mapped = self.file
+        self.search_job = get_runner().submit(
+            mapped.find, pattern, start, reverse,
+            label="Hex search",
+            on_done=lambda job: self.ui.post(self.search_finished, job, mapped, pattern)
+        )
+    
+    def stop_search(self):
+        if self.search_job:
+            self.search_job.cancel()
+    
+    def search_finished(self, job, mapped, pattern):
+        self.search_job = None
+        self.stop_button.config(state=tk.DISABLED)
+        if mapped is not self.file:
+            return   # another file was opened meanwhile
+        if job.status == CANCELLED:
+            self.render()
+            self.status.set("Search stopped.")
+        elif job.exception is not None:
+            self.render()
+            messagebox.showerror("Error", f"Search failed:\n{job.exception}")
+        elif job.value < 0:
+            self.render()
+            self.status.set(f"{pattern.hex(' ').upper()} not found.")
+        else:
+            self.show(job.value, len(pattern))
+
+
+class BinaryDiffTool:
+    """Compares a cover file with its stego version.
+
+    The comparison runs as a background job (see binary_diff.py); the
+    result is a summary with the changed ranges and bit-planes, and the
+    change density along the file drawn as bars.
+    """
+    
+    def __init__(self, parent, root_window):
+        self.root_window = root_window
+        self.parent = parent
+        self.file_a = tk.StringVar()
+        self.file_b = tk.StringVar()
+        self.status = tk.StringVar(value="Select the original and the changed file.")
+        self.density = []
+        self.job = None
+        self.ui = UiDispatcher(parent)
+        self.setup_ui()
+    
+    def setup_ui(self):
+        """Setup the UI"""
+        frame = ttk.Frame(self.parent, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        for label, variable, title in (("Cover (A):", self.file_a, "Select original file"),
+                                       ("Stego (B):", self.file_b, "Select changed file")):
+            row = ttk.Frame(frame)
+            row.pack(fill=tk.X, pady=2)
+            ttk.Label(row, text=label, font=("Arial", 10), width=10).pack(side=tk.LEFT)
+            ttk.Entry(row, textvariable=variable, width=50).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+            ttk.Button(row, text="Browse",
+                       command=lambda v=variable, t=title: self.browse_file(v, t)).pack(side=tk.LEFT)
+        
+        buttons = ttk.Frame(frame)
+        buttons.pack(pady=10)
+        self.compare_button = ttk.Button(buttons, text="Compare", command=self.compare)
+        self.compare_button.pack(side=tk.LEFT, padx=5)
+        self.cancel_button = ttk.Button(buttons, text="Cancel", command=self.cancel, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(frame, text="Change density (start of file on the left):").pack(anchor=tk.W)
+        self.canvas = tk.Canvas(frame, height=60, background="white", highlightthickness=1,
+                                highlightbackground="gray")
+        self.canvas.pack(fill=tk.X, pady=(2, 10))
+        self.canvas.bind("<Configure>", lambda e: self.draw_density())
+        
+        report = ttk.Frame(frame)
+        report.pack(fill=tk.BOTH, expand=True)
+        self.report = tk.Text(report, font=("Courier", 10), wrap=tk.NONE, state=tk.DISABLED, height=12)
+        scrollbar = ttk.Scrollbar(report, orient=tk.VERTICAL, command=self.report.yview)
+        self.report.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.report.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        ttk.Label(frame, textvariable=self.status, foreground="gray").pack(anchor=tk.W, pady=(5, 0))
+    
+    def browse_file(self, variable, title):
+        filename = filedialog.askopenfilename(title=title)
+        if filename:
+            variable.set(filename)
+    
+    def compare(self):
+        path_a, path_b = self.file_a.get(), self.file_b.get()
+        if not os.path.isfile(path_a) or not os.path.isfile(path_b):
+            messagebox.showerror("Error", "Please select both files to compare.")
+            return
+        if self.job:
+            return
+        self.status.set("Comparing...")
+        self.compare_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.job = get_runner().submit(
+            diff_files, path_a, path_b,
+            label="Binary diff",
+            on_done=lambda job: self.ui.post(self.compare_finished, job)
+        )
+    
+    def cancel(self):
+        if self.job:
+            self.job.cancel()
+    
+    def compare_finished(self, job):
+        self.job = None
+        self.compare_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+        if job.status == CANCELLED:
+            self.status.set("Comparison cancelled.")
+            return
+        if job.exception is not None:
+            self.status.set("Comparison failed.")
+            messagebox.showerror("Error", str(job.exception))
+            return
+        result = job.value
+        self.density = result["density"] if not result["identical"] else []
+        self.draw_density()
+        self.report.config(state=tk.NORMAL)
+        self.report.delete("1.0", tk.END)
+        self.report.insert("1.0", "\n".join(summary_lines(result, ranges=0)))
+        self.report.config(state=tk.DISABLED)
+        self.status.set(f"Compared {result['compared']:,} bytes in {result['seconds']:.2f}s.")
+    
+    def draw_density(self):
+        """One bar per density bucket, scaled to the busiest one"""
+        self.canvas.delete("all")
+        peak = max(self.density, default=0)
+        if not peak:
+            return
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height() - 4
+        step = width / len(self.density)
+        for i, count in enumerate(self.density):
+            if count:
+                top = height - max(1, count * height // peak)
+                self.canvas.create_rectangle(i * step, top + 2, (i + 1) * step, height + 2,
+                                             fill="#e53935", width=0)
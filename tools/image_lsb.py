@@ -0,0 +1,550 @@
+"""
+Native LSB Image Engine
+Embeds and extracts data in the low bit-planes of lossless images
+(PNG/BMP) with NumPy, without spawning an external tool.
+
+Pixel selection is keyed with the password: the header sits in pixels
+chosen by a Feistel permutation, and the body is spread over the image
+with keyed offsets while its 64-pixel blocks are shuffled by the same
+permutation. Each selected pixel stores one bit per selected channel and
+bit-plane, and only those pixels are touched.
+
+The payload is not encrypted; the password only decides where the bits go.
+"""
+
+import hashlib
+import struct
+import zlib
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency, checked when the engine is used
+    np = None
+
+from .engine import Engine, EngineError, register_engine, to_bytes
+from .spans import span
+
+MAGIC = b"LSB\x01"
+HEADER_SIZE = len(MAGIC) + 4  # magic + big-endian payload length
+
+MODES = {1: "L", 2: "LA", 3: "RGB", 4: "RGBA"}
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_CHANNELS = {0: 1, 2: 3, 4: 2, 6: 4}  # colour type -> samples per pixel
+
+
+def require_numpy():
+    if np is None:
+        raise EngineError("The native LSB engine requires NumPy.\nInstall it with: pip install numpy")
+
+
+# ---------------------------------------------------------------------------
+# Image I/O (8-bit PNG and uncompressed 24/32-bit BMP)
+# ---------------------------------------------------------------------------
+
+PNG_BAND = 1024  # rows unfiltered per wavefront pass (bounds its scratch memory)
+
+
+def _diagonals(skew, rows, width):
+    """(rows, width, bpp) view of a skewed buffer: [y, x] is [x + y + 2, y + 1]"""
+    s0, s1, s2 = skew.strides
+    return np.lib.stride_tricks.as_strided(
+        skew[2:, 1:], shape=(rows, width, skew.shape[2]), strides=(s0 + s1, s0, s2))
+
+
+def _unfilter_band(filt, types, prior, bpp):
+    """Undo any mix of PNG filters on a band of rows following ``prior``.
+
+    A sample depends only on its left, upper and upper-left neighbours, so
+    all samples on one anti-diagonal of pixels can be done together. They
+    are laid out skewed and transposed, pixel (y, x) at [x + y + 2, y + 1],
+    which makes each diagonal one contiguous row and puts its neighbours in
+    the two rows before it.
+    """
+    rows, stride = filt.shape
+    width = stride // bpp
+    skew = np.zeros((width + rows + 1, rows + 1, bpp), dtype=np.int16)
+    source = np.zeros(skew.shape, dtype=np.uint8)
+    skew[1:width + 1, 0] = prior.reshape(width, bpp)
+    _diagonals(source, rows, width)[...] = filt.reshape(rows, width, bpp)
+    # Rows of several filter types are combined with 0/1 weights per row,
+    # which is cheaper than selecting with np.where
+    kinds = sorted(set(types.tolist()) - {0})
+    weights = {k: np.repeat((types == k).astype(np.int16)[:, None], bpp, axis=1) for k in kinds}
+    if len(kinds) == 1 and 0 not in types:
+        weights = {}
+
+    for t in range(width + rows - 1):
+        lo, hi = max(0, t - width + 1), min(rows - 1, t)
+        d = t + 2
+        a = skew[d - 1, lo + 1:hi + 2]    # left
+        b = skew[d - 1, lo:hi + 1]        # up
+        c = skew[d - 2, lo:hi + 1]        # up-left
+        pred = 0
+        for k in kinds:
+            if k == 1:
+                term = a
+            elif k == 2:
+                term = b
+            elif k == 3:
+                term = (a + b) >> 1
+            else:
+                # Paeth without branches: a, b and c differ from c by 0, ac, bc
+                bc, ac = b - c, a - c
+                pa, pb, pc = np.abs(bc), np.abs(ac), np.abs(bc + ac)
+                use_a = (pa <= pb) & (pa <= pc)
+                use_b = (pb <= pc) > use_a
+                term = c + ac * use_a + bc * use_b
+            pred = pred + (term * weights[k][lo:hi + 1] if weights else term)
+        np.bitwise_and(source[d, lo + 1:hi + 2] + pred, 0xFF, out=skew[d, lo + 1:hi + 2])
+
+    return _diagonals(skew, rows, width).astype(np.uint8).reshape(rows, stride)
+
+
+def read_png(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(PNG_SIGNATURE):
+        raise EngineError("Not a PNG file.")
+
+    pos = len(PNG_SIGNATURE)
+    idat = []
+    header = None
+    while pos < len(data):
+        length, ctype = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if ctype == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif ctype == b"IDAT":
+            idat.append(body)
+        elif ctype == b"IEND":
+            break
+    if header is None:
+        raise EngineError("PNG file has no IHDR chunk.")
+
+    width, height, depth, colour, _compression, _filter, interlace = header
+    if depth != 8 or colour not in PNG_CHANNELS or interlace != 0:
+        raise EngineError("Unsupported PNG. Use a non-interlaced 8-bit greyscale, RGB or RGBA image.")
+
+    bpp = PNG_CHANNELS[colour]
+    stride = width * bpp
+    raw = np.frombuffer(zlib.decompress(b"".join(idat)), dtype=np.uint8)
+    raw = raw[:height * (stride + 1)].reshape(height, stride + 1)
+
+    types = raw[:, 0]
+    if types.max(initial=0) > 4:
+        raise EngineError(f"Corrupt PNG: unknown filter type {types.max()}.")
+
+    pixels = np.empty((height, stride), dtype=np.uint8)
+    prior = np.zeros(stride, dtype=np.uint8)
+    y = 0
+    while y < height:
+        ftype = types[y]
+        filt = raw[y, 1:]
+        if ftype >= 3:
+            # Average and Paeth are sequential along the row: hand the band
+            # from here to the wavefront
+            end = min(height, y + PNG_BAND)
+            pixels[y:end] = _unfilter_band(raw[y:end, 1:], types[y:end], prior, bpp)
+            y = end
+        else:
+            if ftype == 0:
+                pixels[y] = filt
+            elif ftype == 1:
+                # Sub: running sum per channel, wrapping at 256
+                pixels[y] = np.cumsum(filt.reshape(width, bpp), axis=0, dtype=np.uint8).reshape(stride)
+            else:
+                pixels[y] = filt + prior
+            y += 1
+        prior = pixels[y - 1]
+    return pixels.reshape(height, width, bpp)
+
+
+def _png_chunk(ctype, body):
+    return struct.pack(">I", len(body)) + ctype + body + struct.pack(">I", zlib.crc32(ctype + body))
+
+
+def write_png(path, pixels, level=6):
+    height, width, channels = pixels.shape
+    colour = {1: 0, 2: 4, 3: 2, 4: 6}[channels]
+    # Filter type 0 on every row: a zero column in front of each scanline
+    raw = np.zeros((height, width * channels + 1), dtype=np.uint8)
+    raw[:, 1:] = pixels.reshape(height, width * channels)
+    with open(path, "wb") as f:
+        f.write(PNG_SIGNATURE)
+        f.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, colour, 0, 0, 0)))
+        f.write(_png_chunk(b"IDAT", zlib.compress(raw.tobytes(), level)))
+        f.write(_png_chunk(b"IEND", b""))
+
+
+def read_bmp(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:2] != b"BM":
+        raise EngineError("Not a BMP file.")
+    offset = struct.unpack("<I", data[10:14])[0]
+    width, height, _planes, bits, compression = struct.unpack("<iiHHI", data[18:34])
+    if bits not in (24, 32) or compression not in (0, 3):
+        raise EngineError("Unsupported BMP. Use an uncompressed 24-bit or 32-bit bitmap.")
+
+    channels = bits // 8
+    top_down = height < 0
+    height = abs(height)
+    stride = (width * bits + 31) // 32 * 4
+    rows = np.frombuffer(data, dtype=np.uint8, count=stride * height, offset=offset)
+    pixels = rows.reshape(height, stride)[:, :width * channels].reshape(height, width, channels)
+    if not top_down:
+        pixels = pixels[::-1]
+    # BGR(A) -> RGB(A)
+    order = [2, 1, 0, 3][:channels]
+    return np.ascontiguousarray(pixels[:, :, order])
+
+
+def write_bmp(path, pixels):
+    height, width, channels = pixels.shape
+    if channels not in (3, 4):
+        raise EngineError("BMP output needs an RGB or RGBA image.")
+    bits = channels * 8
+    stride = (width * bits + 31) // 32 * 4
+    rows = np.zeros((height, stride), dtype=np.uint8)
+    order = [2, 1, 0, 3][:channels]
+    rows[:, :width * channels] = pixels[::-1][:, :, order].reshape(height, width * channels)
+    image_size = stride * height
+    with open(path, "wb") as f:
+        f.write(struct.pack("<2sIHHI", b"BM", 54 + image_size, 0, 0, 54))
+        f.write(struct.pack("<IiiHHIIiiII", 40, width, height, 1, bits, 0, image_size, 2835, 2835, 0, 0))
+        f.write(rows.tobytes())
+
+
+def image_shape(path):
+    """(height, width, channels) of a PNG or BMP, read from its header only"""
+    with open(path, "rb") as f:
+        head = f.read(34)
+    if head.startswith(PNG_SIGNATURE) and head[12:16] == b"IHDR":
+        width, height, depth, colour = struct.unpack(">IIBB", head[16:26])
+        if depth != 8 or colour not in PNG_CHANNELS:
+            raise EngineError("Unsupported PNG. Use a non-interlaced 8-bit greyscale, RGB or RGBA image.")
+        return height, width, PNG_CHANNELS[colour]
+    if head.startswith(b"BM") and len(head) >= 34:
+        width, height, _planes, bits, compression = struct.unpack("<iiHHI", head[18:34])
+        if bits not in (24, 32) or compression not in (0, 3):
+            raise EngineError("Unsupported BMP. Use an uncompressed 24-bit or 32-bit bitmap.")
+        return abs(height), width, bits // 8
+    raise EngineError("The LSB engine only supports lossless PNG and BMP images.")
+
+
+def read_image(path):
+    """Load a PNG or BMP as an (height, width, channels) uint8 array"""
+    require_numpy()
+    with open(path, "rb") as f:
+        head = f.read(8)
+    if head.startswith(PNG_SIGNATURE):
+        return read_png(path)
+    if head.startswith(b"BM"):
+        return read_bmp(path)
+    raise EngineError("The LSB engine only supports lossless PNG and BMP images.")
+
+
+def write_image(path, pixels):
+    """Save an array as PNG or BMP depending on the file extension"""
+    lower = path.lower()
+    if lower.endswith(".png"):
+        write_png(path, pixels)
+    elif lower.endswith(".bmp"):
+        write_bmp(path, pixels)
+    else:
+        raise EngineError("LSB output must be a .png or .bmp file (lossy formats destroy the hidden bits).")
+
+
+# ---------------------------------------------------------------------------
+# Keyed pixel selection
+# ---------------------------------------------------------------------------
+
+def _key_material(password, tag):
+    return hashlib.sha256(b"lsb:" + tag + b":" + to_bytes(password)).digest()
+
+
+def keyed_order(n, count, password, tag=b"order"):
+    """Return the first ``count`` entries of a password-keyed permutation of
+    range(n), as a uint32 array.
+
+    A balanced Feistel network permutes [0, 4**h) and cycle-walking folds it
+    back onto [0, n). The prefix does not depend on ``count``.
+    """
+    if count > n:
+        raise EngineError("Image too small for the LSB header with these channels and bit-planes.")
+    half = max(1, ((n - 1).bit_length() + 1) // 2)
+    mask = np.uint32((1 << half) - 1)
+    shift = np.uint32(half)
+    digest = _key_material(password, tag)
+    keys = [np.uint32(int.from_bytes(digest[4 * i:4 * i + 4], "little")) for i in range(4)]
+
+    def permute(x):
+        left = x >> shift
+        right = x & mask
+        for k in keys:
+            f = (right ^ k) * np.uint32(0x9E3779B1)
+            f ^= f >> np.uint32(15)
+            f *= np.uint32(0x85EBCA6B)
+            f ^= f >> np.uint32(13)
+            left, right = right, left ^ (f & mask)
+        return (left << shift) | right
+
+    out = permute(np.arange(count, dtype=np.uint32))
+    pending = np.flatnonzero(out >= n)
+    while pending.size:
+        out[pending] = permute(out[pending])
+        pending = pending[out[pending] >= n]
+    return out
+
+
+def _keyed_hash(count, password):
+    """One keyed 32-bit value per slot (murmur3 finaliser over the index)"""
+    seed = np.uint32(int.from_bytes(_key_material(password, b"offset")[:4], "little"))
+    x = np.arange(count, dtype=np.uint32) * np.uint32(0x9E3779B1) + seed
+    x ^= x >> np.uint32(16)
+    x *= np.uint32(0x85EBCA6B)
+    x ^= x >> np.uint32(13)
+    x *= np.uint32(0xC2B2AE35)
+    x ^= x >> np.uint32(16)
+    return x
+
+
+def header_pixels(npix, per_pixel, password):
+    """Pixels holding the header, scattered by the keyed permutation"""
+    return keyed_order(npix, -(-HEADER_SIZE * 8 // per_pixel), password, b"header").astype(np.int64)
+
+
+def body_pixels(npix, count, reserved, password):
+    """Pick ``count`` pixels in ascending order, skipping ``reserved``.
+
+    The free pixels are cut into ``count`` segments and one pixel is taken
+    from each at a keyed offset, so the payload is spread over the whole
+    image while memory is still walked front to back.
+    """
+    free = npix - reserved.size
+    # Segment starts in 32.32 fixed point: exact, strictly increasing since
+    # free >= count, and cheaper than an integer division per slot
+    step = np.uint64((free << 32) // count)
+    starts = (np.arange(count + 1, dtype=np.uint64) * step) >> np.uint64(32)
+    starts[-1] = free
+    lengths = np.diff(starts)
+    pos = starts[:-1] + ((_keyed_hash(count, password).astype(np.uint64) * lengths) >> np.uint64(32))
+    pos = pos.astype(np.int64)
+    # Map positions in the free space back to pixel indices: every reserved
+    # pixel at or below a position pushes it up by one
+    reserved = np.sort(reserved) - np.arange(reserved.size)
+    cuts = np.searchsorted(pos, reserved, side="left")
+    pos += np.repeat(np.arange(reserved.size + 1), np.diff(np.concatenate([[0], cuts, [count]])))
+    return pos
+
+
+# ---------------------------------------------------------------------------
+# Bit-plane embedding
+# ---------------------------------------------------------------------------
+
+BLOCK = 64  # pixels per block of the keyed payload permutation
+
+
+def channel_indices(channels, nchannels):
+    """Map a channel spec such as "RGB" onto array columns"""
+    mode = MODES[nchannels]
+    if nchannels <= 2:
+        # Greyscale images only have a luminance channel to carry data
+        channels = "".join(c for c in channels.upper() if c in "LA") or "L"
+    indices = []
+    for c in channels.upper():
+        if c not in mode:
+            raise EngineError(f"Channel '{c}' is not present in a {mode} image.")
+        indices.append(mode.index(c))
+    if not indices:
+        raise EngineError("Select at least one channel.")
+    return indices
+
+
+def parse_planes(planes):
+    """Accept "0,1", [0, 1] or 2 (meaning the two lowest planes)"""
+    if isinstance(planes, int):
+        planes = range(planes)
+    elif isinstance(planes, str):
+        planes = [int(p) for p in planes.replace(" ", "").split(",") if p]
+    planes = sorted(set(int(p) for p in planes))
+    if not planes or planes[0] < 0 or planes[-1] > 7:
+        raise EngineError("Bit-planes must be between 0 and 7.")
+    return planes
+
+
+def capacity(shape, channels="RGB", planes=(0,)):
+    """Usable payload bytes for an image of ``shape``"""
+    height, width, nchannels = shape
+    per_pixel = len(channel_indices(channels, nchannels)) * len(parse_planes(planes))
+    npix = height * width
+    free = npix - -(-HEADER_SIZE * 8 // per_pixel)
+    return max(0, free // BLOCK * BLOCK * per_pixel // 8)
+
+
+def _pixel_view(pixels):
+    """View each pixel as one opaque item so gathers move whole pixels"""
+    return pixels.reshape(-1).view(f"V{pixels.shape[2]}")
+
+
+def _write_planes(pixels, pos, cols, planes, bits):
+    """bits has shape (len(pos), len(cols), len(planes))"""
+    view = _pixel_view(pixels)
+    rows = np.take(view, pos).view(np.uint8).reshape(len(pos), pixels.shape[2])
+    all_cols = cols == list(range(pixels.shape[2]))
+    block = rows if all_cols else rows[:, cols]
+    for j, plane in enumerate(planes):
+        block &= np.uint8(~(1 << plane) & 0xFF)
+        plane_bits = bits[:, :, j] if len(planes) > 1 else bits.reshape(block.shape)
+        block |= plane_bits << np.uint8(plane) if plane else plane_bits
+    if not all_cols:
+        rows[:, cols] = block
+    np.put(view, pos, rows.reshape(-1).view(view.dtype))
+
+
+def _read_planes(pixels, pos, cols, planes):
+    rows = np.take(_pixel_view(pixels), pos).view(np.uint8).reshape(len(pos), pixels.shape[2])
+    block = rows if cols == list(range(pixels.shape[2])) else rows[:, cols]
+    if planes == [0]:
+        return (block & np.uint8(1)).reshape(len(pos), len(cols), 1)
+    bits = np.empty((len(pos), len(cols), len(planes)), dtype=np.uint8)
+    for j, plane in enumerate(planes):
+        bits[:, :, j] = (block >> np.uint8(plane)) & np.uint8(1)
+    return bits
+
+
+def embed(pixels, message, password="", channels="RGB", planes=(0,)):
+    """Hide ``message`` in a copy of ``pixels`` and return it"""
+    require_numpy()
+    height, width, nchannels = pixels.shape
+    cols = channel_indices(channels, nchannels)
+    planes = parse_planes(planes)
+    per_pixel = len(cols) * len(planes)
+    npix = height * width
+    payload = to_bytes(message)
+
+    limit = capacity(pixels.shape, channels, planes)
+    if len(payload) > limit:
+        raise EngineError(
+            f"Message too large: {len(payload)} bytes, image holds {limit} bytes "
+            f"with channels {channels} and {len(planes)} bit-plane(s)."
+        )
+
+    out = np.array(pixels, order="C")
+    header = header_pixels(npix, per_pixel, password)
+    hbits = np.unpackbits(np.frombuffer(MAGIC + struct.pack(">I", len(payload)), dtype=np.uint8))
+    hbits = np.resize(hbits, header.size * per_pixel)
+    _write_planes(out, header, cols, planes, hbits.reshape(header.size, len(cols), len(planes)))
+
+    if payload:
+        # Pad to whole blocks, then shuffle the blocks with the keyed permutation
+        block_bits = BLOCK * per_pixel
+        bits = np.unpackbits(np.frombuffer(payload, dtype=np.uint8))
+        nblocks = -(-bits.size // block_bits)
+        bits = np.concatenate([bits, np.zeros(nblocks * block_bits - bits.size, dtype=np.uint8)])
+        bits = bits.reshape(nblocks, block_bits)[keyed_order(nblocks, nblocks, password, b"blocks")]
+        pos = body_pixels(npix, nblocks * BLOCK, header, password)
+        _write_planes(out, pos, cols, planes, bits.reshape(-1, len(cols), len(planes)))
+    return out
+
+
+def extract(pixels, password="", channels="RGB", planes=(0,)):
+    """Return the hidden payload, or None if there is none for this key"""
+    require_numpy()
+    pixels = np.ascontiguousarray(pixels)
+    height, width, nchannels = pixels.shape
+    cols = channel_indices(channels, nchannels)
+    planes = parse_planes(planes)
+    per_pixel = len(cols) * len(planes)
+    npix = height * width
+
+    if -(-HEADER_SIZE * 8 // per_pixel) > npix:
+        return None
+    header = header_pixels(npix, per_pixel, password)
+    hbits = _read_planes(pixels, header, cols, planes).reshape(-1)[:HEADER_SIZE * 8]
+    hdata = np.packbits(hbits).tobytes()
+    if not hdata.startswith(MAGIC):
+        return None
+    length = struct.unpack(">I", hdata[len(MAGIC):])[0]
+    if length > capacity(pixels.shape, channels, planes):
+        return None
+    if length == 0:
+        return b""
+
+    block_bits = BLOCK * per_pixel
+    nblocks = -(-length * 8 // block_bits)
+    pos = body_pixels(npix, nblocks * BLOCK, header, password)
+    slots = _read_planes(pixels, pos, cols, planes).reshape(nblocks, block_bits)
+    bits = np.empty_like(slots)
+    bits[keyed_order(nblocks, nblocks, password, b"blocks")] = slots
+    return np.packbits(bits.reshape(-1)[:length * 8]).tobytes()
+
+
+@register_engine
+class LSBImageEngine(Engine):
+    """Native keyed LSB embedding for PNG/BMP"""
+
+    name = "lsb"
+    label = "LSB (Native)"
+    carrier_extensions = (".png", ".bmp")
+
+    def __init__(self, log=None, channels="RGB", planes=(0,)):
+        super().__init__(log)
+        self.channels = channels
+        self.planes = parse_planes(planes)
+
+    def embed(self, carrier, message, output, password=""):
+        self.check_carrier(carrier)
+        with span("read carrier"):
+            pixels = read_image(carrier)
+        self.log(f"Loaded {pixels.shape[1]}x{pixels.shape[0]} {MODES[pixels.shape[2]]} image")
+        with span("execute"):
+            stego = embed(pixels, message, password, self.channels, self.planes)
+        with span("write output"):
+            write_image(output, stego)
+        return self.result("embed", carrier, ok=True, output_file=output)
+
+    def extract(self, carrier, password=""):
+        self.check_carrier(carrier)
+        with span("read carrier"):
+            pixels = read_image(carrier)
+        with span("execute"):
+            payload = extract(pixels, password, self.channels, self.planes)
+        if payload is None:
+            return self.result("extract", carrier,
+                               error="No hidden data found (wrong password, channels or bit-planes?)")
+        return self.result("extract", carrier, ok=True, payload=payload)
+
+    @property
+    def capacity_key(self):
+        planes = "".join(str(p) for p in self.planes)
+        return f"{self.name}:{self.channels.upper()}:{planes}"
+
+    def capacity(self, carrier):
+        self.check_carrier(carrier)
+        shape = image_shape(carrier)
+        return {
+            "bytes": capacity(shape, self.channels, self.planes),
+            "width": shape[1],
+            "height": shape[0],
+            "exact": True,
+        }
+
+    def payload_size(self, message):
+        return len(to_bytes(message))
+
+    def info(self, carrier, password=""):
+        self.check_carrier(carrier)
+        pixels = read_image(carrier)
+        height, width, nchannels = pixels.shape
+        details = {
+            "width": width,
+            "height": height,
+            "mode": MODES[nchannels],
+            "channels": self.channels,
+            "planes": self.planes,
+            "capacity_bytes": capacity(pixels.shape, self.channels, self.planes),
+        }
+        return self.result("info", carrier, ok=True, details=details)
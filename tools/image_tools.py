@@ -1,14 +1,20 @@
 """
 Image Steganography Tools
-Steghide and Xiao Steganography
+Steghide, native LSB, Xiao Steganography, LSB steganalysis and passphrase recovery
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog, scrolledtext
 import subprocess
 import os
 import sys
-from .base_tool import BaseToolWindow
+from .base_tool import BaseToolWindow, UiDispatcher, find_tool
+from .engine import EngineError, SteghideEngine, find_steghide, command_exists
+from .extract_cache import get_cache as get_extract_cache
+from .image_lsb import LSBImageEngine
+from .jobs import CANCELLED, get_runner
+from .recovery import ENGINES as RECOVERY_ENGINES, recover
+from .steganalysis import IMAGE_EXTENSIONS, triage, write_report
 
 
 class ImageStegoWindow:
@@ -29,6 +35,21 @@ class ImageStegoWindow:
         notebook.add(steghide_frame, text="Steghide")
         self.steghide_tool = SteghideTool(steghide_frame, self.window)
         
+        # Native LSB tab (no external executable)
+        lsb_frame = ttk.Frame(notebook)
+        notebook.add(lsb_frame, text="LSB (Native)")
+        self.lsb_tool = LSBTool(lsb_frame, self.window)
+        
+        # Steganalysis tab: which images probably carry an LSB payload
+        analysis_frame = ttk.Frame(notebook)
+        notebook.add(analysis_frame, text="Steganalysis")
+        self.analysis_tool = SteganalysisTool(analysis_frame, self.window)
+        
+        # Wordlist recovery of a forgotten (or CTF) passphrase
+        recovery_frame = ttk.Frame(notebook)
+        notebook.add(recovery_frame, text="Passphrase Recovery")
+        self.recovery_tool = PassphraseRecoveryTool(recovery_frame, self.window)
+        
         # Xiao Steganography tab
         xiao_frame = ttk.Frame(notebook)
         notebook.add(xiao_frame, text="Xiao Steganography")
@@ -64,11 +85,11 @@ class SteghideTool(BaseToolWindow):
                 info = widget.grid_info()
                 if info.get("row") == 0:  # Input file browse
                     widget.config(command=lambda: self.browse_input_file([
-                        ("Image files", "*.jpg *.jpeg *.png *.bmp *.gif"), ("All files", "*.*")
+                        ("Steghide carriers", "*.jpg *.jpeg *.bmp *.wav *.au"), ("All files", "*.*")
                     ]))
                 elif info.get("row") == 1:  # Output file browse
                     widget.config(command=lambda: self.browse_output_file([
-                        ("Image files", "*.jpg *.jpeg *.png *.bmp *.gif"), ("All files", "*.*")
+                        ("Steghide carriers", "*.jpg *.jpeg *.bmp *.wav *.au"), ("All files", "*.*")
                     ]))
     
     def create_extract_tab(self, parent):
@@ -78,7 +99,7 @@ class SteghideTool(BaseToolWindow):
         for widget in parent.winfo_children():
             if isinstance(widget, ttk.Button) and widget.cget("text") == "Browse":
                 widget.config(command=lambda: self.browse_input_file([
-                    ("Image files", "*.jpg *.jpeg *.png *.bmp *.gif"), ("All files", "*.*")
+                    ("Steghide carriers", "*.jpg *.jpeg *.bmp *.wav *.au"), ("All files", "*.*")
                 ]))
     
     def hide_message(self):
@@ -90,44 +111,19 @@ class SteghideTool(BaseToolWindow):
         self.log("Starting Steghide hide operation...", tab="hide")
         
         try:
-            steghide_path = self.find_steghide()
-            if not steghide_path:
-                self.log("Steghide not found. Please ensure steghide.exe is in Tools/steghide/", "ERROR", "hide")
-                messagebox.showerror("Error", "Steghide not found. Please ensure steghide.exe is in Tools/steghide/")
-                return
-            
-            # Create message file
-            msg_file = os.path.join(os.path.dirname(self.output_file.get()), "temp_msg.txt")
-            with open(msg_file, "w", encoding="utf-8") as f:
-                f.write(self.get_message())
-            
-            # Run steghide embed
-            cmd = [
-                steghide_path,
-                "embed",
-                "-cf", self.input_file.get(),
-                "-ef", msg_file,
-                "-sf", self.output_file.get(),
-                "-p", self.password.get()
-            ]
-            
-            self.log(f"Running: {' '.join(cmd)}", tab="hide")
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            
-            # Clean up temp file
-            if os.path.exists(msg_file):
-                os.remove(msg_file)
-            
-            if result.returncode == 0:
-                self.log("Message hidden successfully!", "SUCCESS", "hide")
-                messagebox.showinfo("Success", f"Message hidden successfully!\nOutput saved to: {self.output_file.get()}")
-            else:
-                self.log(f"Error: {result.stderr}", "ERROR", "hide")
-                messagebox.showerror("Error", f"Failed to hide message:\n{result.stderr}")
-        
-        except subprocess.TimeoutExpired:
-            self.log("Operation timed out", "ERROR", "hide")
-            messagebox.showerror("Error", "Operation timed out")
+            engine = SteghideEngine(log=self.engine_log("hide"))
+            self.start_job(
+                "hide", engine.embed,
+                self.input_file.get(),
+                self.get_message(),
+                self.output_file.get(),
+                self.password.get(),
+                on_done=self.report_hide_result
+            )
+        
+        except EngineError as e:
+            self.log(str(e), "ERROR", "hide")
+            messagebox.showerror("Error", str(e))
         except Exception as e:
             self.log(f"Exception: {str(e)}", "ERROR", "hide")
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
@@ -141,72 +137,133 @@ class SteghideTool(BaseToolWindow):
         self.log("Starting Steghide extract operation...", tab="extract")
         
         try:
-            steghide_path = self.find_steghide()
-            if not steghide_path:
-                self.log("Steghide not found. Please ensure steghide.exe is in Tools/steghide/", "ERROR", "extract")
-                messagebox.showerror("Error", "Steghide not found. Please ensure steghide.exe is in Tools/steghide/")
-                return
-            
-            # Extract to temp file
-            msg_file = os.path.join(os.path.dirname(self.input_file.get()), "temp_extracted.txt")
-            
-            cmd = [
-                steghide_path,
-                "extract",
-                "-sf", self.input_file.get(),
-                "-xf", msg_file,
-                "-p", self.password.get()
-            ]
-            
-            self.log(f"Running: {' '.join(cmd)}", tab="extract")
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            
-            if result.returncode == 0 and os.path.exists(msg_file):
-                with open(msg_file, "r", encoding="utf-8") as f:
-                    extracted_msg = f.read()
-                self.set_message(extracted_msg)
-                self.log("Message extracted successfully!", "SUCCESS", "extract")
-                messagebox.showinfo("Success", "Message extracted successfully!")
-                os.remove(msg_file)
-            else:
-                self.log(f"Error: {result.stderr}", "ERROR", "extract")
-                messagebox.showerror("Error", f"Failed to extract message:\n{result.stderr}")
+            engine = SteghideEngine(log=self.engine_log("extract"))
+            # Repeated extracts of the same file and password skip the tool
+            self.start_job(
+                "extract", get_extract_cache().extract, engine,
+                self.input_file.get(),
+                self.password.get(),
+                on_done=self.report_extract_result
+            )
         
+        except EngineError as e:
+            self.log(str(e), "ERROR", "extract")
+            messagebox.showerror("Error", str(e))
         except Exception as e:
             self.log(f"Exception: {str(e)}", "ERROR", "extract")
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
     
     def find_steghide(self):
         """Find steghide executable"""
-        # Check Tools folder first
-        possible_paths = [
-            os.path.join(os.path.dirname(__file__), "steghide", "steghide.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "steghide", "steghide.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "tools", "steghide", "steghide.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "steghide.exe"),
-            "steghide.exe",
-            "steghide",
-        ]
-        
-        for path in possible_paths:
-            abs_path = os.path.abspath(path)
-            if os.path.exists(abs_path):
-                return abs_path
-        
-        # Check if command exists in PATH
-        for cmd in ["steghide", "steghide.exe"]:
-            if self.command_exists(cmd):
-                return cmd
-        return None
+        return find_steghide()
     
     def command_exists(self, cmd):
         """Check if command exists in PATH"""
+        return command_exists(cmd)
+    
+
+
+class LSBTool(BaseToolWindow):
+    """Native LSB tool for lossless PNG/BMP images"""
+    
+    def __init__(self, parent, root_window):
+        self.root_window = root_window
+        self.channels = tk.StringVar(value="RGB")
+        self.planes = tk.StringVar(value="0")
+        super().__init__(parent, "LSB (Native)")
+    
+    def create_tabbed_widgets(self):
+        """Add the channel/bit-plane options above the Hide/Extract tabs"""
+        options = ttk.Frame(self.window, padding=(10, 10, 10, 0))
+        options.pack(fill=tk.X)
+        ttk.Label(options, text="Channels:", font=("Arial", 10)).pack(side=tk.LEFT)
+        ttk.Entry(options, textvariable=self.channels, width=8).pack(side=tk.LEFT, padx=(5, 20))
+        ttk.Label(options, text="Bit-planes:", font=("Arial", 10)).pack(side=tk.LEFT)
+        ttk.Entry(options, textvariable=self.planes, width=8).pack(side=tk.LEFT, padx=5)
+        ttk.Label(options, text="(e.g. RGB and 0,1 - use the same values to extract)",
+                  foreground="gray").pack(side=tk.LEFT, padx=5)
+        super().create_tabbed_widgets()
+    
+    def create_hide_tab(self, parent):
+        """Create Hide tab with lossless image file types"""
+        super().create_hide_tab(parent)
+        for widget in parent.winfo_children():
+            if isinstance(widget, ttk.Button) and widget.cget("text") == "Browse":
+                info = widget.grid_info()
+                if info.get("row") == 0:
+                    widget.config(command=lambda: self.browse_input_file([
+                        ("Lossless images", "*.png *.bmp"), ("All files", "*.*")
+                    ]))
+                elif info.get("row") == 1:
+                    widget.config(command=lambda: self.browse_output_file([
+                        ("Lossless images", "*.png *.bmp"), ("All files", "*.*")
+                    ]))
+    
+    def create_extract_tab(self, parent):
+        """Create Extract tab with lossless image file types"""
+        super().create_extract_tab(parent)
+        for widget in parent.winfo_children():
+            if isinstance(widget, ttk.Button) and widget.cget("text") == "Browse":
+                widget.config(command=lambda: self.browse_input_file([
+                    ("Lossless images", "*.png *.bmp"), ("All files", "*.*")
+                ]))
+    
+    def get_engine(self, tab):
+        return LSBImageEngine(
+            log=self.engine_log(tab),
+            channels=self.channels.get(),
+            planes=self.planes.get()
+        )
+    
+    def hide_message(self):
+        """Hide message with the native LSB engine"""
+        if not self.validate_inputs(require_message=True, require_password=False, tab="hide"):
+            return
+        
+        self.clear_log("hide")
+        self.log("Starting LSB hide operation...", tab="hide")
+        
         try:
-            subprocess.run([cmd, "--version"], capture_output=True, timeout=2)
-            return True
-        except:
-            return False
+            engine = self.get_engine("hide")
+            self.start_job(
+                "hide", engine.embed,
+                self.input_file.get(),
+                self.get_message(),
+                self.output_file.get(),
+                self.password.get(),
+                on_done=self.report_hide_result
+            )
+        
+        except EngineError as e:
+            self.log(str(e), "ERROR", "hide")
+            messagebox.showerror("Error", str(e))
+        except Exception as e:
+            self.log(f"Exception: {str(e)}", "ERROR", "hide")
+            messagebox.showerror("Error", f"An error occurred: {str(e)}")
     
+    def extract_message(self):
+        """Extract message with the native LSB engine"""
+        if not self.validate_inputs(require_message=False, require_password=False, tab="extract"):
+            return
+        
+        self.clear_log("extract")
+        self.log("Starting LSB extract operation...", tab="extract")
+        
+        try:
+            engine = self.get_engine("extract")
+            self.start_job(
+                "extract", engine.extract,
+                self.input_file.get(),
+                self.password.get(),
+                on_done=self.report_extract_result
+            )
+        
+        except EngineError as e:
+            self.log(str(e), "ERROR", "extract")
+            messagebox.showerror("Error", str(e))
+        except Exception as e:
+            self.log(f"Exception: {str(e)}", "ERROR", "extract")
+            messagebox.showerror("Error", f"An error occurred: {str(e)}")
 
 
 class XiaoSteganographyTool(BaseToolWindow):
@@ -244,20 +301,7 @@ class XiaoSteganographyTool(BaseToolWindow):
     
     def find_xiao_steganography(self):
         """Find Xiao Steganography executable"""
-        possible_paths = [
-            os.path.join(os.path.dirname(__file__), "Xiao Stenography.lnk"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "Xiao Stenography.lnk"),
-            os.path.join(os.path.dirname(__file__), "..", "tools", "Xiao Stenography.lnk"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "XiaoSteganography.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "Xiao.exe"),
-            "XiaoSteganography.exe",
-            "Xiao.exe",
-        ]
-        for path in possible_paths:
-            abs_path = os.path.abspath(path)
-            if os.path.exists(abs_path):
-                return abs_path
-        return None
+        return find_tool("xiao")
     
     def hide_message(self):
         """Hide message - Launch GUI tool"""
@@ -296,3 +340,263 @@ class XiaoSteganographyTool(BaseToolWindow):
             self.log("Xiao Steganography executable not found.", "ERROR", tab="extract")
             messagebox.showerror("Error", "Xiao Steganography executable not found.\nPlease ensure it's in the Tools directory.")
 
+
+class SteganalysisTool:
+    """Ranks PNG/BMP images by their estimated LSB embedding rate"""
+    
+    def __init__(self, parent, root_window):
+        self.root_window = root_window
+        self.parent = parent
+        self.target = tk.StringVar()
+        self.recursive = tk.BooleanVar(value=True)
+        self.status = tk.StringVar(value="Choose an image or a folder of images.")
+        self.results = []
+        self.job = None
+        self.ui = UiDispatcher(parent)
+        self.setup_ui()
+    
+    def setup_ui(self):
+        """Setup the UI"""
+        frame = ttk.Frame(self.parent, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        row = ttk.Frame(frame)
+        row.pack(fill=tk.X)
+        ttk.Label(row, text="Images:", font=("Arial", 10)).pack(side=tk.LEFT)
+        ttk.Entry(row, textvariable=self.target, width=45).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        ttk.Button(row, text="File", command=self.browse_file).pack(side=tk.LEFT)
+        ttk.Button(row, text="Folder", command=self.browse_folder).pack(side=tk.LEFT, padx=(5, 0))
+        
+        buttons = ttk.Frame(frame)
+        buttons.pack(fill=tk.X, pady=10)
+        self.analyse_button = ttk.Button(buttons, text="Analyse", command=self.start_analysis, width=15)
+        self.analyse_button.pack(side=tk.LEFT)
+        self.cancel_button = ttk.Button(buttons, text="Cancel", command=self.cancel_analysis, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+        self.save_button = ttk.Button(buttons, text="Save Report", command=self.save_report, state=tk.DISABLED)
+        self.save_button.pack(side=tk.LEFT)
+        ttk.Checkbutton(buttons, text="Subfolders", variable=self.recursive).pack(side=tk.LEFT, padx=10)
+        ttk.Label(buttons, textvariable=self.status, foreground="gray").pack(side=tk.LEFT)
+        
+        columns = ("estimate", "rs", "spa", "chi")
+        self.tree = ttk.Treeview(frame, columns=columns, show="tree headings")
+        self.tree.heading("#0", text="Image")
+        self.tree.heading("estimate", text="Estimate")
+        self.tree.heading("rs", text="RS")
+        self.tree.heading("spa", text="SPA")
+        self.tree.heading("chi", text="Chi-square p")
+        self.tree.column("#0", width=330)
+        for column in columns:
+            self.tree.column(column, width=80, anchor=tk.E)
+        self.tree.tag_configure("suspect", foreground="red")
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        ttk.Label(frame, text="Estimates are the share of pixels whose lowest bit was replaced; "
+                              "clean photos usually stay below 5%.", foreground="gray").pack(anchor=tk.W, pady=(5, 0))
+    
+    def browse_file(self):
+        filename = filedialog.askopenfilename(
+            title="Select image",
+            filetypes=[("Lossless images", "*.png *.bmp"), ("All files", "*.*")]
+        )
+        if filename:
+            self.target.set(filename)
+    
+    def browse_folder(self):
+        folder = filedialog.askdirectory(title="Select a folder of images")
+        if folder:
+            self.target.set(folder)
+    
+    def start_analysis(self):
+        """Analyse the images in a background process pool"""
+        # collect_carriers is shared with the batch runner
+        from .batch import collect_carriers
+        
+        target = self.target.get()
+        if not target or not os.path.exists(target):
+            messagebox.showerror("Error", "Please select an image or a folder.")
+            return
+        images = collect_carriers([target], IMAGE_EXTENSIONS, self.recursive.get())
+        if not images:
+            messagebox.showerror("Error", "No PNG or BMP images found.")
+            return
+        self.tree.delete(*self.tree.get_children())
+        self.results = []
+        self.status.set(f"0/{len(images)} analysed")
+        self.analyse_button.config(state=tk.DISABLED)
+        self.save_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        done = [0]
+        
+        def progress(result):
+            done[0] += 1
+            self.ui.post(self.status.set, f"{done[0]}/{len(images)} analysed")
+        
+        self.job = get_runner().submit(
+            triage, images, None, progress,
+            label="Steganalysis",
+            on_done=lambda job: self.ui.post(self.analysis_finished, job)
+        )
+    
+    def cancel_analysis(self):
+        if self.job:
+            self.job.cancel()
+    
+    def analysis_finished(self, job):
+        self.job = None
+        self.analyse_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+        if job.status == CANCELLED:
+            self.status.set("Analysis cancelled.")
+            return
+        if job.exception is not None:
+            self.status.set("Analysis failed.")
+            messagebox.showerror("Error", f"Analysis failed:\n{job.exception}")
+            return
+        self.results = job.value
+        for r in self.results:
+            if not r["ok"]:
+                self.tree.insert("", tk.END, text=r["file"], values=(r["error"], "", "", ""))
+                continue
+            name, ch = max(r["channels"].items(), key=lambda item: item[1]["estimate"])
+            self.tree.insert(
+                "", tk.END, text=r["file"], tags=("suspect",) if r["suspect"] else (),
+                values=(f"{r['estimate']:.1%} ({name})", f"{ch['rs']:.1%}", f"{ch['spa']:.1%}", f"{ch['chi_p']:.2f}")
+            )
+        suspects = sum(1 for r in self.results if r.get("suspect"))
+        self.status.set(f"{len(self.results)} image(s), {suspects} suspect")
+        self.save_button.config(state=tk.NORMAL)
+    
+    def save_report(self):
+        filename = filedialog.asksaveasfilename(
+            title="Save report",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON", "*.json")]
+        )
+        if not filename:
+            return
+        try:
+            write_report(filename, self.results)
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not save the report:\n{e}")
+
+
+class PassphraseRecoveryTool:
+    """Tries a wordlist against one carrier in a process pool (see recovery.py)"""
+    
+    def __init__(self, parent, root_window):
+        self.root_window = root_window
+        self.parent = parent
+        self.carrier = tk.StringVar()
+        self.wordlist = tk.StringVar()
+        self.engine = tk.StringVar(value="steghide")
+        self.workers = tk.IntVar(value=os.cpu_count() or 1)
+        self.resume = tk.BooleanVar(value=True)
+        self.status = tk.StringVar(value="Choose a carrier and a wordlist.")
+        self.job = None
+        self.ui = UiDispatcher(parent)
+        self.setup_ui()
+    
+    def setup_ui(self):
+        """Setup the UI"""
+        frame = ttk.Frame(self.parent, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+        frame.columnconfigure(1, weight=1)
+        
+        ttk.Label(frame, text="Carrier:", font=("Arial", 10)).grid(row=0, column=0, sticky=tk.W, pady=5)
+        ttk.Entry(frame, textvariable=self.carrier, width=50).grid(row=0, column=1, sticky=(tk.W, tk.E), padx=5)
+        ttk.Button(frame, text="Browse", command=self.browse_carrier).grid(row=0, column=2)
+        ttk.Label(frame, text="Wordlist:", font=("Arial", 10)).grid(row=1, column=0, sticky=tk.W, pady=5)
+        ttk.Entry(frame, textvariable=self.wordlist, width=50).grid(row=1, column=1, sticky=(tk.W, tk.E), padx=5)
+        ttk.Button(frame, text="Browse", command=self.browse_wordlist).grid(row=1, column=2)
+        
+        options = ttk.Frame(frame)
+        options.grid(row=2, column=0, columnspan=3, sticky=tk.W, pady=5)
+        ttk.Label(options, text="Engine:").pack(side=tk.LEFT)
+        ttk.Combobox(options, textvariable=self.engine, values=RECOVERY_ENGINES, state="readonly",
+                     width=10).pack(side=tk.LEFT, padx=(5, 15))
+        ttk.Label(options, text="Workers:").pack(side=tk.LEFT)
+        ttk.Spinbox(options, from_=1, to=256, textvariable=self.workers, width=5).pack(side=tk.LEFT, padx=(5, 15))
+        ttk.Checkbutton(options, text="Resume from the last checkpoint", variable=self.resume).pack(side=tk.LEFT)
+        
+        buttons = ttk.Frame(frame)
+        buttons.grid(row=3, column=0, columnspan=3, pady=10)
+        self.start_button = ttk.Button(buttons, text="Start", command=self.start, width=15)
+        self.start_button.pack(side=tk.LEFT)
+        self.stop_button = ttk.Button(buttons, text="Stop", command=self.stop, state=tk.DISABLED)
+        self.stop_button.pack(side=tk.LEFT, padx=5)
+        ttk.Label(frame, textvariable=self.status, foreground="gray").grid(row=4, column=0, columnspan=3, sticky=tk.W)
+        
+        ttk.Label(frame, text="Extracted Message:", font=("Arial", 10)).grid(row=5, column=0, sticky=tk.NW, pady=(10, 5))
+        self.result_text = scrolledtext.ScrolledText(frame, width=70, height=10, wrap=tk.WORD)
+        self.result_text.grid(row=6, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S))
+        frame.rowconfigure(6, weight=1)
+        ttk.Label(frame, text="Stopping saves a checkpoint; start again with Resume to continue where it left off. "
+                              "Only use this on files you are allowed to open.",
+                  foreground="gray", wraplength=650).grid(row=7, column=0, columnspan=3, sticky=tk.W, pady=(5, 0))
+    
+    def browse_carrier(self):
+        filename = filedialog.askopenfilename(
+            title="Select carrier",
+            filetypes=[("Carriers", "*.jpg *.jpeg *.png *.bmp *.gif *.wav"), ("All files", "*.*")]
+        )
+        if filename:
+            self.carrier.set(filename)
+    
+    def browse_wordlist(self):
+        filename = filedialog.askopenfilename(
+            title="Select wordlist",
+            filetypes=[("Text files", "*.txt *.lst *.dic"), ("All files", "*.*")]
+        )
+        if filename:
+            self.wordlist.set(filename)
+    
+    def start(self):
+        """Run the recovery as a background job"""
+        carrier, wordlist = self.carrier.get(), self.wordlist.get()
+        if not os.path.isfile(carrier) or not os.path.isfile(wordlist):
+            messagebox.showerror("Error", "Please select a carrier and a wordlist.")
+            return
+        try:
+            workers = max(1, int(self.workers.get()))
+        except (tk.TclError, ValueError):
+            messagebox.showerror("Error", "Workers must be a number.")
+            return
+        if self.job:
+            return
+        self.result_text.delete("1.0", tk.END)
+        self.status.set("Starting workers...")
+        self.start_button.config(state=tk.DISABLED)
+        self.stop_button.config(state=tk.NORMAL)
+        
+        def progress(tried, rate, line):
+            self.ui.post(self.status.set, f"{tried:,} tried, {rate:,.0f}/s, done up to line {line:,}")
+        
+        self.job = get_runner().submit(
+            recover, carrier, wordlist, self.engine.get(), workers, self.resume.get(), None, progress,
+            label="Passphrase recovery",
+            on_done=lambda job: self.ui.post(self.recovery_finished, job)
+        )
+    
+    def stop(self):
+        if self.job:
+            self.job.cancel()
+    
+    def recovery_finished(self, job):
+        self.job = None
+        self.start_button.config(state=tk.NORMAL)
+        self.stop_button.config(state=tk.DISABLED)
+        if job.status == CANCELLED:
+            self.status.set("Stopped; the checkpoint is saved, start again with Resume to continue.")
+            return
+        if job.exception is not None:
+            self.status.set("Recovery failed.")
+            messagebox.showerror("Error", f"Recovery failed:\n{job.exception}")
+            return
+        result = job.value
+        if result["password"] is None:
+            self.status.set(f"No password in the wordlist worked ({result['tried']:,} tried, "
+                            f"{result['rate']:,.0f}/s).")
+            return
+        self.status.set(f"Password found on line {result['line']:,}: {result['password']} "
+                        f"({result['tried']:,} tried, {result['rate']:,.0f}/s)")
+        self.result_text.insert("1.0", result["payload"].decode("utf-8", errors="replace"))
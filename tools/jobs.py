@@ -0,0 +1,295 @@
+"""
+Background Jobs
+Runs engine operations and external tools off the caller's thread.
+
+A ``Job`` is the handle for one operation: it can be waited on, cancelled,
+and given callbacks. ``run_process`` is the cancellable, streaming
+replacement for ``subprocess.run`` that the engines use; when it runs inside
+a job, cancelling the job kills the process.
+
+Like engine.py, this module must not import tkinter.
+"""
+
+import itertools
+import os
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+_job_ids = itertools.count(1)
+_local = threading.local()
+
+
+class JobCancelled(Exception):
+    """Raised inside a job whose cancel() was called"""
+
+
+def current_job():
+    """The job running on this thread, or None"""
+    return getattr(_local, "job", None)
+
+
+class Job:
+    """Handle for one background operation"""
+
+    def __init__(self, func, args=(), kwargs=None, label=None):
+        self.id = next(_job_ids)
+        self.label = label or getattr(func, "__name__", "job")
+        self.status = PENDING
+        self.value = None
+        self.exception = None
+        self.started = None
+        self.finished = None
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs or {}
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._processes = set()
+        self._callbacks = []
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.label!r} {self.status}>"
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def cancel(self):
+        """Ask the job to stop and kill any process it is waiting on"""
+        self._cancel.set()
+        with self._lock:
+            processes = list(self._processes)
+        for proc in processes:
+            _kill(proc)
+
+    def check_cancelled(self):
+        """Raise JobCancelled if cancel() was called; for long pure-Python loops"""
+        if self._cancel.is_set():
+            raise JobCancelled(f"{self.label} was cancelled")
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def result(self, timeout=None):
+        """The return value of the job; re-raises its exception"""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"{self.label} is still running")
+        if self.exception is not None:
+            raise self.exception
+        return self.value
+
+    def add_done_callback(self, callback):
+        """Call ``callback(job)`` once the job has finished (on the worker thread)"""
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def _attach(self, proc):
+        with self._lock:
+            self._processes.add(proc)
+        if self._cancel.is_set():
+            _kill(proc)
+
+    def _detach(self, proc):
+        with self._lock:
+            self._processes.discard(proc)
+
+    def _run(self):
+        self.started = time.perf_counter()
+        _local.job = self
+        try:
+            self.check_cancelled()
+            self.status = RUNNING
+            self.value = self._func(*self._args, **self._kwargs)
+            self.status = DONE
+        except JobCancelled as e:
+            self.exception = e
+            self.status = CANCELLED
+        except BaseException as e:
+            self.exception = e
+            self.status = CANCELLED if self._cancel.is_set() else FAILED
+        finally:
+            _local.job = None
+            self.finished = time.perf_counter()
+            with self._lock:
+                callbacks, self._callbacks = self._callbacks, []
+                self._done.set()
+            for callback in callbacks:
+                callback(self)
+
+
+class JobRunner:
+    """Thread pool that hands out Job handles; several jobs may run at once"""
+
+    def __init__(self, max_workers=4):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stego-job")
+        self._lock = threading.Lock()
+        self._jobs = []
+
+    def submit(self, func, *args, label=None, on_done=None, **kwargs):
+        """Start ``func(*args, **kwargs)`` in the background and return its Job"""
+        job = Job(func, args, kwargs, label)
+        with self._lock:
+            self._jobs.append(job)
+        job.add_done_callback(self._forget)
+        if on_done:
+            job.add_done_callback(on_done)
+        self._pool.submit(job._run)
+        return job
+
+    def active(self):
+        with self._lock:
+            return list(self._jobs)
+
+    def cancel_all(self):
+        for job in self.active():
+            job.cancel()
+
+    def shutdown(self, cancel=True):
+        if cancel:
+            self.cancel_all()
+        self._pool.shutdown(wait=False)
+
+    def _forget(self, job):
+        with self._lock:
+            if job in self._jobs:
+                self._jobs.remove(job)
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner():
+    """The process-wide job runner, created on first use"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
+
+
+def _kill(proc):
+    """Kill a process and, on POSIX, its process group when it leads one"""
+    try:
+        if hasattr(os, "killpg") and os.getpgid(proc.pid) == proc.pid:
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except OSError:
+        pass
+
+
+def _pump(pipe, stream, chunks, on_output, text):
+    """Collect a pipe line by line, reporting each line as it arrives"""
+    try:
+        for line in pipe:
+            chunks.append(line)
+            if on_output:
+                on_output(stream, line if text else line.decode(errors="replace"))
+    finally:
+        pipe.close()
+
+
+def _feed(pipe, data):
+    try:
+        if isinstance(data, bytes) and hasattr(pipe, "buffer"):
+            pipe = pipe.buffer   # binary payload for a tool whose output is text
+        if data:
+            pipe.write(data)
+    except (BrokenPipeError, OSError):
+        pass
+    finally:
+        try:
+            pipe.close()
+        except OSError:
+            pass
+
+
+def run_process(cmd, timeout=None, cwd=None, text=True, input=None, on_output=None, env=None):
+    """Run a command like ``subprocess.run(capture_output=True)``.
+
+    ``input`` may be bytes even when ``text`` is true. Output lines are
+    passed to ``on_output(stream, line)`` ("stdout" or "stderr") while the
+    process runs. Raises subprocess.TimeoutExpired after
+    ``timeout`` seconds and JobCancelled if the current job is cancelled; the
+    process is killed in both cases.
+    """
+    job = current_job()
+    if job:
+        job.check_cancelled()
+    proc = subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        env=env,
+        stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=text,
+        errors="replace" if text else None,
+        # Own process group, so cancelling also kills what the tool started
+        start_new_session=job is not None and hasattr(os, "killpg"),
+    )
+    if job:
+        job._attach(proc)
+
+    out, err = [], []
+    threads = [
+        threading.Thread(target=_pump, args=(proc.stdout, "stdout", out, on_output, text), daemon=True),
+        threading.Thread(target=_pump, args=(proc.stderr, "stderr", err, on_output, text), daemon=True),
+    ]
+    if input is not None:
+        threads.append(threading.Thread(target=_feed, args=(proc.stdin, input), daemon=True))
+    for thread in threads:
+        thread.start()
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    timed_out = killed = False
+    try:
+        while True:
+            try:
+                proc.wait(timeout=0.1)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            if job and job.cancelled:
+                killed = True
+                _kill(proc)
+            elif deadline is not None and time.monotonic() > deadline:
+                timed_out = killed = True
+                _kill(proc)
+    finally:
+        if job:
+            job._detach(proc)
+        # A killed tool's children may keep the pipes open; don't wait on them
+        for thread in threads:
+            thread.join(2 if killed else None)
+
+    empty = "" if text else b""
+    stdout, stderr = empty.join(out), empty.join(err)
+    if job and job.cancelled:
+        raise JobCancelled(f"{job.label} was cancelled")
+    if timed_out:
+        raise subprocess.TimeoutExpired(cmd, timeout, output=stdout, stderr=stderr)
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
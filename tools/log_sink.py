@@ -0,0 +1,102 @@
+"""
+Log Sink
+Thread-safe, batched log lines for the tool windows.
+
+Lines are written from any thread into a queue and taken out in batches by
+whoever shows them: a tool window drains its sink on a timer and inserts
+the whole batch into its text widget at once, so a tool printing thousands
+of lines costs the event loop one insert per tick instead of one per line.
+Only the last ``max_lines`` lines are kept (a ring buffer), so a runaway
+tool cannot grow the log without bound.
+
+When STEGO_TOOLKIT_LOG names a file, every line is also appended to it,
+one write per batch, rotating to ``.1``, ``.2``, ... when it grows past
+LOG_FILE_BYTES.
+
+Like engine.py, this module must not import tkinter.
+"""
+
+import collections
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+MAX_LINES = 5000                 # lines kept per sink (and shown per log widget)
+LOG_FILE_BYTES = 1024 * 1024     # size at which the mirror file is rotated
+LOG_FILE_BACKUPS = 3
+
+_handlers = {}                   # one rotating handler per file, shared by all sinks
+_handlers_lock = threading.Lock()
+
+
+def log_file():
+    """Path of the mirror log file, or None (STEGO_TOOLKIT_LOG)"""
+    return os.environ.get("STEGO_TOOLKIT_LOG") or None
+
+
+def _file_handler(path):
+    with _handlers_lock:
+        handler = _handlers.get(path)
+        if handler is None:
+            handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=LOG_FILE_BYTES, backupCount=LOG_FILE_BACKUPS, encoding="utf-8", delay=True
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            _handlers[path] = handler
+        return handler
+
+
+class LogSink:
+    """Collects log lines from any thread for batched display"""
+
+    def __init__(self, name="", max_lines=MAX_LINES, path=None):
+        self.name = name
+        self.max_lines = max_lines
+        self.lines = collections.deque(maxlen=max_lines)
+        self.pending = queue.Queue()
+        path = path or log_file()
+        self.handler = _file_handler(path) if path else None
+
+    def write(self, message, level="INFO"):
+        """Queue one message; safe to call from any thread"""
+        self.pending.put(f"[{level}] {message}")
+
+    def drain(self):
+        """Take the lines written since the last drain, oldest first.
+
+        All of them are kept and mirrored, but at most ``max_lines`` are
+        returned: older ones would be dropped from the display anyway.
+        """
+        batch = []
+        try:
+            while True:
+                batch.append(self.pending.get_nowait())
+        except queue.Empty:
+            pass
+        if not batch:
+            return batch
+        self.lines.extend(batch)
+        if self.handler is not None:
+            self._mirror(batch)
+        return batch[-self.max_lines:]
+
+    def _mirror(self, batch):
+        # One record per batch: the handler locks, checks for rotation and
+        # flushes once however many lines there are. Write errors are
+        # reported by the handler on stderr, never raised into the UI.
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        prefix = f"{stamp} {self.name}: " if self.name else f"{stamp} "
+        text = "\n".join(prefix + line for line in batch)
+        self.handler.handle(logging.makeLogRecord({"msg": text, "levelno": logging.INFO}))
+
+    def clear(self):
+        """Forget the kept lines; pending ones still reach the file"""
+        self.drain()
+        self.lines.clear()
+
+    def text(self):
+        """The kept lines as one string"""
+        return "\n".join(self.lines)
@@ -0,0 +1,187 @@
+"""
+Memory-Mapped Files
+Read-only views of files of any size for the hex viewer and binary diff.
+
+The file is mapped rather than read, so opening a multi-gigabyte carrier
+costs no time and no memory: only the pages that are displayed or searched
+are loaded, and the operating system drops them again under pressure.
+Searches run over the mapping in large windows with ``mmap.find``, so they
+never copy the file. After each window its pages are handed back
+(``madvise``, where the platform has it), so even a search through the
+whole file leaves the process no bigger, and between windows a running job
+can be cancelled.
+
+Like engine.py, this module must not import tkinter.
+"""
+
+import mmap
+import os
+import re
+
+from .engine import EngineError
+from .jobs import current_job
+
+ROW_BYTES = 16
+SEARCH_CHUNK = 64 * 1024 * 1024   # bytes searched between cancellation checks
+
+# Printable ASCII as is, everything else as a dot
+_TEXT = bytes(b if 0x20 <= b < 0x7F else 0x2E for b in range(256))
+_HEX_RE = re.compile(r"^[0-9a-fA-F\s]+$")
+
+
+def parse_offset(text):
+    """Offset from user input: decimal, ``0x`` hex or hex with an ``h`` suffix"""
+    value = text.strip().replace("_", "")
+    try:
+        if value.lower().startswith("0x"):
+            return int(value[2:], 16)
+        if value.lower().endswith("h"):
+            return int(value[:-1], 16)
+        return int(value)
+    except ValueError:
+        raise EngineError(f"Not an offset: {text!r}. Use decimal, 0x1F or 1Fh.")
+
+
+def parse_pattern(text):
+    """Search bytes from user input: hex digits (spaces allowed) as bytes,
+    anything else, or anything in quotes, as UTF-8 text
+    """
+    value = text.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        data = value[1:-1].encode("utf-8")
+    elif _HEX_RE.match(value):
+        digits = "".join(value.split())
+        if len(digits) % 2:
+            raise EngineError("Hex patterns need two digits per byte.")
+        data = bytes.fromhex(digits)
+    else:
+        data = value.encode("utf-8")
+    if not data:
+        raise EngineError("Enter bytes to search for.")
+    return data
+
+
+def offset_digits(size):
+    """Hex digits needed for offsets in a file of ``size`` bytes (at least 8)"""
+    return max(8, len(f"{max(size - 1, 0):X}"))
+
+
+def format_row(offset, data, digits=8, width=ROW_BYTES):
+    """One hex dump line: offset, hex bytes and their printable text"""
+    hex_part = data.hex(" ").upper().ljust(3 * width - 1)
+    return f"{offset:0{digits}X}  {hex_part}  {data.translate(_TEXT).decode('ascii')}"
+
+
+def hex_column(index, digits=8):
+    """Column of byte ``index`` of a row in the hex part of format_row()"""
+    return digits + 2 + 3 * index
+
+
+def text_column(index, digits=8, width=ROW_BYTES):
+    """Column of byte ``index`` of a row in the text part of format_row()"""
+    return digits + 3 * width + 3 + index
+
+
+class MappedFile:
+    """A file mapped read-only; ``size`` bytes, sliced like bytes"""
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            self._file = open(path, "rb")
+        except OSError as e:
+            raise EngineError(f"{path}: {e.strerror or e}")
+        self.size = os.fstat(self._file.fileno()).st_size
+        # Empty files cannot be mapped
+        self._map = None
+        if self.size:
+            try:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError) as e:
+                self._file.close()
+                raise EngineError(f"{path}: cannot map the file ({e}).")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, key):
+        if self._map is None:
+            return b"" if isinstance(key, slice) else b""[key]
+        return self._map[key]
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    @property
+    def rows(self):
+        return -(-self.size // ROW_BYTES)
+
+    def read(self, offset, length):
+        offset = max(0, min(offset, self.size))
+        return self[offset:offset + length]
+
+    def dump(self, first_row, count, digits=None):
+        """Formatted lines for ``count`` rows starting at ``first_row``"""
+        digits = digits or offset_digits(self.size)
+        start = first_row * ROW_BYTES
+        data = self.read(start, count * ROW_BYTES)
+        return [format_row(start + i, data[i:i + ROW_BYTES], digits) for i in range(0, len(data), ROW_BYTES)]
+
+    def view(self, offset, length):
+        """memoryview of [offset, offset + length) without copying; the file
+        cannot be closed while views of it are alive
+        """
+        if self._map is None:
+            return memoryview(b"")
+        offset = max(0, min(offset, self.size))
+        return memoryview(self._map)[offset:offset + length]
+
+    def release(self, start, end):
+        """Drop the pages of [start, end) from this process; the page cache
+        keeps them, so reading them again is cheap
+        """
+        if hasattr(self._map, "madvise"):
+            start -= start % mmap.PAGESIZE
+            self._map.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+    def find(self, pattern, start=0, reverse=False, chunk=SEARCH_CHUNK):
+        """Offset of the first ``pattern`` at or after ``start`` (with
+        ``reverse``, the last one before ``start``), or -1
+        """
+        if self._map is None or not pattern:
+            return -1
+        job = current_job()
+        overlap = len(pattern) - 1
+        if not reverse:
+            pos = max(0, start)
+            while pos < self.size:
+                if job:
+                    job.check_cancelled()
+                end = min(self.size, pos + chunk + overlap)
+                found = self._map.find(pattern, pos, end)
+                self.release(pos, end)
+                if found >= 0:
+                    return found
+                pos += chunk
+            return -1
+        high = min(start, self.size)
+        while high > 0:
+            if job:
+                job.check_cancelled()
+            low = max(0, high - chunk)
+            end = min(self.size, high + overlap)
+            found = self._map.rfind(pattern, low, end)
+            self.release(low, end)
+            if found >= 0:
+                return found
+            high = low
+        return -1
@@ -0,0 +1,187 @@
+"""
+Payload Classifier
+Fast check of whether extracted bytes are a real payload or wrong-password noise.
+
+Most tools "extract" something even with the wrong password: the bytes are
+then indistinguishable from random data. The classifier keeps running
+counts of printable and text-like bytes (via ``bytes.translate``, which does
+the per-byte work in C) and a byte histogram for the entropy, over chunks
+fed one at a time. Once enough bytes have been seen to rule out text it
+stops, so a large garbage payload is never scanned in full.
+
+Like engine.py, this module must not import tkinter.
+"""
+
+import math
+import string
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:  # the histogram falls back to collections.Counter
+    np = None
+
+PRINTABLE = bytes([9, 10, 13]) + bytes(range(32, 127))
+# Letters, digits and whitespace are the strongest sign of readable text
+TEXTLIKE = (" \t\n\r" + string.ascii_letters + string.digits).encode("ascii")
+
+CHUNK_SIZE = 64 * 1024
+
+# Leading bytes of file types a payload is commonly packed as
+SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"%PDF-", "pdf"),
+    (b"PK\x03\x04", "zip"),
+    (b"PK\x05\x06", "zip"),
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bzip2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"7z\xbc\xaf\x27\x1c", "7z"),
+    (b"Rar!\x1a\x07", "rar"),
+    (b"RIFF", "riff"),
+    (b"ID3", "mp3"),
+    (b"OggS", "ogg"),
+    (b"\x7fELF", "elf"),
+)
+
+
+def signature(data):
+    """File type named by the leading bytes of ``data``, or None"""
+    for magic, name in SIGNATURES:
+        if data.startswith(magic):
+            return name
+    return None
+
+
+class PayloadClassifier:
+    """Running text/binary statistics over a payload fed in chunks.
+
+    ``feed`` returns True once the verdict can no longer change: ``limit``
+    bytes have been seen, or at least ``decide_after`` bytes failed the text
+    thresholds (wrong-password output does not turn into text further on).
+    """
+
+    def __init__(self, min_printable=0.7, min_textlike=0.35, decide_after=4096, limit=1024 * 1024):
+        self.min_printable = min_printable
+        self.min_textlike = min_textlike
+        self.decide_after = decide_after
+        self.limit = limit
+        self.seen = 0
+        self.printable = 0
+        self.textlike = 0
+        self.head = b""
+        self.settled = False
+        self._histogram = np.zeros(256, dtype=np.int64) if np is not None else Counter()
+
+    def feed(self, chunk):
+        if self.settled:
+            return True
+        if self.limit is not None:
+            chunk = chunk[:self.limit - self.seen]
+        chunk = bytes(chunk)
+        n = len(chunk)
+        self.seen += n
+        self.printable += n - len(chunk.translate(None, PRINTABLE))
+        self.textlike += n - len(chunk.translate(None, TEXTLIKE))
+        if np is not None:
+            self._histogram += np.bincount(np.frombuffer(chunk, dtype=np.uint8), minlength=256)
+        else:
+            self._histogram.update(chunk)
+        if len(self.head) < 16:
+            self.head += chunk[:16 - len(self.head)]
+        if (self.limit is not None and self.seen >= self.limit) or \
+                (self.seen >= self.decide_after and not self.is_text):
+            self.settled = True
+        return self.settled
+
+    @property
+    def printable_ratio(self):
+        return self.printable / self.seen if self.seen else 0.0
+
+    @property
+    def textlike_ratio(self):
+        return self.textlike / self.seen if self.seen else 0.0
+
+    @property
+    def is_text(self):
+        return (self.seen > 0 and self.printable_ratio >= self.min_printable
+                and self.textlike_ratio >= self.min_textlike)
+
+    @property
+    def entropy(self):
+        """Shannon entropy in bits per byte (8.0 for uniformly random data)"""
+        if not self.seen:
+            return 0.0
+        counts = self._histogram.tolist() if np is not None else self._histogram.values()
+        return sum(c / self.seen * math.log2(self.seen / c) for c in counts if c)
+
+    @property
+    def kind(self):
+        """What the payload looks like: empty, text, a file type from
+        SIGNATURES, binary (structured data) or random (noise)
+        """
+        if not self.seen:
+            return "empty"
+        if self.is_text:
+            return "text"
+        name = signature(self.head)
+        if name:
+            return name
+        # The entropy of a small random sample stays below 8 bits, so
+        # compare against what that many bytes could reach
+        if self.seen >= 16 and self.entropy >= 0.85 * math.log2(min(self.seen, 256)):
+            return "random"
+        return "binary"
+
+    @property
+    def looks_like_payload(self):
+        return self.kind not in ("empty", "random")
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "text": self.is_text,
+            "bytes_checked": self.seen,
+            "printable_ratio": round(self.printable_ratio, 4),
+            "textlike_ratio": round(self.textlike_ratio, 4),
+            "entropy": round(self.entropy, 4),
+        }
+
+
+def classify(data, chunk_size=CHUNK_SIZE, **options):
+    """Classify ``data`` (bytes, or an iterable of byte chunks), stopping as
+    soon as the verdict is settled. Returns the PayloadClassifier.
+    """
+    classifier = PayloadClassifier(**options)
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        view = memoryview(data)
+        chunks = (view[i:i + chunk_size] for i in range(0, len(view), chunk_size))
+    else:
+        chunks = data
+    for chunk in chunks:
+        if classifier.feed(chunk):
+            break
+    return classifier
+
+
+def classify_file(path, chunk_size=CHUNK_SIZE, **options):
+    """Classify a file, reading only as much of it as the verdict needs"""
+    with open(path, "rb") as f:
+        return classify(iter(lambda: f.read(chunk_size), b""), **options)
+
+
+def is_probably_text(data):
+    """Heuristic check that extracted bytes are readable text rather than
+    the gibberish a wrong password produces.
+    """
+    return classify(data).is_text
+
+
+def looks_like_payload(data):
+    """True for text, known file types and structured binary data; False for
+    empty output and data that is indistinguishable from noise
+    """
+    return classify(data).looks_like_payload
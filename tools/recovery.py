@@ -0,0 +1,280 @@
+"""
+Passphrase Recovery
+Tries the passwords of a wordlist against one carrier (CTF and lab work).
+
+The wordlist is streamed in chunks of CHUNK passwords to a process pool,
+one worker per CPU by default, and only a few chunks per worker are read
+ahead, so lists of any size use constant memory. Each worker runs the
+engine's normal extract for every password of its chunk; steghide checks
+its own CRC, so its first success is the passphrase. Then a shared event
+stops every worker before its next attempt.
+
+Progress is saved to a checkpoint every few seconds, and when the run is
+stopped: the byte and line offset up to which every password has been
+tried. A resumed run seeks straight to that offset. The checkpoint is
+removed when the passphrase is found or the list is exhausted.
+
+    python -m tools.recovery challenge.jpg rockyou.txt
+    python -m tools.recovery challenge.jpg rockyou.txt -j 16 --resume -o flag.txt
+
+Only use this on carriers you are allowed to open.
+
+Like engine.py, this module must not import tkinter.
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .engine import EngineError, get_engine
+from .jobs import JobCancelled, current_job
+from .registry import cache_dir
+
+CHUNK = 32                 # passwords per task
+READ_AHEAD = 3             # chunks queued per worker
+CHECKPOINT_SECONDS = 5.0
+PROGRESS_SECONDS = 1.0
+ENGINES = ("steghide", "lsb", "wavlsb", "gifpalette")   # their extracts reject wrong passwords
+
+_stop = None               # in the workers: set once any worker succeeds
+
+
+def read_wordlist(path, start_byte=0, start_line=0, chunk=CHUNK):
+    """Yield (end_line, end_byte, passwords, line_numbers) chunks of a
+    wordlist from ``start_byte``; empty lines are skipped but counted.
+    Passwords are decoded like file names, so bytes that are not UTF-8
+    reach the tool unchanged.
+    """
+    with open(path, "rb") as f:
+        f.seek(start_byte)
+        line = last_yielded = start_line
+        position = start_byte
+        batch, numbers = [], []
+        for raw in f:
+            position += len(raw)
+            line += 1
+            word = raw.rstrip(b"\r\n")
+            if word:
+                batch.append(os.fsdecode(word))
+                numbers.append(line)
+            if len(batch) >= chunk:
+                yield line, position, batch, numbers
+                last_yielded, batch, numbers = line, [], []
+        if line > last_yielded:
+            yield line, position, batch, numbers
+
+
+def _init_worker(stop):
+    global _stop
+    _stop = stop
+    # Ctrl-C reaches the whole process group; only the parent should act on
+    # it, stopping the workers through ``stop``
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _try_chunk(engine_name, options, carrier, passwords):
+    """Try ``passwords`` until one works or another worker succeeds"""
+    try:
+        engine = get_engine(engine_name, **options)
+        for i, password in enumerate(passwords):
+            if _stop.is_set():
+                return {"tried": i, "complete": False}
+            result = engine.extract(carrier, password)
+            if result.ok:
+                _stop.set()
+                return {"tried": i + 1, "complete": False, "password": password, "payload": result.payload,
+                        "index": i}
+        return {"tried": len(passwords), "complete": True}
+    except (EngineError, OSError) as e:
+        return {"tried": 0, "complete": False, "error": str(e)}
+
+
+def checkpoint_path(carrier, wordlist, engine_name):
+    """Default checkpoint file of one carrier/wordlist/engine combination"""
+    key = json.dumps([os.path.abspath(carrier), os.path.abspath(wordlist), engine_name])
+    name = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir(), "recovery", f"{name}.json")
+
+
+def _wordlist_stamp(wordlist):
+    st = os.stat(wordlist)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def load_checkpoint(path, wordlist):
+    """(line, byte) to resume from; (0, 0) without a checkpoint"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return 0, 0
+    if data.get("wordlist_stamp") != _wordlist_stamp(wordlist):
+        raise EngineError(f"{wordlist} changed since the checkpoint was saved; start over without --resume.")
+    return data["line"], data["byte"]
+
+
+def save_checkpoint(path, carrier, wordlist, engine_name, line, byte, tried):
+    data = {"carrier": os.path.abspath(carrier), "wordlist": os.path.abspath(wordlist), "engine": engine_name,
+            "wordlist_stamp": _wordlist_stamp(wordlist), "line": line, "byte": byte, "tried": tried}
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def recover(carrier, wordlist, engine_name="steghide", workers=None, resume=False, checkpoint=None,
+            on_progress=None, options=None):
+    """Try every password of ``wordlist`` on ``carrier``.
+
+    Returns a dict with ``password`` (None if none worked), ``payload``,
+    ``line`` (1-based wordlist line of the password), ``tried`` (this run),
+    ``seconds``, ``rate`` (attempts per second), ``offset`` (line up to
+    which every password has been tried) and ``checkpoint``.
+    ``on_progress(tried, rate, line)`` is called about once a second. Run
+    as a job, cancelling it stops the workers and saves the checkpoint.
+    """
+    options = options or {}
+    engine = get_engine(engine_name, **options)
+    engine.check_carrier(carrier)
+    if not os.path.isfile(wordlist):
+        raise EngineError(f"Wordlist not found: {wordlist}")
+    checkpoint = checkpoint or checkpoint_path(carrier, wordlist, engine_name)
+    line, byte = load_checkpoint(checkpoint, wordlist) if resume else (0, 0)
+    workers = workers or os.cpu_count()
+    job = current_job()
+
+    stop = multiprocessing.Event()
+    chunks = read_wordlist(wordlist, byte, line)
+    queued = line          # first line of the next chunk
+    pending = {}           # future -> (first_line, end_line, end_byte, line_numbers)
+    finished = {}          # first_line -> (end_line, end_byte) of chunks done out of order
+    found = error = None
+    tried = 0
+    started = last_progress = last_saved = time.perf_counter()
+
+    def rate():
+        elapsed = time.perf_counter() - started
+        return tried / elapsed if elapsed > 0 else 0.0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(stop,)) as pool:
+        try:
+            while True:
+                while not stop.is_set() and len(pending) < workers * READ_AHEAD:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    end_line, end_byte, passwords, numbers = chunk
+                    future = pool.submit(_try_chunk, engine_name, options, carrier, passwords)
+                    pending[future] = (queued, end_line, end_byte, numbers)
+                    queued = end_line
+                if not pending:
+                    break
+                done, _ = wait(pending, timeout=PROGRESS_SECONDS, return_when=FIRST_COMPLETED)
+                if job:
+                    job.check_cancelled()
+                for future in done:
+                    first, end_line, end_byte, numbers = pending.pop(future)
+                    result = future.result()
+                    tried += result["tried"]
+                    if result.get("error") and error is None:
+                        error = result["error"]
+                        stop.set()
+                    if "password" in result and found is None:
+                        found = dict(result, line=numbers[result["index"]])
+                    if result["complete"]:
+                        finished[first] = (end_line, end_byte)
+                # Advance the checkpoint over the chunks done without gaps
+                while line in finished:
+                    line, byte = finished.pop(line)
+                now = time.perf_counter()
+                if on_progress and now - last_progress >= PROGRESS_SECONDS:
+                    on_progress(tried, rate(), line)
+                    last_progress = now
+                if now - last_saved >= CHECKPOINT_SECONDS:
+                    save_checkpoint(checkpoint, carrier, wordlist, engine_name, line, byte, tried)
+                    last_saved = now
+        except BaseException:
+            stop.set()
+            for future in pending:
+                future.cancel()
+            save_checkpoint(checkpoint, carrier, wordlist, engine_name, line, byte, tried)
+            raise
+
+    if error is not None:
+        save_checkpoint(checkpoint, carrier, wordlist, engine_name, line, byte, tried)
+        raise EngineError(error)
+    try:
+        os.remove(checkpoint)
+    except OSError:
+        pass
+    if on_progress:
+        on_progress(tried, rate(), line)
+    return {
+        "password": found["password"] if found else None,
+        "payload": found["payload"] if found else None,
+        "line": found["line"] if found else None,
+        "tried": tried,
+        "seconds": round(time.perf_counter() - started, 3),
+        "rate": round(rate(), 1),
+        "offset": line,
+        "checkpoint": checkpoint,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m tools.recovery",
+        description="Try the passwords of a wordlist against one carrier, in parallel.",
+    )
+    parser.add_argument("carrier", help="file to extract from")
+    parser.add_argument("wordlist", help="one password per line")
+    parser.add_argument("-e", "--engine", default="steghide",
+                        help=f"engine to extract with (default: steghide; {', '.join(ENGINES[1:])} work too)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--resume", action="store_true", help="continue from the last checkpoint")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: one per carrier and wordlist in the cache)")
+    parser.add_argument("-o", "--output", help="write the extracted payload to this file")
+    args = parser.parse_args(argv)
+
+    def progress(tried, rate, line):
+        print(f"\r{tried:,} tried, {rate:,.0f}/s, every password up to line {line:,} done ",
+              end="", file=sys.stderr, flush=True)
+
+    try:
+        result = recover(args.carrier, args.wordlist, args.engine, args.workers, args.resume, args.checkpoint,
+                         on_progress=progress)
+    except KeyboardInterrupt:
+        print("\nStopped; continue with --resume.", file=sys.stderr)
+        return 130
+    except (EngineError, JobCancelled) as e:
+        print(f"\n{e}", file=sys.stderr)
+        return 1
+    print(file=sys.stderr)
+    if result["password"] is None:
+        print(f"No password in the wordlist worked ({result['tried']:,} tried in {result['seconds']:.1f}s).")
+        return 1
+    print(f"Password found on line {result['line']}: {result['password']}")
+    if args.output:
+        with open(args.output, "wb") as f:
+            f.write(result["payload"])
+        print(f"Payload ({len(result['payload'])} bytes) written to {args.output}")
+    else:
+        print(result["payload"].decode("utf-8", errors="replace"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
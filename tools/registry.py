@@ -0,0 +1,410 @@
+"""
+External Tool Registry
+Locates every external executable once and remembers where it was.
+
+The candidate locations of all tools are resolved in parallel, normally on a
+background thread started with the application, and the results are cached
+on disk. A cached hit is revalidated with a single stat of the executable
+(mtime and size); a cached miss is revalidated against the mtimes of the
+directories that were searched, so dropping a tool into one of them is
+picked up on the next start. Hide/extract calls only read the table.
+
+Like engine.py, this module must not import tkinter.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CACHE_VERSION = 1
+CACHE_FILE_NAME = "tools.json"
+
+
+def cache_dir():
+    """Per-user directory for the toolkit's on-disk caches.
+    STEGO_TOOLKIT_CACHE overrides the platform default.
+    """
+    override = os.environ.get("STEGO_TOOLKIT_CACHE")
+    if override:
+        return override
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base, "StegnoGraphyToolkit", "cache")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "stegnography-toolkit")
+
+
+def find_executable(possible_paths):
+    """Return the first existing absolute path from the list or None.
+    Accepts a list of relative or absolute paths and returns the absolute path
+    of the first file that exists.
+    """
+    for path in possible_paths:
+        abs_path = os.path.abspath(path)
+        if os.path.exists(abs_path):
+            return abs_path
+    return None
+
+
+def which(*commands):
+    """First of ``commands`` found on the PATH, without spawning it"""
+    for cmd in commands:
+        path = shutil.which(cmd)
+        if path:
+            return path
+    return None
+
+
+def _here(*names):
+    return os.path.join(TOOLS_DIR, *names)
+
+
+def _up(*names):
+    """Sibling folders of the tools package (Tools/ and tools/ in the repo root)"""
+    return [
+        os.path.join(TOOLS_DIR, "..", "Tools", *names),
+        os.path.join(TOOLS_DIR, "..", "tools", *names),
+    ]
+
+
+def tool_paths(*names):
+    """Candidate locations for a bundled tool, relative to the tools folder"""
+    return [_here(*names)] + _up(*names)
+
+
+class ToolSpec:
+    """Where to look for one external tool"""
+
+    def __init__(self, name, label, candidates, commands=()):
+        self.name = name
+        self.label = label
+        self.candidates = list(candidates)
+        self.commands = tuple(commands)   # looked up on the PATH as a last resort
+
+
+TOOL_SPECS = {spec.name: spec for spec in [
+    ToolSpec("steghide", "Steghide",
+             tool_paths("steghide", "steghide.exe") + [
+                 os.path.join(TOOLS_DIR, "..", "Tools", "steghide.exe"),
+                 "steghide.exe",
+                 "steghide",
+             ],
+             commands=("steghide", "steghide.exe")),
+    ToolSpec("mp3stego", "MP3Stego Encode",
+             tool_paths("MP3Stego", "Encode.exe") + [
+                 os.path.join(TOOLS_DIR, "..", "Tools", "Encode.exe"),
+                 "Encode.exe",
+                 "mp3stego.exe",
+             ]),
+    ToolSpec("mp3stego_decode", "MP3Stego Decode",
+             tool_paths("MP3Stego", "Decode.exe") + [
+                 os.path.join(TOOLS_DIR, "..", "Tools", "Decode.exe"),
+                 "Decode.exe",
+             ]),
+    ToolSpec("gifshuf", "GIFShuffle",
+             tool_paths("GIFShuff-Tool", "GIFSHUF.EXE")
+             + tool_paths("GIFShuff-Tool", "GIFSHUF.exe") + [
+                 os.path.join(TOOLS_DIR, "..", "Tools", "GIFSHUF.EXE"),
+                 "GIFSHUF.EXE",
+                 "GIFSHUF.exe",
+                 "gifshuf.exe",
+             ]),
+    ToolSpec("xiao", "Xiao Steganography",
+             [_here("Xiao Stenography.lnk")] + _up("Xiao Stenography.lnk") + [
+                 os.path.join(TOOLS_DIR, "..", "Tools", "XiaoSteganography.exe"),
+                 os.path.join(TOOLS_DIR, "..", "Tools", "Xiao.exe"),
+                 "XiaoSteganography.exe",
+                 "Xiao.exe",
+             ]),
+    ToolSpec("deepsound", "DeepSound",
+             [
+                 _here("DeepSound.exe.lnk"),
+                 _here("DeepSound.lnk"),
+                 _here("DeepSound.exe"),
+                 os.path.join(TOOLS_DIR, "..", "Tools", "DeepSound.exe"),
+                 os.path.join(TOOLS_DIR, "..", "Tools", "DeepSound.exe.lnk"),
+                 os.path.join(TOOLS_DIR, "..", "tools", "DeepSound.exe"),
+                 os.path.join(TOOLS_DIR, "..", "tools", "DeepSound.exe.lnk"),
+                 os.path.join(TOOLS_DIR, "..", "Tools", "DeepSound", "DeepSound.exe"),
+                 "DeepSound.exe",
+                 "deepsound.exe",
+             ]),
+    ToolSpec("deegger", "DeEgger Embedder",
+             [
+                 _here("DeEgger Embedder.lnk"),
+                 _here("DeEgger Embedder.exe"),
+                 _here("DeEgger Embedder.exe.lnk"),
+                 os.path.join(TOOLS_DIR, "..", "Tools", "DeEgger Embedder.exe"),
+                 os.path.join(TOOLS_DIR, "..", "Tools", "DeEgger Embedder.lnk"),
+                 os.path.join(TOOLS_DIR, "..", "tools", "DeEgger Embedder.exe"),
+                 os.path.join(TOOLS_DIR, "..", "tools", "DeEgger Embedder.lnk"),
+                 os.path.join(TOOLS_DIR, "..", "Tools", "DeEgger Embedder", "DeEgger Embedder.exe"),
+                 "DeEgger Embedder.exe",
+                 "DeEgger Embedder.lnk",
+                 "deegger embedder.exe",
+                 "deegger.exe",
+             ]),
+    ToolSpec("wbstego", "wbStego4open",
+             [
+                 _here("wbStego4.3open.exe"),
+                 _here("wbStego4.3open.exe.lnk"),
+                 _here("wbs43open-win32", "wbStego4.3open.exe"),
+             ] + _up("wbStego4.3open.exe") + [
+                 os.path.join(TOOLS_DIR, "..", "Tools", "wbs43open-win32", "wbStego4.3open.exe"),
+                 os.path.join(TOOLS_DIR, "..", "Tools", "WBStego4Open.exe"),
+                 "wbStego4.3open.exe",
+                 "WBStego4Open.exe",
+                 "WBStego4.3open.exe",
+             ]),
+    ToolSpec("hxd", "HxD",
+             [_here("HxD.exe"), _here("HxD.exe.lnk")] + _up("HxD.exe") + [
+                 "HxD.exe",
+                 "HxD64.exe",
+                 "hxd.exe",
+             ]),
+    ToolSpec("ads_viewer", "ADS Viewer",
+             [
+                 "D:\\ADSView.exe",
+                 _here("ADS Viewer.exe"),
+                 _here("ADS Viewer.exe.lnk"),
+             ] + _up("ADSViewer.exe") + _up("ADS Viewer.exe") + [
+                 os.path.join(TOOLS_DIR, "..", "Tools", "ADSViewer", "ADSViewer.exe"),
+                 "ADSViewer.exe",
+                 "adsviewer.exe",
+             ]),
+    ToolSpec("streams", "Streams",
+             [
+                 "streams.exe",
+                 "Streams.exe",
+                 os.path.join(TOOLS_DIR, "..", "Tools", "streams.exe"),
+             ],
+             commands=("streams.exe",)),
+]}
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class ToolRegistry:
+    """Resolved tool paths, shared by the GUI windows and the engines"""
+
+    def __init__(self, specs=None, cache_file=None):
+        self.specs = dict(TOOL_SPECS if specs is None else specs)
+        self.cache_file = cache_file or os.path.join(cache_dir(), CACHE_FILE_NAME)
+        self._entries = {}
+        self._pending = {}      # name -> Future while a background resolve runs
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._disk = {}
+
+    # -- public API -------------------------------------------------------
+
+    def start(self):
+        """Resolve every tool on a background thread; returns immediately"""
+        with self._lock:
+            names = [n for n in self.specs if n not in self._entries and n not in self._pending]
+            for name in names:
+                self._pending[name] = Future()
+        if names:
+            threading.Thread(target=self._resolve_all, args=(names,),
+                             name="tool-registry", daemon=True).start()
+        return self
+
+    def find(self, name):
+        """Path of the tool or None. Waits if it is still being resolved."""
+        entry = self._entry(name)
+        path = entry.get("path")
+        if path and not self._file_unchanged(entry):
+            entry = self._store(name, self._resolve(name), save=True)
+            path = entry.get("path")
+        return path
+
+    def remember(self, name, path):
+        """Record a location the user picked by hand"""
+        entry = self._stamp_file({"path": os.path.abspath(path), "manual": True})
+        entry["signature"] = self._signature(self.specs[name])
+        self._store(name, entry, save=True)
+
+    def refresh(self, name=None):
+        """Forget cached results and resolve again"""
+        names = [name] if name else list(self.specs)
+        for n in names:
+            self._store(n, self._resolve(n))
+        self.save()
+
+    def snapshot(self):
+        """{name: path or None} for every known tool"""
+        return {name: self.find(name) for name in self.specs}
+
+    def save(self):
+        with self._lock:
+            data = {"version": CACHE_VERSION, "tools": dict(self._entries)}
+        tmp = f"{self.cache_file}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1)
+            os.replace(tmp, self.cache_file)
+        except OSError:
+            # The cache only saves time; a read-only home is not an error
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    # -- resolution -------------------------------------------------------
+
+    def _resolve_all(self, names):
+        with ThreadPoolExecutor(max_workers=min(8, len(names))) as pool:
+            for name, entry in zip(names, pool.map(self._cached_or_resolve, names)):
+                self._store(name, entry)
+        self.save()
+
+    def _cached_or_resolve(self, name):
+        entry = self._load().get(name)
+        if entry and self._cache_valid(name, entry):
+            return entry
+        return self._resolve(name)
+
+    def _resolve(self, name):
+        spec = self.specs[name]
+        path = find_executable(spec.candidates) or which(*spec.commands)
+        entry = {"path": path, "signature": self._signature(spec)}
+        if path:
+            return self._stamp_file(entry)
+        entry["dirs"] = self._dir_stamps(spec)
+        return entry
+
+    def _entry(self, name):
+        if name not in self.specs:
+            raise KeyError(f"Unknown tool: {name}")
+        with self._lock:
+            entry = self._entries.get(name)
+            pending = self._pending.get(name)
+        if entry is not None:
+            return entry
+        if pending is not None:
+            return pending.result()
+        return self._store(name, self._cached_or_resolve(name), save=True)
+
+    def _store(self, name, entry, save=False):
+        with self._lock:
+            self._entries[name] = entry
+            pending = self._pending.pop(name, None)
+        if pending is not None:
+            pending.set_result(entry)
+        if save:
+            self.save()
+        return entry
+
+    # -- cache validation -------------------------------------------------
+
+    def _load(self):
+        with self._lock:
+            if self._loaded:
+                return self._disk
+            self._loaded = True
+            self._disk = {}
+            try:
+                with open(self.cache_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == CACHE_VERSION:
+                    self._disk = data.get("tools", {})
+            except (OSError, ValueError, AttributeError):
+                pass
+            return self._disk
+
+    def _signature(self, spec):
+        """Changes when the candidate list or anything it is relative to changes"""
+        key = [spec.candidates, spec.commands, os.getcwd(),
+               os.environ.get("PATH", "") if spec.commands else ""]
+        return hashlib.sha1(json.dumps(key).encode("utf-8")).hexdigest()
+
+    def _dir_stamps(self, spec):
+        dirs = {os.path.dirname(os.path.abspath(p)) for p in spec.candidates}
+        if spec.commands:
+            dirs.update(d for d in os.environ.get("PATH", "").split(os.pathsep) if d)
+        return {d: _mtime(d) for d in sorted(dirs)}
+
+    def _stamp_file(self, entry):
+        try:
+            st = os.stat(entry["path"])
+            entry["mtime"], entry["size"] = st.st_mtime_ns, st.st_size
+        except OSError:
+            entry["mtime"] = entry["size"] = None
+        return entry
+
+    def _file_unchanged(self, entry):
+        try:
+            st = os.stat(entry["path"])
+        except OSError:
+            return False
+        return st.st_mtime_ns == entry.get("mtime") and st.st_size == entry.get("size")
+
+    def _cache_valid(self, name, entry):
+        if entry.get("signature") != self._signature(self.specs[name]):
+            return False
+        if entry.get("path"):
+            return self._file_unchanged(entry)
+        dirs = entry.get("dirs") or {}
+        return all(_mtime(d) == stamp for d, stamp in dirs.items())
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """The process-wide registry, created on first use"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ToolRegistry()
+        return _registry
+
+
+def set_registry(registry):
+    """Replace the process-wide registry (e.g. with stub tools for benchmarks).
+    Returns the previous one.
+    """
+    global _registry
+    with _registry_lock:
+        previous, _registry = _registry, registry
+        return previous
+
+
+def find_tool(name):
+    """Path of a registered tool or None"""
+    return get_registry().find(name)
+
+
+def remember_tool(name, path):
+    """Record where the user found a tool, for this and later sessions"""
+    get_registry().remember(name, path)
+
+
+def main(argv=None):
+    """python -m tools.registry [--refresh]: show where each tool was found"""
+    argv = sys.argv[1:] if argv is None else argv
+    registry = get_registry()
+    if "--refresh" in argv:
+        registry.refresh()
+    for name, spec in registry.specs.items():
+        path = registry.find(name)
+        print(f"{spec.label:20} {path or 'not found'}")
+    print(f"cache: {registry.cache_file}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Scratch Space
+Private per-job directories for tools that only exchange data through files.
+
+Each job gets its own directory, so concurrent jobs never see each other's
+files. It lives on a RAM-backed filesystem when the OS has one (/dev/shm)
+and is removed with everything in it when the job's ``with`` block ends.
+"""
+
+import contextlib
+import os
+import shutil
+import tempfile
+
+from .spans import span
+
+RAM_DIRS = ("/dev/shm",)
+
+
+def scratch_root():
+    """Where scratch directories are created.
+    STEGO_TOOLKIT_SCRATCH overrides; otherwise the first usable RAM-backed
+    directory, falling back to the system temp directory.
+    """
+    override = os.environ.get("STEGO_TOOLKIT_SCRATCH")
+    if override:
+        return override
+    for path in RAM_DIRS:
+        if os.path.isdir(path) and os.access(path, os.W_OK | os.X_OK):
+            return path
+    return tempfile.gettempdir()
+
+
+@contextlib.contextmanager
+def scratch_dir(prefix="stego-"):
+    """A private (0700) directory, deleted on exit even if the job fails"""
+    path = tempfile.mkdtemp(prefix=prefix, dir=scratch_root())
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def write_file(directory, name, data):
+    """Write ``data`` to ``directory/name`` and return the path"""
+    path = os.path.join(directory, name)
+    with span("stage payload"), open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def read_file(path):
+    """Contents of ``path``, or None if the tool did not create it"""
+    try:
+        with span("collect"), open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def link_into(directory, path):
+    """Make ``path`` appear inside ``directory`` without copying if possible,
+    for tools that write their output next to their input.
+    """
+    target = os.path.join(directory, os.path.basename(path))
+    source = os.path.abspath(path)
+    with span("stage payload", step="link carrier"):
+        for link in (os.symlink, os.link):
+            try:
+                link(source, target)
+                return target
+            except (OSError, NotImplementedError, AttributeError):
+                continue
+        shutil.copyfile(source, target)
+    return target
@@ -0,0 +1,209 @@
+"""
+Operation Spans
+Per-phase timing of hide/extract operations.
+
+An operation run inside ``traced(label)`` is timed phase by phase: the
+engines mark their phases with ``span(name)`` blocks (discover: finding the
+tool; stage payload: writing the files it reads; execute: running it;
+collect: reading what it wrote; verify: checking the result). Each span
+records its wall time, the CPU time of its thread and, when the trace asks
+for it, the tracemalloc peak above the memory in use when it began.
+Outside a trace, span() costs one thread-local lookup.
+
+A finished Trace gives one summary line for the tool log and Chrome trace
+events; write_chrome_trace() saves the events of many operations, from any
+number of processes, as one file for chrome://tracing or ui.perfetto.dev.
+
+Like engine.py, this module must not import tkinter.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+_local = threading.local()
+_memory_lock = threading.Lock()
+_memory_users = 0
+
+
+class Span:
+    """One timed phase; ``depth`` 0 is the whole operation"""
+
+    def __init__(self, name, depth, args):
+        self.name = name
+        self.depth = depth
+        self.args = args
+        self.start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+        self.wall = None
+        self.cpu = None
+        self.peak = None
+        self.memory_base = None   # traced bytes when the span began
+        self.memory_high = 0      # highest traced bytes seen so far
+
+    def to_dict(self, origin):
+        data = {"name": self.name, "depth": self.depth, "offset": round(self.start - origin, 6),
+                "wall": round(self.wall, 6), "cpu": round(self.cpu, 6)}
+        if self.peak is not None:
+            data["peak"] = self.peak
+        if self.args:
+            data["args"] = self.args
+        return data
+
+
+class Trace:
+    """The spans of one operation, recorded on one thread"""
+
+    def __init__(self, label, memory=False):
+        self.label = label
+        self.memory = memory
+        self.spans = []
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+        self.epoch = time.time()
+        self.origin = time.perf_counter()
+        self._open = []
+
+    def _enter(self, name, args):
+        span = Span(name, len(self._open), args)
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._open:
+                # The enclosing spans keep the peak so far before it is reset
+                self._open[-1].memory_high = max(self._open[-1].memory_high, peak)
+            if hasattr(tracemalloc, "reset_peak"):   # Python 3.9+
+                tracemalloc.reset_peak()
+            span.memory_base = span.memory_high = current
+        self._open.append(span)
+        self.spans.append(span)
+        return span
+
+    def _exit(self, span):
+        span.wall = time.perf_counter() - span.start
+        span.cpu = time.thread_time() - span.cpu_start
+        self._open.pop()
+        if self.memory:
+            peak = max(span.memory_high, tracemalloc.get_traced_memory()[1])
+            span.peak = peak - span.memory_base
+            if self._open:
+                self._open[-1].memory_high = max(self._open[-1].memory_high, peak)
+
+    @property
+    def total(self):
+        return self.spans[0] if self.spans else None
+
+    def phases(self):
+        """Wall, CPU and peak per phase name, summed over the top-level spans"""
+        totals = {}
+        for span in self.spans:
+            if span.depth != 1:
+                continue
+            wall, cpu, peak = totals.get(span.name, (0.0, 0.0, None))
+            if span.peak is not None:
+                peak = max(peak or 0, span.peak)
+            totals[span.name] = (wall + span.wall, cpu + span.cpu, peak)
+        return totals
+
+    def summary(self):
+        """One line: time per phase, then the total"""
+        parts = []
+        for name, (wall, cpu, peak) in self.phases().items():
+            part = f"{name} {wall:.3f}s"
+            if wall >= 0.01:
+                part += f" (cpu {cpu:.3f}s)"
+            if peak:
+                part += f" [{peak / 1024 / 1024:.1f} MB]"
+            parts.append(part)
+        total = self.total
+        if total is not None and total.wall is not None:
+            parts.append(f"total {total.wall:.3f}s, cpu {total.cpu:.3f}s"
+                         + (f", peak {total.peak / 1024 / 1024:.1f} MB" if total.peak is not None else ""))
+        return "; ".join(parts)
+
+    def to_dict(self):
+        """Plain-dict form, safe to pickle and to dump as JSON"""
+        return {"label": self.label, "pid": self.pid, "tid": self.tid, "epoch": self.epoch,
+                "spans": [span.to_dict(self.origin) for span in self.spans if span.wall is not None]}
+
+
+def current_trace():
+    """The trace recording on this thread, or None"""
+    return getattr(_local, "trace", None)
+
+
+@contextlib.contextmanager
+def span(name, **args):
+    """Time the enclosed block as phase ``name`` of the current trace"""
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        yield
+        return
+    entered = trace._enter(name, args)
+    try:
+        yield
+    finally:
+        trace._exit(entered)
+
+
+@contextlib.contextmanager
+def traced(label, memory=False):
+    """Record the spans of the enclosed operation; yields its Trace.
+    With ``memory``, tracemalloc runs for the duration (it slows Python
+    code down considerably, and its peaks are per process, so they are
+    only exact while one operation runs at a time).
+    """
+    global _memory_users
+    trace = Trace(label, memory)
+    outer = getattr(_local, "trace", None)
+    if memory:
+        with _memory_lock:
+            if not _memory_users and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _memory_users = 1
+            elif _memory_users:
+                _memory_users += 1
+    _local.trace = trace
+    try:
+        with span(label):
+            yield trace
+    finally:
+        _local.trace = outer
+        if memory:
+            with _memory_lock:
+                if _memory_users:
+                    _memory_users -= 1
+                    if not _memory_users:
+                        tracemalloc.stop()
+
+
+def chrome_events(trace):
+    """Chrome trace "complete" events for a Trace or its to_dict() form"""
+    data = trace.to_dict() if isinstance(trace, Trace) else trace
+    events = []
+    for span in data["spans"]:
+        args = dict(span.get("args") or {}, cpu_ms=round(span["cpu"] * 1000, 3))
+        if "peak" in span:
+            args["peak_kb"] = round(span["peak"] / 1024, 1)
+        events.append({
+            "name": span["name"],
+            "cat": "operation" if span["depth"] == 0 else "phase",
+            "ph": "X",
+            "ts": round((data["epoch"] + span["offset"]) * 1e6, 1),
+            "dur": round(span["wall"] * 1e6, 1),
+            "pid": data["pid"],
+            "tid": data["tid"],
+            "args": args,
+        })
+    return events
+
+
+def write_chrome_trace(path, traces):
+    """Save Traces (or their to_dict() forms) as a Chrome trace JSON file"""
+    events = []
+    for trace in traces:
+        events.extend(chrome_events(trace))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
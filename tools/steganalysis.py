@@ -0,0 +1,391 @@
+"""
+LSB Steganalysis
+Estimates how much of an image's least significant bit-plane carries a
+hidden payload, so large image collections can be triaged before anyone
+tries to extract from them.
+
+Three classic detectors run on every colour channel:
+
+- chi-square pair analysis (Westfeld & Pfitzmann): LSB replacement evens
+  out the counts of each value pair 2k/2k+1. The test runs on growing
+  prefixes of the image in row order, which also estimates how far a
+  sequential payload reaches.
+- RS analysis (Fridrich, Goljan & Du): compares how flipping LSBs in groups
+  of four pixels changes their smoothness, against the same measure after
+  all LSBs have been flipped.
+- sample pair analysis (Dumitrescu, Wu & Wang): counts the trace sets of
+  horizontally adjacent pixel pairs.
+
+RS and SPA estimate the embedding rate (the fraction of pixels whose LSB
+was replaced) also for payloads scattered at keyed positions, as the
+native LSB engine writes them. Every detector works on whole NumPy arrays,
+all channels at once, and a directory of images is spread over a process
+pool:
+
+    python -m tools.steganalysis -r photos/ --report ranked.csv
+    python -m tools.steganalysis -j 8 --top 50 --report ranked.json dump/
+
+Only lossless PNG and BMP images are read (see image_lsb.py); lossy
+formats do not keep LSB payloads.
+
+Like engine.py, this module must not import tkinter.
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency, checked when analysis runs
+    np = None
+
+from .engine import EngineError
+from .image_lsb import MODES, read_image
+from .jobs import JobCancelled, current_job
+
+IMAGE_EXTENSIONS = (".png", ".bmp")
+CHI_WINDOWS = 32         # prefixes the chi-square test is run on
+CHI_MIN_EXPECTED = 5     # pairs expected to occur less often are left out
+RS_MASKS = ((0, 1, 1, 0), (1, 0, 0, 1))
+SUSPECT_RATE = 0.1       # estimates above this are flagged for a closer look
+
+
+def require_numpy():
+    if np is None:
+        raise EngineError("Steganalysis requires NumPy.\nInstall it with: pip install numpy")
+
+
+# ---------------------------------------------------------------------------
+# Chi-square pair analysis
+# ---------------------------------------------------------------------------
+
+def _chi2_sf(x, df):
+    """P(X >= x) for X chi-square distributed with ``df`` degrees of freedom
+    (the regularised upper incomplete gamma function Q(df/2, x/2))
+    """
+    if x <= 0:
+        return 1.0
+    a, x = df / 2.0, x / 2.0
+    log_front = a * math.log(x) - x - math.lgamma(a)
+    if x < a + 1:
+        # Series for the lower function P
+        term = total = 1.0 / a
+        n = a
+        while term > total * 1e-12:
+            n += 1
+            term *= x / n
+            total += term
+        return max(0.0, 1.0 - total * math.exp(log_front))
+    # Continued fraction for Q (modified Lentz)
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 500):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-12:
+            break
+    return math.exp(log_front) * h
+
+
+def chi_square(planes, windows=CHI_WINDOWS):
+    """[(p, rate)] per channel of ``planes`` (channels x samples, uint8).
+
+    ``p`` is the probability that the whole channel has evened-out pairs,
+    ``rate`` the share of the channel, from its start, over which the test
+    stays positive (the reach of a sequentially embedded payload).
+    """
+    channels, samples = planes.shape
+    windows = max(1, min(windows, samples))
+    # One histogram per (channel, window) from a single bincount
+    window = (np.arange(samples, dtype=np.int64) * windows // samples).astype(np.int32)
+    keys = (np.arange(channels, dtype=np.int32)[:, None] * windows + window) << 8 | planes
+    hist = np.bincount(keys.ravel(), minlength=channels * windows * 256)
+    prefix = hist.reshape(channels, windows, 256).cumsum(axis=1)
+    even = prefix[..., 0::2].astype(np.float64)
+    expected = (even + prefix[..., 1::2]) / 2
+    used = expected >= CHI_MIN_EXPECTED
+    terms = np.where(used, (even - expected) ** 2 / np.where(used, expected, 1), 0)
+    statistic = terms.sum(axis=2)
+    df = used.sum(axis=2) - 1
+
+    results = []
+    for c in range(channels):
+        p = [_chi2_sf(statistic[c, w], df[c, w]) if df[c, w] > 0 else 0.0 for w in range(windows)]
+        reach = 0
+        while reach < windows and p[reach] > 0.5:
+            reach += 1
+        results.append((float(p[-1]), reach / windows))
+    return results
+
+
+# ---------------------------------------------------------------------------
+# RS analysis
+# ---------------------------------------------------------------------------
+
+def _smaller_root(a, b, c):
+    """Root of ax^2 + bx + c closer to zero (the linear solution if none)"""
+    if abs(a) < 1e-12:
+        return -c / b if b else 0.0
+    disc = b * b - 4 * a * c
+    if disc < 0:
+        return -b / (2 * a)
+    root = math.sqrt(disc)
+    return min((-b + root) / (2 * a), (-b - root) / (2 * a), key=abs)
+
+
+def _regular_minus_singular(columns, flip):
+    """Share of regular minus share of singular groups per channel after
+    flipping the masked samples with ``flip``, over the masks in RS_MASKS.
+    ``columns`` holds the four samples of every group as (channels, groups)
+    arrays.
+    """
+    def smoothness(x0, x1, x2, x3):
+        return np.abs(x1 - x0) + np.abs(x2 - x1) + np.abs(x3 - x2)
+
+    base = smoothness(*columns)
+    total = 0
+    for mask in RS_MASKS:
+        flipped = [flip(x) if m else x for x, m in zip(columns, mask)]
+        # +1 for a regular group (smoothness rose), -1 for a singular one
+        total = total + np.sign(smoothness(*flipped) - base).sum(axis=1, dtype=np.int64)
+    return total / (columns[0].shape[1] * len(RS_MASKS))
+
+
+def _flip_positive(x):
+    return x ^ 1                      # 2k <-> 2k+1
+
+
+def _flip_negative(x):
+    return ((x + 1) ^ 1) - 1          # 2k-1 <-> 2k
+
+
+def rs_analysis(pixels):
+    """Estimated embedding rate per channel of ``pixels`` (height x width x
+    channels) by RS analysis on groups of four horizontal neighbours
+    """
+    height, width, channels = pixels.shape
+    width -= width % 4
+    planes = np.moveaxis(pixels[:, :width], 2, 0).astype(np.int16)
+    groups = planes.reshape(channels, -1, 4)
+    columns = [np.ascontiguousarray(groups[..., i]) for i in range(4)]
+    inverted = [x ^ 1 for x in columns]
+
+    d0 = _regular_minus_singular(columns, _flip_positive)
+    dn0 = _regular_minus_singular(columns, _flip_negative)
+    d1 = _regular_minus_singular(inverted, _flip_positive)
+    dn1 = _regular_minus_singular(inverted, _flip_negative)
+
+    rates = []
+    for c in range(channels):
+        x = _smaller_root(2 * (d1[c] + d0[c]), dn0[c] - dn1[c] - d1[c] - 3 * d0[c], d0[c] - dn0[c])
+        rates.append(x / (x - 0.5) if x != 0.5 else 1.0)
+    return rates
+
+
+# ---------------------------------------------------------------------------
+# Sample pair analysis
+# ---------------------------------------------------------------------------
+
+def sample_pairs(pixels):
+    """Estimated embedding rate per channel of ``pixels`` by sample pair
+    analysis on horizontally adjacent samples
+    """
+    planes = np.moveaxis(pixels, 2, 0).astype(np.int16)
+    u = planes[:, :, :-1].reshape(planes.shape[0], -1)
+    v = planes[:, :, 1:].reshape(planes.shape[0], -1)
+    v_even = (v & 1) == 0
+    below, above = u < v, u > v
+    x = ((v_even & below) | (~v_even & above)).sum(axis=1)
+    y = ((v_even & above) | (~v_even & below)).sum(axis=1)
+    z = (u == v).sum(axis=1)
+    w = ((u >> 1 == v >> 1) & (u != v)).sum(axis=1)
+    pairs = u.shape[1]
+
+    rates = []
+    for c in range(planes.shape[0]):
+        a = (w[c] + z[c]) / 2.0
+        b = 2.0 * x[c] - pairs
+        rates.append(_smaller_root(a, b, float(y[c] - x[c])))
+    return rates
+
+
+# ---------------------------------------------------------------------------
+# Per-image and batch analysis
+# ---------------------------------------------------------------------------
+
+def _clip(rate):
+    return round(min(1.0, max(0.0, float(rate))), 4)
+
+
+def analyze_pixels(pixels):
+    """Detector results per colour channel and the overall estimate.
+
+    The per-channel ``estimate`` is the mean of the RS and SPA rates; the
+    image estimate is that of its most suspicious channel. The chi-square
+    figures are reported alongside but do not count towards it: images with
+    smooth histograms pass the pair test without any payload. Alpha
+    channels are left out.
+    """
+    require_numpy()
+    if pixels.ndim == 2:
+        pixels = pixels[:, :, None]
+    names = MODES[pixels.shape[2]].replace("A", "")
+    pixels = pixels[:, :, :len(names)]
+    if pixels.shape[0] < 2 or pixels.shape[1] < 8:
+        raise EngineError("Image too small to analyse.")
+
+    planes = np.ascontiguousarray(np.moveaxis(pixels, 2, 0)).reshape(len(names), -1)
+    chi = chi_square(planes)
+    rs = rs_analysis(pixels)
+    spa = sample_pairs(pixels)
+
+    channels = {}
+    for c, name in enumerate(names):
+        chi_p, chi_rate = chi[c]
+        estimate = (_clip(rs[c]) + _clip(spa[c])) / 2
+        channels[name] = {
+            "chi_p": round(chi_p, 4),
+            "chi_rate": round(chi_rate, 4),
+            "rs": _clip(rs[c]),
+            "spa": _clip(spa[c]),
+            "estimate": round(estimate, 4),
+        }
+    estimate = max(ch["estimate"] for ch in channels.values())
+    return {"estimate": estimate, "suspect": estimate >= SUSPECT_RATE, "channels": channels}
+
+
+def analyze_file(path):
+    """Result dict for one image; never raises, so it is safe in a pool"""
+    started = time.perf_counter()
+    result = {"file": path, "ok": False}
+    try:
+        pixels = read_image(path)
+        result.update(analyze_pixels(pixels))
+        result["pixels"] = pixels.shape[0] * pixels.shape[1]
+        result["ok"] = True
+    except (EngineError, OSError, ValueError, MemoryError) as e:
+        result["error"] = str(e)
+    result["seconds"] = round(time.perf_counter() - started, 4)
+    return result
+
+
+def rank(results):
+    """Analysed images by descending estimate, failures last"""
+    return sorted(results, key=lambda r: (not r["ok"], -r.get("estimate", 0.0), r["file"]))
+
+
+def triage(paths, workers=None, on_result=None):
+    """Analyse every image in a process pool; returns the ranked results.
+    Run as a job, cancelling it drops the images not yet started.
+    """
+    require_numpy()
+    job = current_job()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(analyze_file, path) for path in paths]
+        try:
+            for future in as_completed(futures):
+                if job:
+                    job.check_cancelled()
+                result = future.result()
+                results.append(result)
+                if on_result:
+                    on_result(result)
+        except JobCancelled:
+            for future in futures:
+                future.cancel()
+            raise
+    return rank(results)
+
+
+def write_report(path, results):
+    """Write ranked results as CSV (one row per image) or, for a .json
+    path, with the per-channel details
+    """
+    if path.lower().endswith(".json"):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        return
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["rank", "file", "estimate", "suspect", "channel", "chi_p", "chi_rate", "rs", "spa",
+                         "seconds", "error"])
+        for i, r in enumerate(results, 1):
+            if not r["ok"]:
+                writer.writerow([i, r["file"], "", "", "", "", "", "", "", r["seconds"], r["error"]])
+                continue
+            # The channel that decided the estimate
+            name, ch = max(r["channels"].items(), key=lambda item: item[1]["estimate"])
+            writer.writerow([i, r["file"], r["estimate"], int(r["suspect"]), name, ch["chi_p"], ch["chi_rate"],
+                             ch["rs"], ch["spa"], r["seconds"], ""])
+
+
+def main(argv=None):
+    # collect_carriers is shared with the batch runner
+    from .batch import collect_carriers
+
+    parser = argparse.ArgumentParser(
+        prog="python -m tools.steganalysis",
+        description="Rank PNG/BMP images by the estimated share of their LSBs carrying hidden data.",
+    )
+    parser.add_argument("paths", nargs="+", help="image files or directories")
+    parser.add_argument("-r", "--recursive", action="store_true", help="descend into subdirectories")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--report", help="write the ranked results to this .csv or .json file")
+    parser.add_argument("--top", type=int, default=20, help="images to list on stdout (default: 20, 0 for all)")
+    args = parser.parse_args(argv)
+
+    try:
+        require_numpy()
+    except EngineError as e:
+        print(e, file=sys.stderr)
+        return 1
+    images = collect_carriers(args.paths, IMAGE_EXTENSIONS, args.recursive)
+    if not images:
+        print("No PNG or BMP images found.", file=sys.stderr)
+        return 1
+
+    started = time.perf_counter()
+    done = [0]
+
+    def progress(result):
+        done[0] += 1
+        if done[0] % 100 == 0 or done[0] == len(images):
+            print(f"{done[0]}/{len(images)} analysed", file=sys.stderr, flush=True)
+
+    results = triage(images, args.workers, progress)
+    wall = time.perf_counter() - started
+
+    shown = results if args.top <= 0 else results[:args.top]
+    for r in shown:
+        if r["ok"]:
+            flag = "SUSPECT" if r["suspect"] else ""
+            print(f"{r['estimate']:7.1%}  {flag:7}  {r['file']}")
+        else:
+            print(f"{'error':>7}  {'':7}  {r['file']}: {r['error']}")
+    if args.report:
+        write_report(args.report, results)
+    suspects = sum(1 for r in results if r.get("suspect"))
+    failed = sum(1 for r in results if not r["ok"])
+    print(f"{len(results)} image(s) in {wall:.1f}s: {suspects} suspect, {failed} unreadable", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+StegoLib in Python
+Bit-exact ports of the MP3Stego StegoLib routines (tools/StegoLib)
+"""
+
+import gzip
+import hashlib
+import struct
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; only the mask functions need it
+    np = None
+
+from .engine import EngineError, to_bytes
+
+MAX_LEN = 256      # maximum passphrase length (tools.h)
+COUNT_MAX = 3      # one DONT_EMBED in COUNT_MAX is skipped (tools.h)
+HEADER_BITS = 32   # the frame starts with a 4-byte payload length (stego.c)
+
+HASH_BITS = 160
+# A hash block yields 160 raw bits, of which about 160 / 2 / COUNT_MAX are
+# skipped zeros; used to size how many blocks to produce in one go.
+_MIN_DECISIONS_PER_BLOCK = 100
+
+
+def require_numpy():
+    if np is None:
+        raise EngineError("The StegoLib selection mask requires NumPy.\nInstall it with: pip install numpy")
+
+
+def passphrase_bytes(password):
+    """The passphrase as StegoLib sees it (ReadPassPhrase stops at MAX_LEN - 1)"""
+    data = to_bytes(password)
+    return data.split(b"\x00", 1)[0][:MAX_LEN - 1]
+
+
+class SelectionMask:
+    """Resumable port of GetPseudoRandomBit / GetPseudoRandomMask.
+
+    The raw stream is SHA-1(passphrase), then SHA-1(previous hash || passphrase)
+    every 160 bits, read LSB first from each 32-bit word. Every COUNT_MAX-th
+    zero (counted over the whole stream) is dropped; the remaining bits are
+    the EMBED (1) / DONT_EMBED (0) decisions.
+    """
+
+    def __init__(self, password):
+        require_numpy()
+        self.passphrase = passphrase_bytes(password)
+        self.reset()
+
+    def reset(self):
+        self.words = struct.unpack(">5I", hashlib.sha1(self.passphrase).digest())
+        self.zeros = 0                        # zeros seen so far, for the skip
+        self.pending = np.zeros(0, np.uint8)  # decisions produced but not returned
+
+    def _raw_blocks(self, nblocks):
+        """Raw bits of the next ``nblocks`` hash blocks, LSB first per word"""
+        data = bytearray()
+        words = self.words
+        for _ in range(nblocks):
+            block = struct.pack("<5I", *words)
+            data += block
+            words = struct.unpack(">5I", hashlib.sha1(block + self.passphrase).digest())
+        self.words = words
+        return np.unpackbits(np.frombuffer(bytes(data), np.uint8), bitorder="little")
+
+    def _decisions(self, raw):
+        """Drop the skipped zeros from a run of raw bits"""
+        zero = raw == 0
+        rank = self.zeros + np.cumsum(zero, dtype=np.int64)
+        self.zeros = int(rank[-1]) % COUNT_MAX if len(rank) else self.zeros
+        return raw[~(zero & (rank % COUNT_MAX == 0))]
+
+    def next(self, count):
+        """The next ``count`` decisions as an unpacked uint8 array of 0/1"""
+        parts = [self.pending]
+        have = len(self.pending)
+        while have < count:
+            nblocks = (count - have) // _MIN_DECISIONS_PER_BLOCK + 1
+            decisions = self._decisions(self._raw_blocks(nblocks))
+            parts.append(decisions)
+            have += len(decisions)
+        stream = np.concatenate(parts)
+        self.pending = stream[count:]
+        return stream[:count]
+
+    def packed(self, count):
+        """The next ``count`` decisions packed LSB first, as GetPseudoRandomMask fills pMask"""
+        return np.packbits(self.next(count), bitorder="little")
+
+
+def selection_mask(password, count, packed=True):
+    """Embed/skip decisions for the first ``count`` positions after a RESET"""
+    mask = SelectionMask(password)
+    return mask.packed(count) if packed else mask.next(count)
+
+
+def mask_capacity(password, positions):
+    """Number of hidden bits the first ``positions`` positions can carry"""
+    if positions <= 0:
+        return 0
+    return int(np.count_nonzero(selection_mask(password, positions, packed=False)))
+
+
+def payload_capacity(password, positions):
+    """Largest compressed and encrypted payload (bytes) that fits in ``positions``,
+    the same test StegoOpenEmbeddedText applies before encoding
+    """
+    return max(0, (mask_capacity(password, positions) - HEADER_BITS) // 8)
+
+
+def encoded_size(message):
+    """Size of ``message`` after CompressEncryptFile: gzip'd at zlib's
+    default level, then 3DES-CBC padded up to a block that ends with a
+    length byte (a full last block gets a whole padding block)
+    """
+    compressed = gzip.compress(to_bytes(message), compresslevel=6, mtime=0)
+    return (len(compressed) // 8 + 1) * 8
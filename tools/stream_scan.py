@@ -0,0 +1,384 @@
+"""
+Hidden Stream Scanner
+Finds every file under a directory tree that carries alternate data
+streams (NTFS) or non-standard extended attributes (Linux).
+
+Directories are listed with ``os.scandir`` on a thread pool and the
+attributes of each file are read on the same pool; the system calls release
+the GIL, so the threads overlap their waits on the disk. Each hit is reported
+with the stream name, its size and a short preview.
+
+An index keyed by (device, inode) remembers the result for every file
+together with its mtime and ctime, and a re-scan only reads the attributes
+of files whose stamps changed. The ctime matters: writing an extended
+attribute updates it but leaves the mtime alone. The index keeps every
+stream, standard ones included, and those are filtered out when results are
+reported, so scans with and without ``--all`` share it. The index lives in
+SQLite (``stream_index.sqlite`` in the cache directory) rather than JSON, so a
+million-file tree is neither loaded nor rewritten as a whole; it is looked
+up one directory at a time.
+
+    python -m tools.stream_scan /srv/share               # list hidden streams
+    python -m tools.stream_scan -j 32 --json /srv > hits.json
+
+Like engine.py, this module must not import tkinter.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import stat
+import struct
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .jobs import current_job
+from .registry import cache_dir
+from .xattr_streams import PART_RE, PREFIX, SPLIT_HEADER, SPLIT_MAGIC, part_attribute
+
+INDEX_FILE_NAME = "stream_index.sqlite"
+INDEX_VERSION = 2    # 1 stored the streams left after the standard ones were filtered out
+PREVIEW_BYTES = 48
+LOOKUP_BATCH = 500   # inodes per index query (below SQLite's variable limit)
+
+# Attributes the system itself sets; not worth reporting
+STANDARD_ATTRIBUTES = (
+    "security.selinux",
+    "security.capability",
+    "security.ima",
+    "security.evm",
+    "security.apparmor",
+    "system.posix_acl_access",
+    "system.posix_acl_default",
+    "system.nfs4_acl",
+    "system.richacl",
+)
+# Streams Windows adds on its own (downloaded-file marks)
+STANDARD_STREAMS = ("Zone.Identifier", "SmartScreen")
+
+
+def preview(data):
+    """Short printable rendering of the start of a stream"""
+    head = data[:PREVIEW_BYTES]
+    text = head.decode("utf-8", errors="replace")
+    if all(c.isprintable() or c in "\t\r\n" for c in text):
+        text = " ".join(text.split())
+        return text + ("..." if len(data) > PREVIEW_BYTES else "")
+    return head[:PREVIEW_BYTES // 2].hex(" ") + (" ..." if len(data) > PREVIEW_BYTES // 2 else "")
+
+
+# ---------------------------------------------------------------------------
+# Reading streams
+# ---------------------------------------------------------------------------
+
+def _xattr_streams(path, include_standard=False):
+    """[{name, size, preview}] for the extended attributes of ``path``"""
+    try:
+        names = os.listxattr(path, follow_symlinks=False)
+    except OSError:
+        return []
+    present = set(names)
+    found = []
+    for name in names:
+        if not include_standard and name in STANDARD_ATTRIBUTES:
+            continue
+        part = PART_RE.match(name)
+        if part and part.group(1) in present:
+            continue   # reported with its header (see xattr_streams.py)
+        try:
+            value = os.getxattr(path, name, follow_symlinks=False)
+        except OSError:
+            continue
+        size = len(value)
+        if (name.startswith(PREFIX) and value.startswith(SPLIT_MAGIC)
+                and len(value) >= len(SPLIT_MAGIC) + SPLIT_HEADER.size):
+            size = SPLIT_HEADER.unpack_from(value, len(SPLIT_MAGIC))[1]
+            try:
+                value = os.getxattr(path, part_attribute(name, 0), follow_symlinks=False)
+            except OSError:
+                value = b""
+        found.append({"name": name, "size": size, "preview": preview(value)})
+    return found
+
+
+def _find_streams_api():
+    """FindFirstStreamW/FindNextStreamW from kernel32, or None"""
+    try:
+        import ctypes
+        from ctypes import wintypes
+    except ImportError:
+        return None
+
+    class WIN32_FIND_STREAM_DATA(ctypes.Structure):
+        _fields_ = [("StreamSize", ctypes.c_longlong), ("cStreamName", ctypes.c_wchar * 296)]
+
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.FindFirstStreamW.restype = wintypes.HANDLE
+    kernel32.FindFirstStreamW.argtypes = [wintypes.LPCWSTR, ctypes.c_int, ctypes.c_void_p, wintypes.DWORD]
+    kernel32.FindNextStreamW.argtypes = [wintypes.HANDLE, ctypes.c_void_p]
+    kernel32.FindClose.argtypes = [wintypes.HANDLE]
+    return kernel32, WIN32_FIND_STREAM_DATA, ctypes
+
+
+_streams_api = None
+
+
+def _ads_streams(path, include_standard=False):
+    """[{name, size, preview}] for the alternate data streams of ``path``"""
+    global _streams_api
+    if _streams_api is None:
+        _streams_api = _find_streams_api() or False
+    if not _streams_api:
+        return []
+    kernel32, StreamData, ctypes = _streams_api
+    data = StreamData()
+    handle = kernel32.FindFirstStreamW(path, 0, ctypes.byref(data), 0)
+    if handle in (None, ctypes.c_void_p(-1).value):
+        return []
+    found = []
+    try:
+        while True:
+            # Names look like ":name:$DATA"; "::$DATA" is the file itself
+            name = data.cStreamName.split(":")[1] if data.cStreamName.count(":") >= 2 else ""
+            if name and (include_standard or name not in STANDARD_STREAMS):
+                try:
+                    with open(f"{path}:{name}", "rb") as f:
+                        head = f.read(PREVIEW_BYTES + 1)
+                except OSError:
+                    head = b""
+                found.append({"name": name, "size": data.StreamSize, "preview": preview(head)})
+            if not kernel32.FindNextStreamW(handle, ctypes.byref(data)):
+                break
+    finally:
+        kernel32.FindClose(handle)
+    return found
+
+
+def is_standard(name):
+    """True for attributes and streams the system sets on its own"""
+    return name in STANDARD_ATTRIBUTES or name in STANDARD_STREAMS
+
+
+def read_streams(path, include_standard=False):
+    """Hidden streams of one file, in the platform's flavour"""
+    if os.name == "nt":
+        return _ads_streams(path, include_standard)
+    if hasattr(os, "listxattr"):
+        return _xattr_streams(path, include_standard)
+    return []
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+class StreamIndex:
+    """SQLite table of (device, inode) -> stamps and streams found.
+    Used from the scanning thread only.
+    """
+
+    def __init__(self, index_file=None):
+        self.index_file = index_file or os.path.join(cache_dir(), INDEX_FILE_NAME)
+        os.makedirs(os.path.dirname(os.path.abspath(self.index_file)), exist_ok=True)
+        self.db = sqlite3.connect(self.index_file)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+            self.db.execute("DROP TABLE IF EXISTS files")
+            self.db.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " dev INTEGER, ino INTEGER, mtime INTEGER, ctime INTEGER, path TEXT, streams TEXT,"
+            " PRIMARY KEY (dev, ino))"
+        )
+
+    def lookup(self, dev, files):
+        """{ino: streams} for the files (dicts with ino, mtime, ctime, path)
+        whose stamps and path match the index
+        """
+        known = {}
+        for start in range(0, len(files), LOOKUP_BATCH):
+            batch = files[start:start + LOOKUP_BATCH]
+            marks = ",".join("?" * len(batch))
+            rows = self.db.execute(
+                f"SELECT ino, mtime, ctime, path, streams FROM files WHERE dev = ? AND ino IN ({marks})",
+                [dev] + [f["ino"] for f in batch],
+            )
+            stamps = {f["ino"]: (f["mtime"], f["ctime"], f["path"]) for f in batch}
+            for ino, mtime, ctime, path, streams in rows:
+                if stamps.get(ino) == (mtime, ctime, path):
+                    known[ino] = json.loads(streams)
+        return known
+
+    def store(self, records):
+        """records: (dev, ino, mtime, ctime, path, streams)"""
+        self.db.executemany(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+            [(dev, ino, mtime, ctime, path, json.dumps(streams))
+             for dev, ino, mtime, ctime, path, streams in records],
+        )
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+
+# ---------------------------------------------------------------------------
+# Scanning
+# ---------------------------------------------------------------------------
+
+def _list_dir(path):
+    """(subdirectories, files, error) of one directory; files carry the
+    stamps the index compares
+    """
+    subdirs, files = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                    if not st.st_ino:
+                        # Windows leaves the file id out of scandir results
+                        st = os.stat(entry.path, follow_symlinks=False)
+                except OSError:
+                    continue
+                if stat.S_ISDIR(st.st_mode):
+                    subdirs.append(entry.path)
+                elif stat.S_ISREG(st.st_mode):
+                    files.append({"path": entry.path, "dev": st.st_dev, "ino": st.st_ino,
+                                  "mtime": st.st_mtime_ns, "ctime": st.st_ctime_ns, "size": st.st_size})
+    except OSError as e:
+        return subdirs, files, f"{path}: {e.strerror or e}"
+    return subdirs, files, None
+
+
+def _read_batch(files, include_standard):
+    """(file, streams, error) per file; one unreadable file does not stop the batch"""
+    results = []
+    for f in files:
+        try:
+            results.append((f, read_streams(f["path"], include_standard), None))
+        except (OSError, struct.error) as e:
+            results.append((f, [], f"{f['path']}: {e}"))
+    return results
+
+
+def scan(roots, workers=16, index=None, include_standard=False, on_hit=None):
+    """Scan directory trees for hidden streams.
+
+    ``index`` is a StreamIndex (None to read every file). ``on_hit(path,
+    streams)`` is called for each file with streams as it is found.
+    Returns a dict with the hits ({path: streams}), errors and counts.
+    """
+    hits, errors = {}, []
+    counts = {"directories": 0, "files": 0, "read": 0, "from_index": 0}
+    started = time.perf_counter()
+    job = current_job()
+
+    def found(path, streams):
+        # Files are read, and indexed, with every stream; the standard ones
+        # are only dropped here
+        if not include_standard:
+            streams = [s for s in streams if not is_standard(s["name"])]
+        if streams:
+            hits[path] = streams
+            if on_hit:
+                on_hit(path, streams)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {}   # future -> "dir" or "read"
+        for root in roots:
+            if os.path.isdir(root):
+                pending[pool.submit(_list_dir, root)] = "dir"
+            elif os.path.isfile(root):
+                pending[pool.submit(_read_batch, [{"path": root}], True)] = "read"
+            else:
+                errors.append(f"{root}: not found")
+        while pending:
+            if job:
+                job.check_cancelled()
+            done, _running = wait(pending, return_when=FIRST_COMPLETED)
+            records = []
+            for future in done:
+                kind = pending.pop(future)
+                result = future.result()
+                if kind == "read":
+                    for f, streams, error in result:
+                        counts["read"] += 1
+                        if error:
+                            errors.append(error)
+                            continue
+                        found(f["path"], streams)
+                        if index is not None and "ino" in f:
+                            records.append((f["dev"], f["ino"], f["mtime"], f["ctime"], f["path"], streams))
+                    continue
+                subdirs, files, error = result
+                counts["directories"] += 1
+                counts["files"] += len(files)
+                if error:
+                    errors.append(error)
+                pending.update((pool.submit(_list_dir, d), "dir") for d in subdirs)
+                changed = files
+                if index is not None and files:
+                    by_dev = {}
+                    for f in files:
+                        by_dev.setdefault(f["dev"], []).append(f)
+                    changed = []
+                    for dev, group in by_dev.items():
+                        known = index.lookup(dev, group)
+                        for f in group:
+                            if f["ino"] in known:
+                                counts["from_index"] += 1
+                                found(f["path"], known[f["ino"]])
+                            else:
+                                changed.append(f)
+                # Small batches keep every thread busy on wide directories
+                for start in range(0, len(changed), 64):
+                    pending[pool.submit(_read_batch, changed[start:start + 64], True)] = "read"
+            if records:
+                index.store(records)
+    counts["seconds"] = round(time.perf_counter() - started, 3)
+    return {"hits": hits, "errors": errors, "counts": counts}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m tools.stream_scan",
+        description="Find files carrying alternate data streams or extended attributes.",
+    )
+    parser.add_argument("roots", nargs="+", help="directories (or files) to scan")
+    parser.add_argument("-j", "--workers", type=int, default=16, help="scanner threads (default: 16)")
+    parser.add_argument("--index", help=f"index file (default: {INDEX_FILE_NAME} in the cache directory)")
+    parser.add_argument("--no-index", action="store_true", help="read every file, ignoring the index")
+    parser.add_argument("--all", action="store_true",
+                        help="also report attributes the system sets (SELinux labels, ACLs, Zone.Identifier)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    def show(path, streams):
+        for s in streams:
+            print(f"{s['size']:>10}  {path}  [{s['name']}]  {s['preview']}", flush=True)
+
+    index = None if args.no_index else StreamIndex(args.index)
+    try:
+        result = scan(args.roots, args.workers, index, args.all, on_hit=None if args.json else show)
+    finally:
+        if index is not None:
+            index.close()
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    else:
+        for error in result["errors"]:
+            print(f"error: {error}", file=sys.stderr)
+        c = result["counts"]
+        print(f"{len(result['hits'])} file(s) with hidden streams; {c['files']} files in "
+              f"{c['directories']} directories, {c['read']} read, {c['from_index']} from the index, "
+              f"{c['seconds']:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+"""
+Native Text Steganography Engines
+Hide data at the ends of the lines of a text document, as zero-width
+characters or as trailing whitespace.
+
+Each line carries a fixed number of bytes, one bit per character, appended
+after its last visible character: U+200B ZERO WIDTH SPACE for 0 and U+200C
+ZERO WIDTH NON-JOINER for 1 (``zerowidth``, written as UTF-8), or a space
+for 0 and a tab for 1 (``whitespace``, like SNOW; works in any ASCII-based
+encoding). Lines keep their own line endings, and marks of that kind
+already at the end of a carrying line are replaced.
+
+Documents are streamed line by line in a single pass: lines are written
+out as they are read, and once the last payload byte is placed the rest of
+the file is copied as it is. Extraction stops at the line holding the last
+payload byte, or at the first line without marks if there is no header.
+Memory use depends on the longest line and the payload, not on the size of
+the document, so multi-hundred-MB text and log corpora take constant memory.
+
+The header (magic and length) and payload are XORed with a keystream from
+the password (SHAKE-256), so without it the marks read as random bits. That
+hides the payload from casual inspection but is no substitute for
+encrypting it first.
+
+Like engine.py, this module must not import tkinter.
+"""
+
+import hashlib
+import os
+import shutil
+import struct
+
+from .engine import Engine, EngineError, register_engine, to_bytes
+from .jobs import current_job
+from .spans import span
+
+MAGIC = b"TXS\x01"
+HEADER_SIZE = len(MAGIC) + 4  # magic + big-endian payload length
+COPY_CHUNK = 1 << 20          # bytes read per step when counting and copying
+CHECK_LINES = 1 << 16         # lines between cancellation checks
+BLOCK_LINES = 4096            # lines whose marks are encoded or decoded at once
+
+ZERO_WIDTH = "zerowidth"
+WHITESPACE = "whitespace"
+
+# The characters for 0 and 1 of each mode, the bytes they are made of, the
+# length of one in UTF-8 and the default bytes per line
+SYMBOLS = {ZERO_WIDTH: ("\u200b", "\u200c"), WHITESPACE: (" ", "\t")}
+MARK_BYTES = {ZERO_WIDTH: b"\xe2\x80\x8b\x8c", WHITESPACE: b" \t"}
+MARK_WIDTH = {ZERO_WIDTH: 3, WHITESPACE: 1}
+BYTES_PER_LINE = {ZERO_WIDTH: 8, WHITESPACE: 1}
+
+
+def _byte_marks(zero, one):
+    """The marks of every byte value, most significant bit first"""
+    return [format(value, "08b").replace("0", zero).replace("1", one).encode("utf-8") for value in range(256)]
+
+
+_MARKS = {mode: _byte_marks(*symbols) for mode, symbols in SYMBOLS.items()}
+_BITS = {ZERO_WIDTH: bytes.maketrans(b"\x8b\x8c", b"01"), WHITESPACE: bytes.maketrans(b" \t", b"01")}
+
+
+def count_lines(path):
+    """Lines of a text file, a last line without a newline included"""
+    lines = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK), b""):
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+    return lines + (last != b"\n")
+
+
+def capacity(lines, bytes_per_line):
+    """Usable payload bytes for a document of ``lines`` lines"""
+    return max(0, lines * bytes_per_line - HEADER_SIZE)
+
+
+def _scramble(data, password, offset=0):
+    """XOR ``data`` with the password keystream from byte ``offset``"""
+    key = hashlib.shake_256(b"text:" + to_bytes(password)).digest(offset + len(data))[offset:]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(key, "big")).to_bytes(len(data), "big")
+
+
+def _split(line):
+    """(content, line ending) of a line read in binary mode"""
+    content = line.rstrip(b"\r\n")
+    return content, line[len(content):]
+
+
+def _marks_start(content, mode):
+    """Where the run of marks at the end of ``content`` begins"""
+    start = len(content.rstrip(MARK_BYTES[mode]))
+    if mode == WHITESPACE:
+        return start
+    start += (len(content) - start) % 3
+    # Other characters can end in the same bytes; keep only whole marks
+    while start < len(content) and not _zero_width_run(content[start:]):
+        start += 3
+    return start
+
+
+def _zero_width_run(run):
+    return not run[0::3].strip(b"\xe2") and not run[1::3].strip(b"\x80") and not run[2::3].strip(b"\x8b\x8c")
+
+
+def _encode(data, mode):
+    """``data`` as one mark per bit"""
+    return b"".join(map(_MARKS[mode].__getitem__, data))
+
+
+def _decode(marks, mode):
+    """The whole bytes carried by a run of marks"""
+    if mode == ZERO_WIDTH:
+        marks = marks[2::3]   # the last byte of a mark tells 0 from 1
+    n = len(marks) // 8
+    return int(marks[:n * 8].translate(_BITS[mode]), 2).to_bytes(n, "big") if n else b""
+
+
+def _check_mode(mode, bytes_per_line):
+    if mode not in SYMBOLS:
+        raise EngineError(f"Unknown text steganography mode: {mode}")
+    if bytes_per_line < 1:
+        raise EngineError("Each line must carry at least one byte.")
+
+
+def _line_marks(data, bytes_per_line, mode):
+    """Yield the marks of each line's share of ``data``, encoded
+    BLOCK_LINES lines at a time
+    """
+    size = bytes_per_line * 8 * MARK_WIDTH[mode]
+    step = bytes_per_line * BLOCK_LINES
+    for offset in range(0, len(data), step):
+        block = _encode(data[offset:offset + step], mode)
+        for start in range(0, len(block), size):
+            yield block[start:start + size]
+
+
+def embed_file(carrier, message, output, password="", mode=ZERO_WIDTH, bytes_per_line=None):
+    """Stream ``carrier`` to ``output`` with ``message`` at the line ends"""
+    bytes_per_line = bytes_per_line or BYTES_PER_LINE[mode]
+    _check_mode(mode, bytes_per_line)
+    if os.path.abspath(carrier) == os.path.abspath(output):
+        raise EngineError("Choose an output file other than the carrier.")
+    payload = to_bytes(message)
+    data = _scramble(MAGIC + struct.pack(">I", len(payload)) + payload, password)
+    job = current_job()
+    try:
+        with open(carrier, "rb") as reader, open(output, "wb") as writer:
+            lines = 0
+            for marks in _line_marks(data, bytes_per_line, mode):
+                line = reader.readline()
+                if not line:
+                    # The whole document has been read, so its line count is known
+                    raise EngineError(f"Message too large: {len(payload)} bytes, document holds "
+                                      f"{capacity(lines, bytes_per_line)} bytes ({bytes_per_line} per line).")
+                if job and not lines % CHECK_LINES:
+                    job.check_cancelled()
+                content, ending = _split(line)
+                writer.write(content[:_marks_start(content, mode)] + marks + ending)
+                lines += 1
+            # Nothing left to hide: copy the rest as it is
+            shutil.copyfileobj(reader, writer, COPY_CHUNK)
+    except BaseException:
+        try:
+            os.remove(output)
+        except OSError:
+            pass
+        raise
+    return len(payload)
+
+
+def extract_file(carrier, password="", mode=ZERO_WIDTH, bytes_per_line=None):
+    """Return the hidden payload, or None if there is none for this key.
+
+    Reading stops at the line holding the last payload byte.
+    """
+    bytes_per_line = bytes_per_line or BYTES_PER_LINE[mode]
+    _check_mode(mode, bytes_per_line)
+    size = os.path.getsize(carrier)
+    per_byte = 8 * MARK_WIDTH[mode]      # bytes of marks per hidden byte
+    full = bytes_per_line * per_byte     # bytes of marks on a full line
+    job = current_job()
+    marks = bytearray()                  # read but not decoded yet
+    data = bytearray()
+    needed = None                        # header and payload bytes, once known
+    with open(carrier, "rb") as reader:
+        for number, line in enumerate(reader):
+            if job and not number % CHECK_LINES:
+                job.check_cancelled()
+            content = _split(line)[0]
+            run = content[_marks_start(content, mode):]
+            marks += run
+            last = len(run) < full       # only the last carrying line is short
+            if needed is None or last or len(marks) >= BLOCK_LINES * full:
+                data += _decode(bytes(marks), mode)
+                del marks[:len(marks) // per_byte * per_byte]
+            if needed is None and len(data) >= HEADER_SIZE:
+                header = _scramble(bytes(data[:HEADER_SIZE]), password)
+                if not header.startswith(MAGIC):
+                    return None
+                length = struct.unpack(">I", header[len(MAGIC):])[0]
+                # Every payload byte takes at least eight characters
+                if length * 8 > size:
+                    return None
+                needed = HEADER_SIZE + length
+            if needed is not None and len(data) + len(marks) // per_byte >= needed:
+                data += _decode(bytes(marks), mode)
+                return _scramble(bytes(data[HEADER_SIZE:needed]), password, HEADER_SIZE)
+            if last:
+                return None
+    return None
+
+
+class TextStegoEngine(Engine):
+    """Native line-end embedding for text documents; see the subclasses"""
+
+    mode = None
+    carrier_extensions = (".txt", ".log", ".csv", ".md", ".html", ".htm", ".xml", ".json")
+
+    def __init__(self, log=None, bytes_per_line=None):
+        super().__init__(log)
+        self.bytes_per_line = int(bytes_per_line or BYTES_PER_LINE[self.mode])
+
+    def embed(self, carrier, message, output, password=""):
+        self.check_carrier(carrier)
+        # Reading, embedding and writing are interleaved line by line
+        with span("execute"):
+            size = embed_file(carrier, message, output, password, self.mode, self.bytes_per_line)
+        self.log(f"Hid {size} bytes in {-(-(size + HEADER_SIZE) // self.bytes_per_line)} lines")
+        return self.result("embed", carrier, ok=True, output_file=output)
+
+    def extract(self, carrier, password=""):
+        self.check_carrier(carrier)
+        with span("execute"):
+            payload = extract_file(carrier, password, self.mode, self.bytes_per_line)
+        if payload is None:
+            return self.result("extract", carrier, error="No hidden data found (wrong password or mode?)")
+        return self.result("extract", carrier, ok=True, payload=payload)
+
+    @property
+    def capacity_key(self):
+        return f"{self.name}:{self.bytes_per_line}"
+
+    def capacity(self, carrier):
+        self.check_carrier(carrier)
+        lines = count_lines(carrier)
+        return {"bytes": capacity(lines, self.bytes_per_line), "lines": lines, "exact": True}
+
+    def payload_size(self, message):
+        return len(to_bytes(message))
+
+    def info(self, carrier, password=""):
+        self.check_carrier(carrier)
+        lines = count_lines(carrier)
+        details = {
+            "mode": self.mode,
+            "lines": lines,
+            "size": os.path.getsize(carrier),
+            "bytes_per_line": self.bytes_per_line,
+            "capacity_bytes": capacity(lines, self.bytes_per_line),
+        }
+        return self.result("info", carrier, ok=True, details=details)
+
+
+@register_engine
+class ZeroWidthEngine(TextStegoEngine):
+    """Zero-width characters at the line ends (UTF-8 documents)"""
+
+    name = "zerowidth"
+    label = "Zero-Width Text (Native)"
+    mode = ZERO_WIDTH
+
+
+@register_engine
+class WhitespaceEngine(TextStegoEngine):
+    """Spaces and tabs at the line ends"""
+
+    name = "whitespace"
+    label = "Trailing Whitespace (Native)"
+    mode = WHITESPACE
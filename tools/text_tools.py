@@ -1,13 +1,15 @@
 """
 Text Steganography Tools
-S-Tools and SNOW
+WBStego4Open and native zero-width/whitespace text steganography
 """
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import subprocess
 import os
-from .base_tool import BaseToolWindow, find_executable, launch_executable
+from .base_tool import BaseToolWindow, UiDispatcher, find_tool, launch_executable
+from .engine import EngineError
+from .jobs import CANCELLED, get_runner, run_process
+from .text_stego import WhitespaceEngine, ZeroWidthEngine
 
 
 class TextStegoWindow:
@@ -27,6 +29,11 @@ class TextStegoWindow:
         notebook.add(wb_frame, text="WBStego4Open")
         self.wb_tool = WBStegoTool(wb_frame, self.window)
 
+        # Native zero-width/whitespace tab (no external executable)
+        native_frame = ttk.Frame(notebook)
+        notebook.add(native_frame, text="Text Stego (Native)")
+        self.native_tool = TextStegoTool(native_frame, self.window)
+
         # Auto-launch when its tab is selected
         def _on_text_tab_changed(event):
             try:
@@ -50,12 +57,107 @@ class TextStegoWindow:
             pass
 
 
+class TextStegoTool(BaseToolWindow):
+    """Native zero-width character / trailing whitespace tool for text files"""
+    
+    MODES = {"Zero-width characters": ZeroWidthEngine, "Trailing whitespace": WhitespaceEngine}
+    FILETYPES = [("Text files", "*.txt *.log *.csv *.md *.html *.htm *.xml *.json"), ("All files", "*.*")]
+    
+    def __init__(self, parent, root_window):
+        self.root_window = root_window
+        self.mode = tk.StringVar(value="Zero-width characters")
+        super().__init__(parent, "Text Stego (Native)")
+    
+    def create_tabbed_widgets(self):
+        """Add the mode selector above the Hide/Extract tabs"""
+        options = ttk.Frame(self.window, padding=(10, 10, 10, 0))
+        options.pack(fill=tk.X)
+        ttk.Label(options, text="Mode:", font=("Arial", 10)).pack(side=tk.LEFT)
+        ttk.Combobox(options, textvariable=self.mode, values=list(self.MODES), state="readonly",
+                     width=24).pack(side=tk.LEFT, padx=5)
+        ttk.Label(options, text="(use the same mode to extract)", foreground="gray").pack(side=tk.LEFT, padx=5)
+        super().create_tabbed_widgets()
+    
+    def create_hide_tab(self, parent):
+        """Create Hide tab with text file types"""
+        super().create_hide_tab(parent)
+        for widget in parent.winfo_children():
+            if isinstance(widget, ttk.Button) and widget.cget("text") == "Browse":
+                info = widget.grid_info()
+                if info.get("row") == 0:
+                    widget.config(command=lambda: self.browse_input_file(self.FILETYPES))
+                elif info.get("row") == 1:
+                    widget.config(command=lambda: self.browse_output_file(self.FILETYPES))
+    
+    def create_extract_tab(self, parent):
+        """Create Extract tab with text file types"""
+        super().create_extract_tab(parent)
+        for widget in parent.winfo_children():
+            if isinstance(widget, ttk.Button) and widget.cget("text") == "Browse":
+                widget.config(command=lambda: self.browse_input_file(self.FILETYPES))
+    
+    def get_engine(self, tab):
+        return self.MODES[self.mode.get()](log=self.engine_log(tab))
+    
+    def hide_message(self):
+        """Hide message at the line ends of a text file"""
+        if not self.validate_inputs(require_message=True, require_password=False, tab="hide"):
+            return
+        
+        self.clear_log("hide")
+        self.log(f"Starting text hide operation ({self.mode.get().lower()})...", tab="hide")
+        
+        try:
+            engine = self.get_engine("hide")
+            self.start_job(
+                "hide", engine.embed,
+                self.input_file.get(),
+                self.get_message(),
+                self.output_file.get(),
+                self.password.get(),
+                on_done=self.report_hide_result
+            )
+        
+        except EngineError as e:
+            self.log(str(e), "ERROR", "hide")
+            messagebox.showerror("Error", str(e))
+        except Exception as e:
+            self.log(f"Exception: {str(e)}", "ERROR", "hide")
+            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+    
+    def extract_message(self):
+        """Extract message from the line ends of a text file"""
+        if not self.validate_inputs(require_message=False, require_password=False, tab="extract"):
+            return
+        
+        self.clear_log("extract")
+        self.log(f"Starting text extract operation ({self.mode.get().lower()})...", tab="extract")
+        
+        try:
+            engine = self.get_engine("extract")
+            self.start_job(
+                "extract", engine.extract,
+                self.input_file.get(),
+                self.password.get(),
+                on_done=self.report_extract_result
+            )
+        
+        except EngineError as e:
+            self.log(str(e), "ERROR", "extract")
+            messagebox.showerror("Error", str(e))
+        except Exception as e:
+            self.log(f"Exception: {str(e)}", "ERROR", "extract")
+            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+
+
 class WBStegoTool:
     """WBStego4Open launcher tool"""
 
     def __init__(self, parent, root_window):
         self.parent = parent
         self.root_window = root_window
+        self.ui = UiDispatcher(parent)
+        self.log_job = None
         lbl = ttk.Label(parent, text="WBStego4Open Launcher", font=(None, 11, "bold"))
         lbl.pack(anchor="w", padx=10, pady=(8, 4))
 
@@ -65,6 +167,9 @@ class WBStegoTool:
         btn_log = ttk.Button(parent, text="Launch with logs", command=self.launch_wbsteo_with_logging)
         btn_log.pack(anchor="w", padx=10, pady=(0, 8))
 
+        btn_stop = ttk.Button(parent, text="Stop logged instance", command=self.stop_wbsteo)
+        btn_stop.pack(anchor="w", padx=10, pady=(0, 8))
+
     def launch_wbsteo(self):
         wb_path = self.find_wbsteo()
 
@@ -80,26 +185,17 @@ class WBStegoTool:
             return ok
     def find_wbsteo(self):
         """Find WBStego4Open executable or shortcut"""
-        possible_paths = [
-            os.path.join(os.path.dirname(__file__), "wbStego4.3open.exe"),
-            os.path.join(os.path.dirname(__file__), "wbStego4.3open.exe.lnk"),
-            os.path.join(os.path.dirname(__file__), "wbs43open-win32", "wbStego4.3open.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "wbStego4.3open.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "tools", "wbStego4.3open.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "wbs43open-win32", "wbStego4.3open.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "WBStego4Open.exe"),
-            "wbStego4.3open.exe",
-            "WBStego4Open.exe",
-            "WBStego4.3open.exe",
-        ]
-        return find_executable(possible_paths)
+        return find_tool("wbstego")
 
     def launch_wbsteo_with_logging(self):
-        """Launch WBStego but capture stdout/stderr to a log file for debugging"""
+        """Launch WBStego in the background, streaming its stdout/stderr to a log file"""
         wb_path = self.find_wbsteo()
         if not wb_path:
             messagebox.showerror("Error", "WBStego executable not found. Please ensure wbStego4.3open.exe is in the tools folder.")
             return
+        if self.log_job and not self.log_job.done():
+            messagebox.showinfo("Running", "WBStego is already running with logging.")
+            return
 
         abs_path = os.path.abspath(wb_path)
         tools_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -107,15 +203,29 @@ class WBStegoTool:
         cwd = wbs_dir if os.path.isdir(wbs_dir) else os.path.dirname(abs_path)
 
         log_path = os.path.join(tools_dir, 'wbsteo_launch_log.txt')
-        try:
-            result = subprocess.run([abs_path], cwd=cwd, capture_output=True, timeout=30)
-            with open(log_path, 'wb') as f:
-                f.write(result.stdout or b'')
-                f.write(b"\n--- STDERR ---\n")
-                f.write(result.stderr or b'')
-            messagebox.showinfo("Launched", f"WBStego launched and logs written to:\n{log_path}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to launch WBStego: {e}\nLogs: {log_path}")
+
+        def run():
+            with open(log_path, 'w', encoding='utf-8') as f:
+                def write(stream, line):
+                    f.write(line if stream == "stdout" else f"[stderr] {line}")
+                    f.flush()
+                return run_process([abs_path], cwd=cwd, on_output=write)
+
+        self.log_job = get_runner().submit(
+            run, label="WBStego",
+            on_done=lambda job: self.ui.post(self._wbsteo_exited, job, log_path)
+        )
+        messagebox.showinfo("Launched", f"WBStego launched; its output is logged to:\n{log_path}")
+
+    def stop_wbsteo(self):
+        """Stop the WBStego instance started with logging"""
+        if self.log_job and not self.log_job.done():
+            self.log_job.cancel()
+
+    def _wbsteo_exited(self, job, log_path):
+        if job.exception is not None and job.status != CANCELLED:
+            messagebox.showerror("Error", f"Failed to launch WBStego: {job.exception}\nLogs: {log_path}")
+
     # SNOW support removed - SNOW detection/commands are no longer part of this toolkit
     
     
@@ -1,13 +1,15 @@
 """
 Video/GIF Steganography Tools
-GIF Shuffle Tool
+GIF Shuffle Tool and native GIF palette
 """
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import subprocess
 import os
-from .base_tool import BaseToolWindow, find_executable, launch_executable
+from .base_tool import BaseToolWindow, find_tool, launch_executable, remember_tool
+from .engine import EngineError, GIFShuffleEngine, find_gifshuf
+from .extract_cache import get_cache as get_extract_cache
+from .gif_palette import GIFPaletteEngine
 
 
 class VideoStegoWindow:
@@ -27,6 +29,11 @@ class VideoStegoWindow:
         notebook.add(gif_frame, text="GIF Shuffle Tool")
         self.gif_tool = GIFShuffleTool(gif_frame, self.window)
         
+        # Native GIF palette tab (no external executable)
+        palette_frame = ttk.Frame(notebook)
+        notebook.add(palette_frame, text="GIF Palette (Native)")
+        self.palette_tool = GIFPaletteTool(palette_frame, self.window)
+        
         # DeEgger Embedder GUI launcher tab
         deegger_frame = ttk.Frame(notebook)
         notebook.add(deegger_frame, text="DeEgger Embedder")
@@ -86,31 +93,19 @@ class GIFShuffleTool(BaseToolWindow):
         self.log("Starting GIF Shuffle Tool hide operation...", tab="hide")
         
         try:
-            gifshuf_path = self.find_gifshuf()
-            if not gifshuf_path:
-                messagebox.showerror("Error", "GIFSHUF.EXE not found. Please ensure it's in the Tools directory.")
-                return
-            
-            message = self.get_message()
-            password = self.password.get() or ""
-            
-            # GIF Shuffle Tool hide command: -CS -m message -p password input output
-            cmd = [
-                gifshuf_path,
-                '-CS',
-                '-m',
-                message,
-                '-p',
-                password,
+            engine = GIFShuffleEngine(log=self.engine_log("hide"))
+            self.start_job(
+                "hide", engine.embed,
                 self.input_file.get(),
+                self.get_message(),
                 self.output_file.get(),
-            ]
-            
-            self.log(f"Running: {' '.join(cmd)}", tab="hide")
-            subprocess.Popen(cmd)
-            self.log("Message hidden successfully!", "SUCCESS", "hide")
-            messagebox.showinfo("Success", f"Message hidden successfully!\nOutput: {self.output_file.get()}")
+                self.password.get() or "",
+                on_done=self.report_hide_result
+            )
         
+        except EngineError as e:
+            self.log(str(e), "ERROR", "hide")
+            messagebox.showerror("Error", str(e))
         except Exception as e:
             self.log(f"Exception: {str(e)}", "ERROR", "hide")
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
@@ -124,105 +119,141 @@ class GIFShuffleTool(BaseToolWindow):
         self.log("Starting GIF Shuffle Tool extract operation...", tab="extract")
         
         try:
-            gifshuf_path = self.find_gifshuf()
-            if not gifshuf_path:
-                messagebox.showerror("Error", "GIFSHUF.EXE not found. Please ensure it's in the Tools directory.")
-                return
-            
-            password = self.password.get() or ""
-            
-            # GIF Shuffle Tool extract command: -C -p password input
-            cmd = [
-                gifshuf_path,
-                '-C',
-                '-p',
-                password,
+            engine = GIFShuffleEngine(log=self.engine_log("extract"))
+            # Repeated extracts of the same file and password skip the tool
+            self.start_job(
+                "extract", get_extract_cache().extract, engine,
                 self.input_file.get(),
-            ]
-
-            self.log(f"Running: {' '.join(cmd)}", tab="extract")
-            # Run the tool with its executable directory as cwd so relative paths resolve
-            run = subprocess.run(cmd, capture_output=True, timeout=60, cwd=os.path.dirname(gifshuf_path))
-
-            # If the tool returned a non-zero exit code, show stderr
-            if run.returncode != 0:
-                stderr = run.stderr.decode(errors='replace') if run.stderr else ''
-                self.log(f"GIF Shuffle failed: {stderr}", "ERROR", "extract")
-                messagebox.showerror("Error", f"Extraction failed:\n{stderr}")
-                return
-
-            stdout_bytes = run.stdout or b''
-            if not stdout_bytes:
-                self.log("No message found or extraction returned empty output.", "ERROR", "extract")
-                messagebox.showwarning("Warning", "No message found or extraction returned empty output.")
-                return
-
-            # Heuristic checks to avoid showing gibberish when password is wrong.
-            total = len(stdout_bytes)
-            printable = 0
-            alnum_space = 0
-            for b in stdout_bytes:
-                if b in (9, 10, 13) or 32 <= b <= 126:
-                    printable += 1
-                # letters, digits, and whitespace are good indicators of readable text
-                if b in (9, 10, 13) or 32 <= b <= 126 and (
-                    48 <= b <= 57 or 65 <= b <= 90 or 97 <= b <= 122 or b == 32
-                ):
-                    alnum_space += 1
-            printable_ratio = printable / total if total > 0 else 0
-            alnum_space_ratio = alnum_space / total if total > 0 else 0
-
-            # Decide thresholds: require majority printable and at least some alphanumeric content
-            if printable_ratio < 0.7 or alnum_space_ratio < 0.35:
-                # Probably binary/gibberish (wrong password). Don't display binary data.
-                self.log("Extraction returned non-text output — likely wrong password.", "ERROR", "extract")
-                # Offer to save raw output for advanced users
-                save_raw = messagebox.askyesno("Possible wrong password",
-                                               "Extraction produced non-text output (likely wrong password).\nDo you want to save the raw output to a file for inspection?")
-                if save_raw:
-                    try:
-                        default_path = os.path.join(os.path.dirname(self.input_file.get()), "gifshuf_raw_output.bin")
-                        with open(default_path, "wb") as wf:
-                            wf.write(stdout_bytes)
-                        messagebox.showinfo("Saved", f"Raw output saved to:\n{default_path}")
-                    except Exception as e:
-                        messagebox.showerror("Error", f"Failed to save raw output:\n{str(e)}")
-                return
-
-            # Safe to decode and show
-            output_text = stdout_bytes.decode(errors='replace')
-            self.set_message(output_text)
-            self.log("Message extracted successfully!", "SUCCESS", "extract")
-            self.log(f"Extracted message: {output_text}", tab="extract")
-            messagebox.showinfo("Success", "Message extracted successfully!")
+                self.password.get() or "",
+                on_done=self.report_extract_result
+            )
         
+        except EngineError as e:
+            self.log(str(e), "ERROR", "extract")
+            messagebox.showerror("Error", str(e))
         except Exception as e:
             self.log(f"Exception: {str(e)}", "ERROR", "extract")
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
     
+    def report_extract_result(self, result):
+        """Report a GIFSHUF extraction; binary output usually means a wrong password"""
+        if result.details.get("likely_wrong_password"):
+            # Probably binary/gibberish (wrong password). Don't display binary data.
+            self.log(result.error, "ERROR", "extract")
+            # Offer to save raw output for advanced users
+            save_raw = messagebox.askyesno("Possible wrong password",
+                                           "Extraction produced non-text output (likely wrong password).\nDo you want to save the raw output to a file for inspection?")
+            if save_raw:
+                try:
+                    default_path = os.path.join(os.path.dirname(result.carrier), "gifshuf_raw_output.bin")
+                    with open(default_path, "wb") as wf:
+                        wf.write(result.payload)
+                    messagebox.showinfo("Saved", f"Raw output saved to:\n{default_path}")
+                except Exception as e:
+                    messagebox.showerror("Error", f"Failed to save raw output:\n{str(e)}")
+            return
+
+        if not result.ok:
+            self.log(result.error, "ERROR", "extract")
+            messagebox.showerror("Error", f"Extraction failed:\n{result.error}")
+            return
+
+        output_text = result.text
+        self.set_message(output_text)
+        self.log("Message extracted successfully!", "SUCCESS", "extract")
+        self.log(f"Extracted message: {output_text}", tab="extract")
+        messagebox.showinfo("Success", "Message extracted successfully!")
+    
     def find_gifshuf(self):
         """Find GIFShuf executable"""
-        possible_paths = [
-            os.path.join(os.path.dirname(__file__), "GIFShuff-Tool", "GIFSHUF.EXE"),
-            os.path.join(os.path.dirname(__file__), "GIFShuff-Tool", "GIFSHUF.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "GIFShuff-Tool", "GIFSHUF.EXE"),
-            os.path.join(os.path.dirname(__file__), "..", "tools", "GIFShuff-Tool", "GIFSHUF.EXE"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "GIFShuff-Tool", "GIFSHUF.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "GIFSHUF.EXE"),
-            "GIFSHUF.EXE",
-            "GIFSHUF.exe",
-            "gifshuf.exe",
-        ]
-        for path in possible_paths:
-            abs_path = os.path.abspath(path)
-            if os.path.exists(abs_path):
-                return abs_path
-        return None
+        return find_gifshuf()
 
 
     # HideItPro tool removed from project
 
 
+class GIFPaletteTool(BaseToolWindow):
+    """Native GIF palette-order tool"""
+    
+    def __init__(self, parent, root_window):
+        self.root_window = root_window
+        super().__init__(parent, "GIF Palette (Native)")
+    
+    def create_hide_tab(self, parent):
+        """Create Hide tab with GIF file types"""
+        super().create_hide_tab(parent)
+        for widget in parent.winfo_children():
+            if isinstance(widget, ttk.Button) and widget.cget("text") == "Browse":
+                info = widget.grid_info()
+                if info.get("row") == 0:
+                    widget.config(command=lambda: self.browse_input_file([
+                        ("GIF files", "*.gif"), ("All files", "*.*")
+                    ]))
+                elif info.get("row") == 1:
+                    widget.config(command=lambda: self.browse_output_file([
+                        ("GIF files", "*.gif"), ("All files", "*.*")
+                    ]))
+    
+    def create_extract_tab(self, parent):
+        """Create Extract tab with GIF file types"""
+        super().create_extract_tab(parent)
+        for widget in parent.winfo_children():
+            if isinstance(widget, ttk.Button) and widget.cget("text") == "Browse":
+                widget.config(command=lambda: self.browse_input_file([
+                    ("GIF files", "*.gif"), ("All files", "*.*")
+                ]))
+    
+    def hide_message(self):
+        """Hide message by reordering the GIF palette"""
+        if not self.validate_inputs(require_message=True, require_password=False, tab="hide"):
+            return
+        
+        self.clear_log("hide")
+        self.log("Starting GIF palette hide operation...", tab="hide")
+        
+        try:
+            engine = GIFPaletteEngine(log=self.engine_log("hide"))
+            self.start_job(
+                "hide", engine.embed,
+                self.input_file.get(),
+                self.get_message(),
+                self.output_file.get(),
+                self.password.get(),
+                on_done=self.report_hide_result
+            )
+        
+        except EngineError as e:
+            self.log(str(e), "ERROR", "hide")
+            messagebox.showerror("Error", str(e))
+        except Exception as e:
+            self.log(f"Exception: {str(e)}", "ERROR", "hide")
+            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+    
+    def extract_message(self):
+        """Extract message from the GIF palette order"""
+        if not self.validate_inputs(require_message=False, require_password=False, tab="extract"):
+            return
+        
+        self.clear_log("extract")
+        self.log("Starting GIF palette extract operation...", tab="extract")
+        
+        try:
+            engine = GIFPaletteEngine(log=self.engine_log("extract"))
+            self.start_job(
+                "extract", engine.extract,
+                self.input_file.get(),
+                self.password.get(),
+                on_done=self.report_extract_result
+            )
+        
+        except EngineError as e:
+            self.log(str(e), "ERROR", "extract")
+            messagebox.showerror("Error", str(e))
+        except Exception as e:
+            self.log(f"Exception: {str(e)}", "ERROR", "extract")
+            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+
+
 class DeEggerTool:
     """Simple launcher for the DeEgger Embedder GUI."""
 
@@ -260,25 +291,10 @@ class DeEggerTool:
             initialdir=os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
             filetypes=[("Executables", "*.exe;*.lnk"), ("All files", "*.*")]
         )
-        if user_choice:
-            try_open(user_choice)
+        if user_choice and try_open(user_choice):
+            remember_tool("deegger", user_choice)
 
     def find_deegger(self):
         """Find DeEgger executable or shortcut"""
-        possible_paths = [
-            os.path.join(os.path.dirname(__file__), "DeEgger Embedder.lnk"),
-            os.path.join(os.path.dirname(__file__), "DeEgger Embedder.exe"),
-            os.path.join(os.path.dirname(__file__), "DeEgger Embedder.exe.lnk"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "DeEgger Embedder.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "DeEgger Embedder.lnk"),
-            os.path.join(os.path.dirname(__file__), "..", "tools", "DeEgger Embedder.exe"),
-            os.path.join(os.path.dirname(__file__), "..", "tools", "DeEgger Embedder.lnk"),
-            os.path.join(os.path.dirname(__file__), "..", "Tools", "DeEgger Embedder", "DeEgger Embedder.exe"),
-            "DeEgger Embedder.exe",
-            "DeEgger Embedder.lnk",
-            "deegger embedder.exe",
-            "deegger.exe",
-        ]
-        return find_executable(possible_paths)
-        return find_executable(possible_paths)
+        return find_tool("deegger")
 
@@ -0,0 +1,336 @@
+"""
+Native WAV LSB Engine
+Embeds and extracts data in the least significant bit of PCM samples,
+streaming the recording through in chunks instead of loading it.
+
+Frames are read with the ``wave`` module a chunk at a time into one reused
+buffer; NumPy views over that buffer's memoryview address the low byte of
+every sample in place, and each chunk is written out as soon as it is
+done. Memory use depends on the chunk size, not on the length of the
+recording, and once the last payload bit is written the rest of the file
+is copied without touching NumPy.
+
+Sample selection is keyed with the password, like the LSB image engine:
+the header bits are spread over the first HEADER_SPAN samples (fewer in
+short recordings) and the payload bits over the remaining ones, one bit
+per segment at a keyed offset, so positions always increase and a single
+pass suffices.
+
+The payload is not encrypted; the password only decides where the bits go.
+Like engine.py, this module must not import tkinter.
+"""
+
+import hashlib
+import os
+import struct
+import wave
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency, checked when the engine is used
+    np = None
+
+from .engine import Engine, EngineError, register_engine, to_bytes
+from .spans import span
+
+MAGIC = b"WLS\x01"
+HEADER_SIZE = len(MAGIC) + 4  # magic + big-endian payload length
+HEADER_BITS = HEADER_SIZE * 8
+HEADER_SPAN = 1 << 16          # samples the header is spread over
+CHUNK_FRAMES = 1 << 18         # frames read per step
+
+
+def require_numpy():
+    if np is None:
+        raise EngineError("The native WAV LSB engine requires NumPy.\nInstall it with: pip install numpy")
+
+
+def open_wav(path):
+    try:
+        return wave.open(path, "rb")
+    except (wave.Error, EOFError) as e:
+        raise EngineError(f"Unsupported WAV file ({e}). Use an uncompressed PCM recording.")
+
+
+def wav_samples(reader):
+    """Number of samples (frames x channels) of an open wave reader"""
+    return reader.getnframes() * reader.getnchannels()
+
+
+def header_span(samples):
+    """Samples reserved for the header: HEADER_SPAN, or a sixteenth of a
+    short recording
+    """
+    return min(HEADER_SPAN, max(HEADER_BITS, samples // 16))
+
+
+def capacity(samples):
+    """Usable payload bytes for a recording of ``samples`` samples"""
+    if samples < HEADER_BITS:
+        return 0
+    return (samples - header_span(samples)) // 8
+
+
+# ---------------------------------------------------------------------------
+# Keyed sample selection
+# ---------------------------------------------------------------------------
+
+def _seed(password, tag):
+    digest = hashlib.sha256(b"wav:" + tag + b":" + to_bytes(password)).digest()
+    return np.uint32(int.from_bytes(digest[:4], "little"))
+
+
+def _keyed_hash(index, seed):
+    """One keyed 32-bit value per bit index (murmur3 finaliser over the index)"""
+    x = index.astype(np.uint32) * np.uint32(0x9E3779B1) + seed
+    x ^= x >> np.uint32(16)
+    x *= np.uint32(0x85EBCA6B)
+    x ^= x >> np.uint32(13)
+    x *= np.uint32(0xC2B2AE35)
+    x ^= x >> np.uint32(16)
+    return x
+
+
+class BitSchedule:
+    """Sample positions of ``count`` bits spread over ``span`` samples
+    starting at ``base``, handed out in order as the stream advances.
+
+    The span is cut into ``count`` segments of equal length (any remainder
+    at the end is left alone) and each bit takes the sample at a keyed
+    offset in its segment.
+    """
+
+    def __init__(self, count, span, base, password, tag):
+        if count > span:
+            raise EngineError("Recording too short for this message.")
+        self.count = count
+        self.base = base
+        self.next = 0
+        # Keeps offset * length within 64 bits; only shortens huge segments
+        self.length = min(span // count, 0xFFFFFFFF) if count else 0
+        self.seed = _seed(password, tag)
+
+    @property
+    def done(self):
+        return self.next >= self.count
+
+    def take(self, end):
+        """(first bit index, positions) of the next bits whose sample lies
+        before ``end``; positions are relative to the start of the stream
+        """
+        start = self.next
+        limit = end - self.base
+        # Bits whose segment starts before ``limit``; only the last of
+        # them may land past it
+        if self.done or limit <= 0:
+            return start, np.zeros(0, dtype=np.int64)
+        stop = min(self.count, -(-limit // self.length))
+        if stop <= start:
+            return start, np.zeros(0, dtype=np.int64)
+        index = np.arange(start, stop, dtype=np.int64)
+        if self.length == 1:
+            pos = index
+        else:
+            offsets = (_keyed_hash(index, self.seed).astype(np.uint64) * np.uint64(self.length)) >> np.uint64(32)
+            pos = index * self.length + offsets.astype(np.int64)
+        if pos[-1] >= limit:
+            pos = pos[:-1]
+        self.next += len(pos)
+        return start, pos + self.base
+
+
+def _bits(data, start, count):
+    """``count`` bits of ``data`` from bit ``start``, unpacked as uint8"""
+    head = start // 8
+    raw = np.frombuffer(data, dtype=np.uint8, count=-(-(start + count) // 8) - head, offset=head)
+    return np.unpackbits(raw)[start % 8:start % 8 + count]
+
+
+class _BitSink:
+    """Packs bits read in pieces back into bytes"""
+
+    def __init__(self):
+        self.out = bytearray()
+        self.carry = np.zeros(0, dtype=np.uint8)
+
+    def add(self, bits):
+        bits = np.concatenate([self.carry, bits]) if self.carry.size else bits
+        whole = bits.size // 8 * 8
+        self.out += np.packbits(bits[:whole]).tobytes()
+        self.carry = bits[whole:]
+
+
+# ---------------------------------------------------------------------------
+# Streaming embed / extract
+# ---------------------------------------------------------------------------
+
+def _chunks(reader, chunk_frames):
+    """(first sample, writable uint8 view of the chunk, memoryview) per chunk,
+    all backed by one reused buffer
+    """
+    width = reader.getsampwidth()
+    channels = reader.getnchannels()
+    buffer = bytearray(chunk_frames * channels * width)
+    sample = 0
+    while True:
+        data = reader.readframes(chunk_frames)
+        if not data:
+            return
+        n = len(data)
+        buffer[:n] = data
+        view = memoryview(buffer)[:n]
+        yield sample, np.frombuffer(view, dtype=np.uint8), view
+        sample += n // width
+
+
+def _select(pos, first):
+    """Index for samples ``pos`` (absolute) of a chunk starting at
+    ``first``: a slice when they are consecutive, as in a full recording
+    """
+    if len(pos) and pos[-1] - pos[0] + 1 == len(pos):
+        return slice(int(pos[0]) - first, int(pos[-1]) + 1 - first)
+    return pos - first
+
+
+def _write_bits(samples, first, pos, bits):
+    """Set the LSB of samples ``pos`` in a chunk starting at ``first``"""
+    at = _select(pos, first)
+    samples[at] = (samples[at] & np.uint8(0xFE)) | bits
+
+
+def embed_file(carrier, message, output, password="", chunk_frames=CHUNK_FRAMES):
+    """Stream ``carrier`` to ``output`` with ``message`` in the sample LSBs"""
+    require_numpy()
+    if os.path.abspath(carrier) == os.path.abspath(output):
+        raise EngineError("Choose an output file other than the carrier.")
+    if not output.lower().endswith(".wav"):
+        raise EngineError("WAV LSB output must be a .wav file (lossy formats destroy the hidden bits).")
+    payload = to_bytes(message)
+
+    with open_wav(carrier) as reader:
+        width = reader.getsampwidth()
+        total = wav_samples(reader)
+        limit = capacity(total)
+        if total < HEADER_BITS:
+            raise EngineError("Recording too short for the WAV LSB header.")
+        if len(payload) > limit:
+            raise EngineError(f"Message too large: {len(payload)} bytes, recording holds {limit} bytes.")
+
+        span = header_span(total)
+        header = MAGIC + struct.pack(">I", len(payload))
+        schedules = (
+            (header, BitSchedule(HEADER_BITS, span, 0, password, b"header")),
+            (payload, BitSchedule(len(payload) * 8, total - span, span, password, b"body")),
+        )
+        try:
+            with wave.open(output, "wb") as writer:
+                writer.setparams(reader.getparams())
+                for first, raw, view in _chunks(reader, chunk_frames):
+                    # The low byte of each little-endian sample holds its LSB
+                    samples = raw[::width]
+                    for data, schedule in schedules:
+                        start, pos = schedule.take(first + len(samples))
+                        if len(pos):
+                            _write_bits(samples, first, pos, _bits(data, start, len(pos)))
+                    writer.writeframesraw(view)
+                    if all(schedule.done for _data, schedule in schedules):
+                        break
+                # Nothing left to hide: copy the rest as it is
+                for data in iter(lambda: reader.readframes(chunk_frames), b""):
+                    writer.writeframesraw(data)
+        except BaseException:
+            try:
+                os.remove(output)
+            except OSError:
+                pass
+            raise
+    return len(payload)
+
+
+def extract_file(carrier, password="", chunk_frames=CHUNK_FRAMES):
+    """Return the hidden payload, or None if there is none for this key.
+
+    Reading stops at the chunk holding the last payload bit.
+    """
+    require_numpy()
+    with open_wav(carrier) as reader:
+        width = reader.getsampwidth()
+        total = wav_samples(reader)
+        if total < HEADER_BITS:
+            return None
+        span = header_span(total)
+        header = BitSchedule(HEADER_BITS, span, 0, password, b"header")
+        header_bits = _BitSink()
+        body, body_bits = None, _BitSink()
+
+        for first, raw, _view in _chunks(reader, chunk_frames):
+            samples = raw[::width]
+            end = first + len(samples)
+            if body is None:
+                _start, pos = header.take(end)
+                header_bits.add(samples[_select(pos, first)] & np.uint8(1))
+                if not header.done:
+                    continue
+                data = bytes(header_bits.out)
+                if not data.startswith(MAGIC):
+                    return None
+                length = struct.unpack(">I", data[len(MAGIC):])[0]
+                if length > capacity(total):
+                    return None
+                body = BitSchedule(length * 8, total - span, span, password, b"body")
+            _start, pos = body.take(end)
+            body_bits.add(samples[_select(pos, first)] & np.uint8(1))
+            if body.done:
+                return bytes(body_bits.out)
+    return None
+
+
+@register_engine
+class WAVLSBEngine(Engine):
+    """Native keyed sample-LSB embedding for PCM WAV"""
+
+    name = "wavlsb"
+    label = "WAV LSB (Native)"
+    carrier_extensions = (".wav",)
+
+    def __init__(self, log=None, chunk_frames=CHUNK_FRAMES):
+        super().__init__(log)
+        self.chunk_frames = chunk_frames
+
+    def embed(self, carrier, message, output, password=""):
+        self.check_carrier(carrier)
+        # Reading, embedding and writing are interleaved chunk by chunk
+        with span("execute"):
+            size = embed_file(carrier, message, output, password, self.chunk_frames)
+        self.log(f"Hid {size} bytes")
+        return self.result("embed", carrier, ok=True, output_file=output)
+
+    def extract(self, carrier, password=""):
+        self.check_carrier(carrier)
+        with span("execute"):
+            payload = extract_file(carrier, password, self.chunk_frames)
+        if payload is None:
+            return self.result("extract", carrier, error="No hidden data found (wrong password?)")
+        return self.result("extract", carrier, ok=True, payload=payload)
+
+    def capacity(self, carrier):
+        self.check_carrier(carrier)
+        with open_wav(carrier) as reader:
+            samples = wav_samples(reader)
+        return {"bytes": capacity(samples), "samples": samples, "exact": True}
+
+    def payload_size(self, message):
+        return len(to_bytes(message))
+
+    def info(self, carrier, password=""):
+        self.check_carrier(carrier)
+        with open_wav(carrier) as reader:
+            details = {
+                "channels": reader.getnchannels(),
+                "sample_width": reader.getsampwidth(),
+                "frame_rate": reader.getframerate(),
+                "frames": reader.getnframes(),
+                "seconds": round(reader.getnframes() / reader.getframerate(), 3),
+                "capacity_bytes": capacity(wav_samples(reader)),
+            }
+        return self.result("info", carrier, ok=True, details=details)
@@ -0,0 +1,320 @@
+"""
+Extended-Attribute Streams
+Hidden named streams in ``user.*`` extended attributes, the Linux
+counterpart of NTFS alternate data streams.
+
+A stream named ``hidden`` lives in the attribute ``user.hidden``. File
+systems cap the size of one attribute value (64 KiB at most on Linux,
+less on ext4 and btrfs), so a larger payload is split over parts
+``user.hidden#0``, ``user.hidden#1``, ... and ``user.hidden`` holds a small
+header naming how many there are. The usable part size is found on the
+first write to each file system and remembered. If a write runs out of
+attribute space its parts are removed again rather than left behind.
+
+Reads and writes work on many streams per call over one open file
+descriptor, so a file is resolved once however many attributes it has.
+
+    python -m tools.xattr_streams list   file...
+    python -m tools.xattr_streams write  file stream payload_file
+    python -m tools.xattr_streams read   file stream [-o out]
+    python -m tools.xattr_streams delete file stream
+
+Like engine.py, this module must not import tkinter.
+"""
+
+import argparse
+import errno
+import os
+import re
+import shutil
+import struct
+import sys
+import threading
+
+from .engine import Engine, EngineError, register_engine, to_bytes
+from .spans import span
+
+PREFIX = "user."
+SPLIT_MAGIC = b"\0xattr-split\x01"
+SPLIT_HEADER = struct.Struct(">IQ")  # number of parts, total length
+PART_RE = re.compile(r"^(.*)#(\d+)$")
+
+MAX_PART = 65536 - len(SPLIT_MAGIC) - SPLIT_HEADER.size  # VFS limit (XATTR_SIZE_MAX)
+MIN_PART = 1024
+
+# st_dev -> largest part size the file system accepted
+_part_sizes = {}
+_part_sizes_lock = threading.Lock()
+
+
+def supported():
+    return hasattr(os, "setxattr")
+
+
+def require_xattr():
+    if not supported():
+        raise EngineError("Extended attributes are only available on Linux.\nUse NTFS streams on Windows.")
+
+
+def attribute(name):
+    """Attribute name of a stream, ``user.`` prefix added"""
+    if not name or "\0" in name or "/" in name:
+        raise EngineError(f"Invalid stream name: {name!r}")
+    if PART_RE.match(name):
+        raise EngineError(f"Stream names may not end in '#<number>': {name!r}")
+    return name if name.startswith(PREFIX) else PREFIX + name
+
+
+def part_attribute(attr, index):
+    return f"{attr}#{index}"
+
+
+def _error(e, path, name=None):
+    """EngineError for an OSError from an xattr call"""
+    if e.errno in (errno.ENOTSUP, getattr(errno, "EOPNOTSUPP", errno.ENOTSUP)):
+        return EngineError(f"{path}: the file system does not support user extended attributes.")
+    if e.errno == errno.ENODATA and name:
+        return EngineError(f"{path}: no stream named {name}.")
+    if e.errno in (errno.ENOSPC, errno.E2BIG):
+        return EngineError(f"{path}: not enough extended attribute space on this file system.")
+    return EngineError(f"{path}: {e.strerror or e}")
+
+
+class _Open:
+    """Open a file once for all attribute calls on it"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        require_xattr()
+        try:
+            # Attributes are metadata: a read-only descriptor can set them
+            self.fd = os.open(self.path, os.O_RDONLY)
+        except OSError as e:
+            raise EngineError(f"{self.path}: {e.strerror or e}")
+        return self.fd
+
+    def __exit__(self, *exc):
+        os.close(self.fd)
+
+
+def _part_size(fd):
+    dev = os.fstat(fd).st_dev
+    with _part_sizes_lock:
+        return _part_sizes.get(dev, MAX_PART), dev
+
+
+def _remove_parts(fd, attr, start):
+    """Remove parts from number ``start`` on; they are numbered without gaps"""
+    index = start
+    while True:
+        try:
+            os.removexattr(fd, part_attribute(attr, index))
+        except OSError:
+            return
+        index += 1
+
+
+def _write_one(fd, path, attr, data):
+    size, dev = _part_size(fd)
+    while True:
+        try:
+            if len(data) <= size and not data.startswith(SPLIT_MAGIC):
+                os.setxattr(fd, attr, data)
+                count = 0
+            else:
+                count = -(-len(data) // size)
+                for index in range(count):
+                    os.setxattr(fd, part_attribute(attr, index), data[index * size:(index + 1) * size])
+                os.setxattr(fd, attr, SPLIT_MAGIC + SPLIT_HEADER.pack(count, len(data)))
+            break
+        except OSError as e:
+            # Too big for one value here: retry with smaller parts
+            if e.errno in (errno.E2BIG, errno.ENOSPC) and size > MIN_PART and len(data) > MIN_PART:
+                size = max(MIN_PART, min(size, len(data)) // 2)
+                continue
+            _remove_parts(fd, attr, 0)
+            raise _error(e, path)
+    with _part_sizes_lock:
+        if size < _part_sizes.get(dev, MAX_PART):
+            _part_sizes[dev] = size
+    # Parts left over from a longer earlier version or a failed attempt
+    # with smaller parts
+    _remove_parts(fd, attr, count)
+
+
+def write_streams(path, streams):
+    """Write several streams ({name: bytes or str}) to ``path`` in one pass"""
+    with _Open(path) as fd:
+        for name, data in streams.items():
+            _write_one(fd, path, attribute(name), to_bytes(data))
+
+
+def write_stream(path, name, data):
+    write_streams(path, {name: data})
+
+
+def _read_one(fd, path, attr, name):
+    try:
+        value = os.getxattr(fd, attr)
+    except OSError as e:
+        raise _error(e, path, name)
+    if not value.startswith(SPLIT_MAGIC):
+        return value
+    count, length = SPLIT_HEADER.unpack_from(value, len(SPLIT_MAGIC))
+    try:
+        data = b"".join(os.getxattr(fd, part_attribute(attr, index)) for index in range(count))
+    except OSError as e:
+        raise EngineError(f"{path}: stream {name} is incomplete ({e.strerror or e}).")
+    if len(data) != length:
+        raise EngineError(f"{path}: stream {name} is incomplete ({len(data)} of {length} bytes).")
+    return data
+
+
+def read_streams(path, names=None):
+    """{name: bytes} of the given streams, or of all streams, read in one pass"""
+    with _Open(path) as fd:
+        if names is None:
+            names = list(_listing(fd, path))
+        return {name: _read_one(fd, path, attribute(name), name) for name in names}
+
+
+def read_stream(path, name):
+    return read_streams(path, [name])[name]
+
+
+def _listing(fd, path):
+    """{stream name: size} from the attributes of an open file"""
+    try:
+        attrs = [a for a in os.listxattr(fd) if a.startswith(PREFIX)]
+    except OSError as e:
+        if e.errno in (errno.ENOTSUP, getattr(errno, "EOPNOTSUPP", errno.ENOTSUP)):
+            return {}
+        raise _error(e, path)
+    present = set(attrs)
+    streams = {}
+    for attr in attrs:
+        part = PART_RE.match(attr)
+        if part and part.group(1) in present:
+            continue   # counted with its header
+        try:
+            value = os.getxattr(fd, attr)
+        except OSError:
+            continue   # removed meanwhile
+        size = len(value)
+        if value.startswith(SPLIT_MAGIC) and len(value) >= len(SPLIT_MAGIC) + SPLIT_HEADER.size:
+            size = SPLIT_HEADER.unpack_from(value, len(SPLIT_MAGIC))[1]
+        streams[attr[len(PREFIX):]] = size
+    return streams
+
+
+def list_streams(path):
+    """{stream name: payload size} of every stream on ``path``"""
+    with _Open(path) as fd:
+        return _listing(fd, path)
+
+
+def delete_stream(path, name):
+    attr = attribute(name)
+    with _Open(path) as fd:
+        try:
+            value = os.getxattr(fd, attr)
+            os.removexattr(fd, attr)
+        except OSError as e:
+            raise _error(e, path, name)
+        if value.startswith(SPLIT_MAGIC):
+            _remove_parts(fd, attr, 0)
+
+
+@register_engine
+class XattrStreamEngine(Engine):
+    """Named streams in user.* extended attributes (Linux)"""
+
+    name = "xattr"
+    label = "Extended Attributes"
+    carrier_extensions = ()   # any file
+
+    def __init__(self, log=None, stream="hidden"):
+        super().__init__(log)
+        self.stream = stream
+
+    def embed(self, carrier, message, output=None, password=""):
+        """Write the stream to ``output`` (a copy of the carrier, attributes
+        included) or, without one, to the carrier itself
+        """
+        self.check_carrier(carrier)
+        require_xattr()
+        target = carrier
+        if output and os.path.abspath(output) != os.path.abspath(carrier):
+            with span("write output"):
+                shutil.copy2(carrier, output)
+            target = output
+        with span("execute"):
+            write_stream(target, self.stream, message)
+        self.log(f"Wrote {len(to_bytes(message))} bytes to {attribute(self.stream)}")
+        return self.result("embed", carrier, ok=True, output_file=target)
+
+    def extract(self, carrier, password=""):
+        self.check_carrier(carrier)
+        with span("execute"):
+            payload = read_stream(carrier, self.stream)
+        return self.result("extract", carrier, ok=True, payload=payload)
+
+    def payload_size(self, message):
+        return len(to_bytes(message))
+
+    def info(self, carrier, password=""):
+        self.check_carrier(carrier)
+        return self.result("info", carrier, ok=True, details={"streams": list_streams(carrier)})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m tools.xattr_streams",
+        description="List, read, write and delete hidden streams in user.* extended attributes.",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list").add_argument("files", nargs="+")
+    write = sub.add_parser("write")
+    write.add_argument("file")
+    write.add_argument("stream")
+    write.add_argument("payload", help="file whose contents are written ('-' for stdin)")
+    read = sub.add_parser("read")
+    read.add_argument("file")
+    read.add_argument("stream")
+    read.add_argument("-o", "--output", help="write the stream here instead of stdout")
+    delete = sub.add_parser("delete")
+    delete.add_argument("file")
+    delete.add_argument("stream")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "list":
+            for path in args.files:
+                for name, size in sorted(list_streams(path).items()):
+                    print(f"{size:>10}  {path}:{name}")
+        elif args.command == "write":
+            if args.payload == "-":
+                data = sys.stdin.buffer.read()
+            else:
+                with open(args.payload, "rb") as f:
+                    data = f.read()
+            write_stream(args.file, args.stream, data)
+        elif args.command == "read":
+            data = read_stream(args.file, args.stream)
+            if args.output:
+                with open(args.output, "wb") as f:
+                    f.write(data)
+            else:
+                sys.stdout.buffer.write(data)
+        else:
+            delete_stream(args.file, args.stream)
+    except (EngineError, OSError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())